@@ -1,20 +1,34 @@
 """Ad Visual Analyst Agent"""
 
 from crewai import Agent
-from tools.gemini_vision_tool import analyze_ad_image
-from utils.llm_config import get_gemini_llm
+from tools.gemini_vision_tool import analyze_ad_image, analyze_carousel_images
+from utils.llm_config import AGENT_VISUAL, get_gemini_llm
 
 
-def create_ad_visual_analyst() -> Agent:
+SINGLE_IMAGE_TOOL_USAGE = """TOOL VERWENDUNG:
+        Rufe das "Gemini Vision Analyzer" Tool EINMAL auf mit: {"image_url": "/pfad/zum/bild.jpg"}
+        Das Tool gibt dir eine vollständige Analyse zurück. Du musst es NICHT mehrfach aufrufen."""
+
+CAROUSEL_TOOL_USAGE = """TOOL VERWENDUNG (Carousel-/Multi-Image-Ad):
+        Rufe das "Gemini Carousel Analyzer" Tool EINMAL mit ALLEN Karten in Swipe-Reihenfolge auf:
+        {"image_urls": ["/pfad/karte1.jpg", "/pfad/karte2.jpg", ...]}
+        Das Tool analysiert alle Karten und gibt Notizen pro Karte zurück.
+        Rufe es NICHT pro Karte auf."""
+
+
+def create_ad_visual_analyst(carousel: bool = False) -> Agent:
     """
     Creates the Ad Visual Analyst agent with B2B LinkedIn Ad expertise
 
     This agent analyzes visual elements based on LinkedIn B2B best practices.
+
+    Args:
+        carousel: Analyse a carousel / multi-image ad (all cards in one tool call)
     """
     return Agent(
         role="B2B Visual Performance Analyst",
         goal="Analyze ads based on LinkedIn B2B best practices and provide constructive, actionable feedback.",
-        backstory="""You are a B2B Visual Expert with $50M+ ad spend experience.
+        backstory=f"""You are a B2B Visual Expert with $50M+ ad spend experience.
         You provide honest, constructive feedback with specific improvement recommendations.
 
         **YOUR APPROACH:**
@@ -23,9 +37,7 @@ def create_ad_visual_analyst() -> Agent:
         - Always provide specific, actionable improvements
         - IMPORTANT: Respond in the same language as the ad content (English, German, etc.)
 
-        TOOL VERWENDUNG:
-        Rufe das "Gemini Vision Analyzer" Tool EINMAL auf mit: {"image_url": "/pfad/zum/bild.jpg"}
-        Das Tool gibt dir eine vollständige Analyse zurück. Du musst es NICHT mehrfach aufrufen.
+        {CAROUSEL_TOOL_USAGE if carousel else SINGLE_IMAGE_TOOL_USAGE}
 
         === LINKEDIN B2B BEST PRACTICES (Dein Framework) ===
 
@@ -69,10 +81,11 @@ def create_ad_visual_analyst() -> Agent:
         - Provide specific improvement recommendations
 
         IMPORTANT:
-        - Write a clear TEXT DESCRIPTION. NO JSON. Use the tool only ONCE.
+        - Write a clear TEXT DESCRIPTION into the "analysis" field of the JSON output
+          requested by the task, and fill in the score fields. Use the tool only ONCE.
         - Respond in the SAME LANGUAGE as the ad content (if ad text is in English, respond in English; if German, respond in German, etc.)""",
-        tools=[analyze_ad_image],
-        llm=get_gemini_llm(),
+        tools=[analyze_carousel_images if carousel else analyze_ad_image],
+        llm=get_gemini_llm(AGENT_VISUAL),
         verbose=True,
         allow_delegation=False,
     )
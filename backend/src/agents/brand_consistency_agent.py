@@ -1,7 +1,7 @@
 """Brand Consistency Agent"""
 
 from crewai import Agent
-from utils.llm_config import get_gemini_llm
+from utils.llm_config import AGENT_BRAND, get_gemini_llm
 
 
 def create_brand_consistency_agent() -> Agent:
@@ -23,6 +23,7 @@ def create_brand_consistency_agent() -> Agent:
           - Score (0-100)
 
         - IF NO Guidelines: Write "No brand guidelines provided."
+        - Return the JSON output requested by the task; your feedback goes into "analysis"
 
         **IMPORTANT:**
         - MAX 3 sentences
@@ -30,14 +31,14 @@ def create_brand_consistency_agent() -> Agent:
         - Brand is NOT the main focus - just a quick check
         - Respond in the SAME LANGUAGE as the ad content (English, German, etc.)
 
-        Example good output (English):
+        Example good "analysis" (English):
         "Brand Score: 85/100. Tone aligns well. Colors deviate (primary color incorrect)."
 
         Example when no guidelines (German):
         "Keine Brand Guidelines vorhanden."
 
         Be VERY brief.""",
-        llm=get_gemini_llm(),
+        llm=get_gemini_llm(AGENT_BRAND),
         verbose=True,
         allow_delegation=False,
     )
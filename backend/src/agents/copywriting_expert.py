@@ -1,7 +1,7 @@
 """Copywriting Expert Agent"""
 
 from crewai import Agent
-from utils.llm_config import get_gemini_llm
+from utils.llm_config import AGENT_COPYWRITING, get_gemini_llm
 
 
 def create_copywriting_expert() -> Agent:
@@ -100,9 +100,10 @@ def create_copywriting_expert() -> Agent:
         8. **Improvement Suggestions**: Provide specific text examples
 
         IMPORTANT:
-        - Write a clear TEXT DESCRIPTION with specific numbers and examples. NO JSON.
+        - Write a clear TEXT DESCRIPTION with specific numbers and examples into the
+          "analysis" field of the JSON output requested by the task, and fill in the score fields.
         - Respond in the SAME LANGUAGE as the ad content (English, German, etc.)""",
-        llm=get_gemini_llm(),
+        llm=get_gemini_llm(AGENT_COPYWRITING),
         verbose=True,
         allow_delegation=False,
     )
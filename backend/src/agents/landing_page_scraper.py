@@ -2,8 +2,9 @@
 
 from crewai import Agent
 from tools.playwright_scraping_tool import scrape_landing_page
+from tools.tiered_scraping_tool import scrape_landing_page_tiered
 from tools.trafilatura_parser_tool import parse_with_trafilatura
-from utils.llm_config import get_gemini_llm
+from utils.llm_config import AGENT_LANDING_PAGE, get_gemini_llm
 
 
 def create_landing_page_scraper() -> Agent:
@@ -23,14 +24,16 @@ def create_landing_page_scraper() -> Agent:
         - Lazy-Loading und dynamischen Inhalten
         - Verschiedenen CMS-Systemen und Frameworks
 
-        Du verwendest Playwright für komplexe Seiten und fällst auf trafilatura
-        zurück für statische Seiten. Du extrahierst sauber strukturierte Texte
-        ohne Boilerplate und Noise.
+        Du verwendest zuerst den "Tiered Landing Page Scraper": Er lädt die Seite
+        per schnellem HTTP-Abruf und startet Playwright nur, wenn die Seite
+        JavaScript-gerendert ist. Playwright und trafilatura direkt nutzt du
+        nur, wenn der Tiered Scraper fehlschlägt. Du extrahierst sauber
+        strukturierte Texte ohne Boilerplate und Noise.
 
         Bei Problemen gibst du klare Fehlermeldungen, damit andere Agents
         entsprechend reagieren können.""",
-        tools=[scrape_landing_page, parse_with_trafilatura],
-        llm=get_gemini_llm(),
+        tools=[scrape_landing_page_tiered, scrape_landing_page, parse_with_trafilatura],
+        llm=get_gemini_llm(AGENT_LANDING_PAGE),
         verbose=True,
         allow_delegation=False,
     )
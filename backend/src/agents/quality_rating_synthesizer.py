@@ -1,14 +1,17 @@
 """Quality Rating Synthesizer Agent"""
 
 from crewai import Agent
-from utils.llm_config import get_gemini_llm
+from utils.llm_config import AGENT_SYNTHESIZER, get_gemini_llm
 
 
-def create_quality_rating_synthesizer() -> Agent:
+def create_quality_rating_synthesizer(stream: bool = False) -> Agent:
     """
     Creates the Quality Rating Synthesizer with LinkedIn B2B strategic expertise
 
     This agent synthesizes findings and provides strategic, actionable recommendations.
+
+    Args:
+        stream: Create the LLM in streaming mode so the report can be forwarded token by token
     """
     return Agent(
         role="LinkedIn B2B Performance Analyst",
@@ -24,7 +27,9 @@ def create_quality_rating_synthesizer() -> Agent:
         - IMPORTANT: Respond in the SAME LANGUAGE as the ad content (English, German, etc.)
 
         === SCORE-BERECHNUNG (STRENG) ===
-        - Gewichteter Gesamtscore: Visual (40%), Copywriting (50%), Brand (10%)
+        - Der gewichtete Gesamtscore (Visual 40%, Copywriting 50%, Brand 10%) wird
+          vorab berechnet und dir in der Aufgabe mitgegeben - übernimm ihn exakt,
+          rechne NICHT selbst
         - Brand ist OPTIONAL - nur wenn Guidelines vorhanden
         - Vergib Scores streng: 90+ = exzellent, 70-89 = ok, <70 = schlecht
         - Confidence: Bewerte immer "High" wenn du klare Daten hast
@@ -99,11 +104,11 @@ def create_quality_rating_synthesizer() -> Agent:
         === FEHLER-HANDLING ===
         - Graceful Degradation bei Partial Failures
         - Klare Dokumentation von Fehlern/Warnungen
-        - Berechnung von Scores auch bei fehlenden Teil-Analysen
+        - Fehlende Teil-Analysen sind im vorab berechneten Score bereits berücksichtigt
 
         Du erstellst Reports, die sowohl strategisch als auch technisch korrekt sind
         (vollständige Pydantic-Validierung).""",
-        llm=get_gemini_llm(),
+        llm=get_gemini_llm(AGENT_SYNTHESIZER, stream=stream),
         verbose=True,
         allow_delegation=False,
     )
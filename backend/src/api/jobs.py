@@ -0,0 +1,542 @@
+"""Analysis Jobs backed by the shared Job Store
+
+The worker that accepts an upload runs the analysis in a background thread
+and writes every SSE event to the job store. Streams and status are served
+from the store, so any worker can answer them.
+
+Every SSE event carries its sequence number as the SSE `id`, so a client
+that loses the connection resumes with Last-Event-ID where it left off;
+the crew keeps running in the meantime. The store keeps the newest
+SSE_REPLAY_EVENTS events per job (see store.job_store), not counting the
+report_delta events of the streamed report.
+
+Configured via environment variables:
+    JOB_EVENTS_POLL_S:        Store poll interval of streams (default: 0.1)
+    JOB_CANCEL_POLL_S:        Poll interval of the cross-worker cancel flag (default: 1)
+    MAX_CONCURRENT_ANALYSES:  Analyses running in one worker at once (default: 4)
+    SSE_RECONNECT_GRACE_S:    Seconds a job bound to its stream survives a disconnect,
+                              waiting for the client to reconnect (default: 30, 0 = cancel at once)
+    SSE_RETRY_MS:             Reconnect delay suggested to clients (default: 2000)
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from typing import AsyncGenerator, Optional
+
+from store.job_store import (
+    REPLAY_EVENTS,
+    STATUS_CANCELLED,
+    STATUS_FAILED,
+    STATUS_RUNNING,
+    STATUS_SUCCEEDED,
+    TERMINAL_STATUSES,
+    get_job_store,
+    worker_id,
+)
+from utils.blob_store import blob_store
+from utils.cancellation import AnalysisCancelled, CancelToken, DeadlineExceeded, cancel_stats
+from utils.deadline import DEADLINE_EXCEEDED, Deadline
+from utils.logger import logger
+from utils.output_capture import capture_lines
+from utils.request_context import request_scope
+from utils.resource_tracker import RESOURCE_TRACKING, resource_tracker
+
+
+EVENTS_POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL_S", "0.1"))
+CANCEL_POLL_INTERVAL = float(os.getenv("JOB_CANCEL_POLL_S", "1"))
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", "4"))
+RECONNECT_GRACE_S = float(os.getenv("SSE_RECONNECT_GRACE_S", "30"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "2000"))
+
+# Trim the replay buffer every ~10% of its size, not on every event
+REPLAY_TRIM_EVERY = max(REPLAY_EVENTS // 10, 1)
+
+# params["mode"] of variant comparisons (see crew.comparison)
+MODE_COMPARE = "compare"
+COMPARE_MAX_VARIANTS = int(os.getenv("COMPARE_MAX_VARIANTS", "6"))
+# params["mode"] of carousel / multi-image ads (one ad, several cards)
+MODE_CAROUSEL = "carousel"
+CAROUSEL_MAX_CARDS = int(os.getenv("CAROUSEL_MAX_CARDS", "10"))
+
+# Analyses running in this worker at once; queued jobs wait for a slot
+_worker_slots = threading.BoundedSemaphore(MAX_CONCURRENT_ANALYSES)
+
+# Cancel tokens of the jobs queued or running in this worker
+_active_tokens: dict[str, CancelToken] = {}
+_active_lock = threading.Lock()
+
+
+class StreamStats:
+    """Process-wide counters of stream reconnects and how disconnects ended"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reconnects = 0
+        self.replay_gaps = 0
+        self.resumed_in_grace = 0
+        self.disconnect_cancels = 0
+
+    def record(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "reconnects": self.reconnects,
+                "replay_gaps": self.replay_gaps,
+                "resumed_in_grace": self.resumed_in_grace,
+                "disconnect_cancels": self.disconnect_cancels,
+            }
+
+
+stream_stats = StreamStats()
+
+
+class WorkerSlot:
+    """One analysis slot, released once the job's thread is done with it"""
+
+    def __init__(self):
+        self._held = False
+        self._lock = threading.Lock()
+
+    def acquire(self, token: CancelToken) -> bool:
+        """Wait for a free slot; False if the job was cancelled while waiting"""
+        while not token.cancelled:
+            if _worker_slots.acquire(timeout=0.5):
+                with self._lock:
+                    self._held = True
+                return True
+        return False
+
+    def release(self):
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        _worker_slots.release()
+
+
+def cancel_job(job_id: str, reason: str = "cancel requested"):
+    """
+    Cancel a job, wherever it runs
+
+    A job of this worker is cancelled immediately; the store flag reaches
+    jobs running in other workers within JOB_CANCEL_POLL_S.
+    """
+    with _active_lock:
+        token = _active_tokens.get(job_id)
+    if token is not None:
+        token.cancel(reason)
+    get_job_store().request_cancel(job_id)
+
+
+def _watch_cancel_flag(job_id: str, token: CancelToken, done: threading.Event):
+    """Turn the store's cancel flag (set by any worker) into a token cancel"""
+    store = get_job_store()
+    while not done.wait(CANCEL_POLL_INTERVAL):
+        try:
+            if store.is_cancel_requested(job_id):
+                token.cancel("cancel requested")
+                return
+        except Exception as e:
+            logger.warning("Cancel flag check failed", job_id=job_id, error=str(e))
+
+
+def _create_crew(ad_handles: list[str], params: dict, emit, token: CancelToken, deadline: Deadline):
+    """The crew for a job: a single ad, a carousel or a variant comparison (by params["mode"])"""
+    # Imported here to keep API startup fast
+    from crew.crew import AdQualityRaterCrew
+
+    callbacks = {
+        "on_report_delta": lambda chunk: emit({"type": "report_delta", "data": chunk}),
+        "on_report_reset": lambda: emit({"type": "report_reset"}),
+        "on_task_complete": lambda task_result: emit({"type": "task_result", "data": task_result}),
+    }
+    common = {
+        "landing_page_url": params["landing_page_url"],
+        "brand_guidelines": params.get("brand_guidelines"),
+        "target_audience": params.get("target_audience"),
+        "campaign_goal": params.get("campaign_goal"),
+        "cancel_token": token,
+        "deadline": deadline,
+    }
+    if params.get("mode") == MODE_COMPARE:
+        from crew.comparison import VariantComparisonCrew
+
+        return VariantComparisonCrew(
+            ad_urls=ad_handles,
+            variant_names=params.get("ad_filenames"),
+            on_variant_complete=lambda variant: emit({"type": "variant_result", "data": variant}),
+            on_log=lambda line: emit({"type": "log", "data": line}),
+            **callbacks,
+            **common,
+        )
+    card_urls = ad_handles if params.get("mode") == MODE_CAROUSEL else None
+    return AdQualityRaterCrew(ad_url=ad_handles[0], card_urls=card_urls, **callbacks, **common)
+
+
+def run_analysis_job(
+    job_id: str, ad_handles: list[str], params: dict, token: Optional[CancelToken] = None
+):
+    """
+    Run one analysis (or comparison) and record its events, status and result in the store
+
+    Args:
+        job_id: Job (and request) id, created via JobStore.create_job
+        ad_handles: Blob handles of the uploaded ad images (released afterwards);
+            one, 2..CAROUSEL_MAX_CARDS cards for mode "carousel", or
+            2..COMPARE_MAX_VARIANTS variants for mode "compare"
+        params: landing_page_url, brand_guidelines, target_audience, campaign_goal,
+            deadline_at, mode, ad_filename(s)
+        token: Cancel token (see cancel_job)
+    """
+    store = get_job_store()
+    token = token or CancelToken()
+    with _active_lock:
+        _active_tokens[job_id] = token
+    # Threads, processes and temp files this analysis leaves behind (see /debug/resources)
+    resource_usage = resource_tracker.begin(job_id) if RESOURCE_TRACKING else None
+
+    appended = itertools.count(1)
+    # Report deltas are kept on top of REPLAY_EVENTS, so log events can't push the report out
+    report_deltas = itertools.count(1)
+    kept_deltas = 0
+
+    def emit(event: dict):
+        nonlocal kept_deltas
+        store.append_event(job_id, event)
+        if event.get("type") == "report_delta":
+            kept_deltas = next(report_deltas)
+            return
+        # Bounded replay buffer - a client that falls further behind gets a replay_gap event
+        if REPLAY_EVENTS and next(appended) % REPLAY_TRIM_EVERY == 0:
+            try:
+                store.trim_events(job_id, REPLAY_EVENTS + kept_deltas)
+            except Exception as e:
+                logger.warning("Trimming job events failed", job_id=job_id, error=str(e))
+
+    # Held until kickoff returns - a cancelled run still occupies its thread until it
+    # notices, so an early release would let more than MAX_CONCURRENT_ANALYSES run
+    slot = WorkerSlot()
+    done = threading.Event()
+    threading.Thread(
+        target=_watch_cancel_flag,
+        args=(job_id, token, done),
+        name=f"cancel-watch-{job_id[:8]}",
+        daemon=True,
+    ).start()
+
+    # Hard stop at the deadline; stages shorten their own timeouts before that
+    deadline = Deadline(params["deadline_at"]) if params.get("deadline_at") else Deadline.after()
+    deadline_timer = threading.Timer(
+        deadline.remaining(), token.cancel, args=(DEADLINE_EXCEEDED, DeadlineExceeded)
+    )
+    deadline_timer.daemon = True
+    deadline_timer.start()
+
+    with request_scope(job_id, cancel_token=token, deadline=deadline) as request_ctx:
+        result_text: Optional[str] = None
+        error_msg: Optional[str] = None
+        scores: Optional[dict] = None
+        cancelled = False
+        started_at = time.time()
+        crew = None
+
+        try:
+            if not slot.acquire(token):
+                raise AnalysisCancelled(f"Analysis cancelled ({token.reason})")
+            store.update_job(job_id, status=STATUS_RUNNING, worker=worker_id())
+            emit({"type": "log", "data": "🚀 Starting analysis..."})
+
+            # CrewAI's verbose output of this thread becomes log events
+            with capture_lines(lambda line: emit({"type": "log", "data": line})):
+                ad_names = params.get("ad_filenames") or [
+                    params.get("ad_filename") or ad_handles[0]
+                ]
+                emit(
+                    {
+                        "type": "log",
+                        "data": f"📁 Ad file(s): {', '.join(name or '?' for name in ad_names)}",
+                    }
+                )
+                emit({"type": "log", "data": f"🌐 Landing page: {params['landing_page_url']}"})
+
+                # Create crew and start analysis
+                emit({"type": "log", "data": "🏗️ Creating crew..."})
+                crew = _create_crew(ad_handles, params, emit, token, deadline)
+                emit({"type": "log", "data": "✅ Crew created successfully"})
+
+                # Run the crew (this blocks) - now returns text
+                emit({"type": "log", "data": "⚙️ Running crew analysis..."})
+                result_text = str(crew.kickoff())
+                scores = crew.scores or None
+
+            if crew.partial:
+                emit({"type": "log", "data": "⏱️ Deadline reached - returning a partial report"})
+            logger.debug("Analysis finished", result_chars=len(result_text), partial=crew.partial)
+            emit(
+                {
+                    "type": "log",
+                    "data": f"✅ Analysis complete! Result length: {len(result_text)} chars",
+                }
+            )
+
+        except AnalysisCancelled:
+            cancelled = True
+            error_msg = f"Analysis cancelled ({token.reason})"
+            emit({"type": "log", "data": f"🛑 {error_msg}"})
+
+        except Exception as e:
+            error_msg = f"Crew execution error: {str(e)}"
+            error_trace = traceback.format_exc()
+
+            # Log the error with full traceback
+            logger.error("Crew execution error", error=str(e), traceback=error_trace)
+
+            emit({"type": "log", "data": f"❌ {error_msg}"})
+            emit({"type": "log", "data": f"Details: {error_trace[:500]}"})
+        finally:
+            done.set()
+            deadline_timer.cancel()
+            # Only now: the crew has stopped, whether finished, failed or cancelled
+            slot.release()
+            with _active_lock:
+                _active_tokens.pop(job_id, None)
+
+            emit({"type": "log", "data": "🏁 Crew execution finished"})
+
+            request_ctx.record("deadline_remaining_s", round(deadline.remaining(), 1))
+            if cancelled and not token.deadline_exceeded:
+                # What the cancellation saved, and how quickly the thread stopped
+                request_ctx.record("cancelled", 1)
+                request_ctx.record("tasks_completed", len(crew.task_results) if crew else 0)
+                if token.cancelled_at:
+                    request_ctx.record(
+                        "cancel_latency_ms", round((time.time() - token.cancelled_at) * 1000, 1)
+                    )
+                    request_ctx.record(
+                        "elapsed_before_cancel_s", round(token.cancelled_at - started_at, 2)
+                    )
+                snapshot = request_ctx.snapshot()
+                cancel_stats.record(
+                    tasks_skipped=int(snapshot.get("tasks_skipped", 0)),
+                    llm_calls_skipped=int(snapshot.get("gemini_calls_skipped", 0)),
+                )
+                logger.info(
+                    "Analysis cancelled", request_id=job_id, reason=token.reason, **snapshot
+                )
+            metrics = request_ctx.snapshot()
+
+            # Per-request metrics (Gemini throttling, retries, ...)
+            if metrics:
+                logger.info("Analysis metrics", request_id=job_id, **metrics)
+                emit({"type": "metrics", "data": metrics})
+
+            # Structured scores (machine-readable, weighted total computed in Python)
+            if scores:
+                emit({"type": "scores", "data": scores})
+
+            if result_text:
+                emit({"type": "result", "data": result_text})
+            else:
+                emit({"type": "error", "data": error_msg or "No result received from crew"})
+
+            if result_text:
+                status = STATUS_SUCCEEDED
+            elif cancelled:
+                status = STATUS_CANCELLED
+            else:
+                status = STATUS_FAILED
+
+            # Terminal status last - readers stop once they see it
+            store.update_job(
+                job_id,
+                status=status,
+                result=result_text,
+                error=error_msg,
+                scores=scores,
+                metrics=metrics,
+            )
+
+            # Drop this job's references to the uploads (the last one frees them)
+            for ad_handle in ad_handles:
+                blob_store.release(ad_handle)
+
+            # After the result is out - waits briefly for the job's threads to exit
+            if resource_usage is not None:
+                report = resource_tracker.end(resource_usage)
+                logger.debug("Analysis resources", request_id=job_id, **report)
+
+
+def start_analysis_job(job_id: str, ad_handles: list[str], params: dict) -> threading.Thread:
+    """Run an analysis in a background thread of this worker"""
+    token = CancelToken()
+    # Registered before the thread starts, so an immediate disconnect can cancel it
+    with _active_lock:
+        _active_tokens[job_id] = token
+    thread = threading.Thread(
+        target=run_analysis_job,
+        args=(job_id, ad_handles, params, token),
+        name=f"analysis-{job_id[:8]}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _cancel_unless_reconnected(job_id: str, reconnects_seen: int):
+    """Cancel a stream-bound job whose client did not come back within the grace period"""
+    try:
+        job = get_job_store().get_job(job_id)
+    except Exception as e:
+        logger.warning("Reconnect check failed", job_id=job_id, error=str(e))
+        return
+    if job is None or job["status"] in TERMINAL_STATUSES:
+        return
+    if int(job.get("reconnects") or 0) > reconnects_seen:
+        stream_stats.record(resumed_in_grace=1)
+        return
+    stream_stats.record(disconnect_cancels=1)
+    logger.info(
+        "Client did not reconnect, cancelling job", job_id=job_id, grace_s=RECONNECT_GRACE_S
+    )
+    cancel_job(job_id, "client disconnected")
+
+
+def _format_event(seq: int, event: dict, include_seq: bool) -> str:
+    if include_seq:
+        event = {**event, "seq": seq}
+    return f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+
+
+def _replay_gap(job: dict, after: int) -> Optional[str]:
+    """
+    Event telling a resuming client that events after `after` were trimmed
+
+    The client should drop its partial report; the final result event
+    carries the complete text.
+    """
+    trimmed = int(job.get("events_trimmed") or 0)
+    if after >= trimmed:
+        return None
+    stream_stats.record(replay_gaps=1)
+    logger.info(
+        "Resume point no longer buffered",
+        job_id=job["id"],
+        last_event_id=after,
+        oldest_kept=trimmed + 1,
+    )
+    gap = {"type": "replay_gap", "data": {"last_event_id": after, "events_trimmed": trimmed}}
+    return f"data: {json.dumps(gap)}\n\n"
+
+
+async def stream_job_events(
+    job_id: str,
+    after: int = 0,
+    include_seq: bool = False,
+    cancel_on_disconnect: bool = False,
+    reconnect: bool = False,
+) -> AsyncGenerator[str, None]:
+    """
+    Stream a job's events from the store as SSE
+
+    Args:
+        job_id: Job to follow
+        after: Only send events with a sequence number greater than this (Last-Event-ID)
+        include_seq: Also add the sequence number to each event's data (for resuming via ?after=)
+        cancel_on_disconnect: Cancel the job if the client goes away before it finished
+            and does not reconnect within SSE_RECONNECT_GRACE_S
+        reconnect: The client resumes an earlier stream (counted per job)
+
+    Yields:
+        SSE events with `id: <seq>`, with heartbeats while the job is idle
+    """
+    store = get_job_store()
+    if reconnect:
+        count = await asyncio.to_thread(store.record_reconnect, job_id)
+        stream_stats.record(reconnects=1)
+        logger.info("Client reconnected", job_id=job_id, last_event_id=after, reconnects=count)
+
+    job = await asyncio.to_thread(store.get_job, job_id)
+    if job is None:
+        yield f"data: {json.dumps({'type': 'error', 'data': 'Unknown or expired job'})}\n\n"
+        return
+    # A reconnect after this stream started means the client is still there
+    reconnects_seen = int(job.get("reconnects") or 0)
+
+    finished = False
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        # Also on a first connect (after=0) to a job whose early events are gone
+        gap = _replay_gap(job, after)
+        if gap:
+            yield gap
+        async for chunk in _follow_job_events(job_id, after, include_seq):
+            yield chunk
+        finished = True
+    finally:
+        # Starlette cancels the generator when the client disconnects
+        if cancel_on_disconnect and not finished:
+            if RECONNECT_GRACE_S <= 0:
+                logger.info("Client disconnected, cancelling job", job_id=job_id)
+                cancel_job(job_id, "client disconnected")
+            else:
+                logger.info(
+                    "Client disconnected, waiting for reconnect",
+                    job_id=job_id,
+                    grace_s=RECONNECT_GRACE_S,
+                )
+                timer = threading.Timer(
+                    RECONNECT_GRACE_S, _cancel_unless_reconnected, args=(job_id, reconnects_seen)
+                )
+                timer.daemon = True
+                timer.start()
+
+
+async def _follow_job_events(
+    job_id: str, after: int, include_seq: bool, read_limit: int = 500
+) -> AsyncGenerator[str, None]:
+    """Poll the store for new events until the job reaches a terminal status"""
+    store = get_job_store()
+
+    behind = False
+    while True:
+        if behind:
+            # The writer may have trimmed past this reader
+            job = await asyncio.to_thread(store.get_job, job_id)
+            gap = _replay_gap(job, after) if job else None
+            if gap:
+                yield gap
+        events = await asyncio.to_thread(store.read_events, job_id, after, read_limit)
+        behind = len(events) == read_limit
+        for seq, event in events:
+            after = seq
+            yield _format_event(seq, event, include_seq)
+        if events:
+            continue
+
+        job = await asyncio.to_thread(store.get_job, job_id)
+        if job is None:
+            yield f"data: {json.dumps({'type': 'error', 'data': 'Unknown or expired job'})}\n\n"
+            break
+        if job["status"] in TERMINAL_STATUSES:
+            # Events written between the last read and the status update
+            while True:
+                events = await asyncio.to_thread(store.read_events, job_id, after)
+                if not events:
+                    break
+                for seq, event in events:
+                    after = seq
+                    yield _format_event(seq, event, include_seq)
+            break
+
+        # Send heartbeat (no id - it doesn't move the resume point)
+        yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
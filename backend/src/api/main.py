@@ -1,19 +1,24 @@
 """FastAPI Main Application"""
 
+import time
+
+_import_started = time.perf_counter()
+
 import warnings
 # Suppress Pydantic deprecation warnings from third-party libraries
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Header, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from typing import Optional, AsyncGenerator
 from datetime import datetime
 import sys
 import os
 import json
 import asyncio
-import tempfile
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables from project root .env file
@@ -25,13 +30,51 @@ load_dotenv(env_path)
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from crew.crew import AdQualityRaterCrew
-from utils.logger import logger
+from api.warmup import start_warmup, warmup_state
+from api.jobs import (
+    CAROUSEL_MAX_CARDS,
+    COMPARE_MAX_VARIANTS,
+    MODE_CAROUSEL,
+    MODE_COMPARE,
+    cancel_job,
+    start_analysis_job,
+    stream_job_events,
+    stream_stats,
+)
+from store.job_store import STATUS_QUEUED, TERMINAL_STATUSES, get_job_store
+from utils import extraction_pool, output_capture
+from utils.cancellation import cancel_stats
+from utils.blob_store import BlobStoreFullError, blob_store
+from utils.deadline import Deadline
+from utils.image_fetch import sniff_image_mime
+from utils.logger import correlation_scope, logger
+from utils.resource_tracker import RESOURCE_TRACKING, resource_tracker
+
+warmup_state.record_import(_import_started)
+
+# Unauthenticated diagnostics (thread names, request ids) - only for local debugging and soak runs
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the job store, warm up in the background, stop workers on shutdown"""
+    # Route crew output per thread and drop expired jobs
+    output_capture.install()
+    deleted = await asyncio.to_thread(get_job_store().cleanup)
+    if deleted:
+        logger.info("Removed expired jobs", count=deleted)
+    # Doesn't block startup - /health answers right away, /ready once this is done
+    start_warmup()
+    yield
+    extraction_pool.shutdown()
+
 
 app = FastAPI(
     title="Ads Quality Rater API",
     version="1.0.0",
     description="KI-basierte Bewertung von Ad-LP-Kohärenz und Markenkonformität",
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -41,9 +84,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # The browser needs the job id to resume a dropped stream
+    expose_headers=["X-Job-ID", "X-Request-ID"],
 )
 
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag the request's log records with X-Request-ID (or a new id) and echo it back"""
+    correlation_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with correlation_scope(correlation_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = correlation_id
+    return response
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -60,28 +115,92 @@ async def health_check():
             "services": {
                 "gemini": gemini_status,
             },
+            "cancellations": cancel_stats.snapshot(),
+            "blobs": blob_store.snapshot(),
+            "extraction": extraction_pool.stats(),
+            "streams": stream_stats.snapshot(),
+            "warmup": warmup_state.state,
+            "logging": logger.stats(),
         }
     except Exception as e:
         logger.error("Health check failed", error=str(e))
         return {"status": "unhealthy", "error": str(e)}
 
 
-@app.post("/api/v1/analyze/stream")
-async def analyze_ad_stream(
-    landing_page_url: str = Form(...),
-    ad_file: UploadFile = File(...),
-    brand_guidelines: Optional[str] = Form(None),
-    target_audience: Optional[str] = Form(None),
-    campaign_goal: Optional[str] = Form(None),
-):
+@app.get("/ready")
+async def readiness_check():
     """
-    Streaming endpoint: Start Ad Quality Analysis with real-time logs
+    Readiness endpoint: 200 once the warm-up finished, 503 while it runs
+
+    Includes the import time of the API module and the timing of each
+    warm-up step. A degraded warm-up (a step failed) still counts as ready.
+    """
+    snapshot = warmup_state.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+
+@app.get("/debug/resources")
+async def debug_resources():
+    """
+    Resource accounting: per-analysis threads, child processes, temp files
+    and memory, re-checked live, plus the process' growth since warm-up
 
-    Requires an uploaded ad image file (ad_file) and landing page URL
-    Returns Server-Sent Events with logs and final result
+    Only served with DEBUG_ENDPOINTS=true.
+    """
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not RESOURCE_TRACKING:
+        raise HTTPException(
+            status_code=404, detail="Resource tracking is disabled (RESOURCE_TRACKING)"
+        )
+    return await asyncio.to_thread(resource_tracker.snapshot)
+
+
+async def _read_ad_upload(ad_file: UploadFile) -> tuple[bytes, str]:
+    """
+    Read and validate one uploaded ad image
+
+    Returns:
+        (content, MIME type sniffed from the content)
+    """
+    # Validate file size (max 10MB)
+    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    content = await ad_file.read()
+
+    if len(content) > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size is 10MB, got {len(content) / (1024*1024):.1f}MB",
+        )
+
+    # Validate it's actually an image
+    if not ad_file.content_type or not ad_file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=400, detail=f"File must be an image, got {ad_file.content_type}"
+        )
+
+    return content, sniff_image_mime(content[:32]) or ad_file.content_type
+
+
+async def _prepare_analysis(
+    landing_page_url: str,
+    ad_files: list[UploadFile],
+    brand_guidelines: Optional[str],
+    target_audience: Optional[str],
+    campaign_goal: Optional[str],
+    deadline_seconds: Optional[float],
+    mode: Optional[str] = None,
+) -> tuple[str, list[str], dict]:
+    """
+    Validate an analysis request, save the uploads and register the job
+
+    The deadline starts now, so upload handling and queueing count against it.
+
+    Returns:
+        (job_id, blob handles of the ad images, job params)
     """
     # Validate ad_file is provided
-    if not ad_file:
+    if not ad_files:
         raise HTTPException(status_code=400, detail="ad_file (uploaded image) is required")
 
     # Validate landing_page_url is accessible
@@ -96,189 +215,282 @@ async def analyze_ad_stream(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="brand_guidelines must be valid JSON")
 
-    # Validate file size (max 10MB)
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    content = await ad_file.read()
+    uploads = [await _read_ad_upload(ad_file) for ad_file in ad_files]
 
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is 10MB, got {len(content) / (1024*1024):.1f}MB")
+    job_id = str(uuid.uuid4())
+    deadline = Deadline.after(deadline_seconds)
 
-    # Validate it's actually an image
-    if not ad_file.content_type or not ad_file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail=f"File must be an image, got {ad_file.content_type}")
-
-    # Save to temporary file
-    file_extension = os.path.splitext(ad_file.filename or "image.jpg")[1] or ".jpg"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-        temp_file.write(content)
-        temp_file_path = temp_file.name
-
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """Generate SSE events with logs and result"""
-        import threading
-        import queue
-        import sys
-        import time
-
-        log_queue = queue.Queue()
-        result_holder = {"result": None, "error": None}
-        crew_running = threading.Event()
-
-        def run_crew():
-            """Run crew in thread and capture ALL output"""
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-
-            try:
-                # Log start BEFORE redirecting output so it definitely appears
-                log_queue.put({"type": "log", "data": "🚀 Starting analysis..."})
-
-                # Capture console output periodically
-                from io import StringIO
-
-                # Create string buffer for output
-                output_buffer = StringIO()
-
-                # Redirect stdout/stderr
-                sys.stdout = output_buffer
-                sys.stderr = output_buffer
-
-                crew_running.set()
-
-                log_queue.put({"type": "log", "data": f"📁 Ad file: {temp_file_path}"})
-                log_queue.put({"type": "log", "data": f"🌐 Landing page: {landing_page_url}"})
-
-                # Create crew and start analysis
-                log_queue.put({"type": "log", "data": "🏗️ Creating crew..."})
-                crew = AdQualityRaterCrew(
-                    ad_url=temp_file_path,
-                    landing_page_url=landing_page_url,
-                    brand_guidelines=parsed_guidelines,
-                    target_audience=target_audience,
-                    campaign_goal=campaign_goal,
-                )
-                log_queue.put({"type": "log", "data": "✅ Crew created successfully"})
-
-                # Start a thread to periodically flush output
-                last_position = [0]  # Use list to make it mutable in closure
-                stop_flushing = threading.Event()
-
-                def flush_output():
-                    while not stop_flushing.is_set():
-                        try:
-                            output_buffer.seek(last_position[0])
-                            new_content = output_buffer.read()
-                            if new_content:
-                                # Split into lines and send each
-                                for line in new_content.splitlines():
-                                    if line.strip():
-                                        log_queue.put({"type": "log", "data": line})
-                                last_position[0] = output_buffer.tell()
-                            time.sleep(0.1)  # Check every 100ms
-                        except:
-                            pass
-
-                flush_thread = threading.Thread(target=flush_output, daemon=True)
-                flush_thread.start()
-
-                # Run the crew (this blocks) - now returns text
-                log_queue.put({"type": "log", "data": "⚙️ Running crew analysis..."})
-                result_text = crew.kickoff()
-
-                # Debug logging
-                print(f"[DEBUG] Crew returned result type: {type(result_text)}", file=old_stderr)
-                print(f"[DEBUG] Result length: {len(str(result_text))} chars", file=old_stderr)
-                print(f"[DEBUG] First 100 chars: {str(result_text)[:100]}", file=old_stderr)
-
-                log_queue.put({"type": "log", "data": f"✅ Analysis complete! Result length: {len(str(result_text))} chars"})
-                result_holder["result"] = str(result_text)
-
-                # Stop flushing thread and get final output
-                stop_flushing.set()
-                flush_thread.join(timeout=1)
-
-                # Get any remaining output
-                output_buffer.seek(last_position[0])
-                remaining = output_buffer.read()
-                if remaining:
-                    for line in remaining.splitlines():
-                        if line.strip():
-                            log_queue.put({"type": "log", "data": line})
-
-                # Restore stdout/stderr
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-
-            except Exception as e:
-                import traceback
-                error_msg = f"Crew execution error: {str(e)}"
-                error_trace = traceback.format_exc()
-
-                # Restore stdout/stderr first so we can log properly
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-
-                # Log the error with full traceback
-                print(f"[ERROR] {error_msg}", file=sys.stderr)
-                print(f"[TRACEBACK] {error_trace}", file=sys.stderr)
-
-                log_queue.put({"type": "log", "data": f"❌ {error_msg}"})
-                log_queue.put({"type": "log", "data": f"Details: {error_trace[:500]}"})
-                result_holder["error"] = error_msg
-            finally:
-                crew_running.clear()
-                log_queue.put({"type": "log", "data": "🏁 Crew execution finished"})
-                # Don't send "done" here - we'll send it after we've sent the result
-                # log_queue.put({"type": "done"})
-
-        # Start crew in background thread
-        crew_thread = threading.Thread(target=run_crew, daemon=True)
-        crew_thread.start()
-
-        # Stream logs as they come
-        while True:
-            try:
-                event = log_queue.get(timeout=0.1)
-
-                # Send the event
-                yield f"data: {json.dumps(event)}\n\n"
-
-            except queue.Empty:
-                # Check if crew is done
-                if not crew_running.is_set() and not crew_thread.is_alive():
-                    # Crew has finished, send final result
-                    if result_holder["result"]:
-                        result_text = result_holder["result"]
-                        yield f"data: {json.dumps({'type': 'result', 'data': result_text})}\n\n"
-                    elif result_holder["error"]:
-                        yield f"data: {json.dumps({'type': 'error', 'data': result_holder['error']})}\n\n"
-                    else:
-                        yield f"data: {json.dumps({'type': 'error', 'data': 'No result received from crew'})}\n\n"
-                    break
-
-                # Send heartbeat
-                yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-                await asyncio.sleep(0.1)
-
-        crew_thread.join(timeout=1)
-
-        # Cleanup temp file after streaming is complete
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.info("Cleaned up temp file", path=temp_file_path)
-            except Exception as e:
-                logger.warning("Failed to cleanup temp file", path=temp_file_path, error=str(e))
-
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+    # Keep the uploads in memory (the accepting worker runs the job); the job releases them
+    ad_handles: list[str] = []
+    try:
+        for content, mime_type in uploads:
+            ad_handles.append(blob_store.put(content, mime_type))
+    except BlobStoreFullError as e:
+        for ad_handle in ad_handles:
+            blob_store.release(ad_handle)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    params = {
+        "landing_page_url": landing_page_url,
+        "brand_guidelines": parsed_guidelines,
+        "target_audience": target_audience,
+        "campaign_goal": campaign_goal,
+        "ad_filename": ad_files[0].filename,
+        "deadline_at": deadline.expires_at,
+    }
+    if mode in (MODE_COMPARE, MODE_CAROUSEL):
+        params["mode"] = mode
+        params["ad_filenames"] = [ad_file.filename for ad_file in ad_files]
+    try:
+        await asyncio.to_thread(get_job_store().create_job, job_id, params)
+    except Exception:
+        for ad_handle in ad_handles:
+            blob_store.release(ad_handle)
+        raise
+    return job_id, ad_handles, params
+
+
+def _sse_response(
+    events: AsyncGenerator[str, None], job_id: Optional[str] = None
+) -> StreamingResponse:
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+    }
+    if job_id:
+        headers["X-Job-ID"] = job_id
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+
+def _resume_point(last_event_id: Optional[str], after: int) -> int:
+    """Sequence number to resume after: the Last-Event-ID header, else ?after="""
+    if last_event_id is None:
+        return after
+    try:
+        return int(last_event_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Last-Event-ID must be an event id of this stream"
+        )
+
+
+def _card_mode(ad_files: list[UploadFile]) -> Optional[str]:
+    """Several ad_file parts are the cards of one carousel / multi-image ad"""
+    if len(ad_files) <= 1:
+        return None
+    if len(ad_files) > CAROUSEL_MAX_CARDS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"A carousel has at most {CAROUSEL_MAX_CARDS} cards (ad_file parts), "
+                f"got {len(ad_files)}"
+            ),
+        )
+    return MODE_CAROUSEL
+
+
+@app.post("/api/v1/analyze/stream")
+async def analyze_ad_stream(
+    landing_page_url: str = Form(...),
+    ad_file: list[UploadFile] = File(...),
+    brand_guidelines: Optional[str] = Form(None),
+    target_audience: Optional[str] = Form(None),
+    campaign_goal: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
+):
+    """
+    Streaming endpoint: Start Ad Quality Analysis with real-time logs
+
+    Requires an uploaded ad image file (ad_file) and landing page URL. Repeat
+    ad_file (2 to CAROUSEL_MAX_CARDS times, in swipe order) for a carousel /
+    multi-image ad: its cards are analysed together, with a note per card.
+    Optional deadline_seconds bounds the whole analysis (default: ANALYSIS_DEADLINE_S);
+    if it runs out, a partial report is returned.
+    Returns Server-Sent Events with logs, a task_result event as each task
+    finishes, incremental report_delta events while the final report is
+    written, and the complete result. The X-Job-ID header and the event ids
+    let a client resume a dropped stream via GET /api/v1/analyze/stream/{job_id}
+    """
+    job_id, ad_handles, params = await _prepare_analysis(
+        landing_page_url,
+        ad_file,
+        brand_guidelines,
+        target_audience,
+        campaign_goal,
+        deadline_seconds,
+        mode=_card_mode(ad_file),
+    )
+    start_analysis_job(job_id, ad_handles, params)
+    # The analysis is bound to this connection - closing the tab cancels it
+    # (unless the client reconnects within SSE_RECONNECT_GRACE_S)
+    return _sse_response(stream_job_events(job_id, cancel_on_disconnect=True), job_id)
+
+
+@app.get("/api/v1/analyze/stream/{job_id}")
+async def resume_analysis_stream(
+    job_id: str,
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Resume a dropped analysis or comparison stream
+
+    Replays the events after Last-Event-ID (header, as sent by EventSource;
+    ?after= for clients that can't set it) and continues live. The job keeps
+    its bond to the connection: if this stream drops too and the client
+    doesn't return within SSE_RECONNECT_GRACE_S, the job is cancelled.
+    """
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    after = _resume_point(last_event_id, after)
+    return _sse_response(
+        stream_job_events(job_id, after=after, cancel_on_disconnect=True, reconnect=True), job_id
+    )
+
+
+@app.post("/api/v1/jobs", status_code=202)
+async def create_analysis_job(
+    landing_page_url: str = Form(...),
+    ad_file: list[UploadFile] = File(...),
+    brand_guidelines: Optional[str] = Form(None),
+    target_audience: Optional[str] = Form(None),
+    campaign_goal: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
+):
+    """
+    Start an analysis without holding the connection open
+
+    Status and events can then be fetched from any worker. Several ad_file
+    parts are analysed as one carousel (see /api/v1/analyze/stream).
+    """
+    job_id, ad_handles, params = await _prepare_analysis(
+        landing_page_url,
+        ad_file,
+        brand_guidelines,
+        target_audience,
+        campaign_goal,
+        deadline_seconds,
+        mode=_card_mode(ad_file),
+    )
+    start_analysis_job(job_id, ad_handles, params)
+    return {
+        "job_id": job_id,
+        "status": STATUS_QUEUED,
+        "status_url": f"/api/v1/jobs/{job_id}",
+        "events_url": f"/api/v1/jobs/{job_id}/events",
+    }
+
+
+def _check_variant_count(ad_files: list[UploadFile]):
+    if not 2 <= len(ad_files) <= COMPARE_MAX_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A comparison needs 2 to {COMPARE_MAX_VARIANTS} ad_files, got {len(ad_files)}",
+        )
+
+
+@app.post("/api/v1/compare/stream")
+async def compare_variants_stream(
+    landing_page_url: str = Form(...),
+    ad_files: list[UploadFile] = File(...),
+    brand_guidelines: Optional[str] = Form(None),
+    target_audience: Optional[str] = Form(None),
+    campaign_goal: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
+):
+    """
+    Streaming endpoint: Compare 2 to COMPARE_MAX_VARIANTS creative variants for one landing page
+
+    The landing page is scraped once; visual, copy and brand run per variant
+    (concurrently), followed by one ranked comparison report. Besides the events
+    of /api/v1/analyze/stream, a variant_result event is sent per finished
+    variant; task_result events carry the variant label and the scores event
+    holds per-variant scores and the ranking.
+    """
+    _check_variant_count(ad_files)
+    job_id, ad_handles, params = await _prepare_analysis(
+        landing_page_url,
+        ad_files,
+        brand_guidelines,
+        target_audience,
+        campaign_goal,
+        deadline_seconds,
+        mode=MODE_COMPARE,
     )
+    start_analysis_job(job_id, ad_handles, params)
+    return _sse_response(stream_job_events(job_id, cancel_on_disconnect=True), job_id)
+
+
+@app.post("/api/v1/compare", status_code=202)
+async def create_comparison_job(
+    landing_page_url: str = Form(...),
+    ad_files: list[UploadFile] = File(...),
+    brand_guidelines: Optional[str] = Form(None),
+    target_audience: Optional[str] = Form(None),
+    campaign_goal: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
+):
+    """Start a variant comparison as a job (status and events via /api/v1/jobs/{job_id})"""
+    _check_variant_count(ad_files)
+    job_id, ad_handles, params = await _prepare_analysis(
+        landing_page_url,
+        ad_files,
+        brand_guidelines,
+        target_audience,
+        campaign_goal,
+        deadline_seconds,
+        mode=MODE_COMPARE,
+    )
+    start_analysis_job(job_id, ad_handles, params)
+    return {
+        "job_id": job_id,
+        "status": STATUS_QUEUED,
+        "status_url": f"/api/v1/jobs/{job_id}",
+        "events_url": f"/api/v1/jobs/{job_id}/events",
+    }
+
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Job status, and result, scores and metrics once finished"""
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def stream_analysis_job(
+    job_id: str, after: int = 0, last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream a job's events (SSE) from the shared store
+
+    Each event carries its sequence number (SSE id and "seq"); reconnect
+    with Last-Event-ID or ?after=<seq> to resume without duplicates.
+    """
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    resumed = last_event_id is not None
+    after = _resume_point(last_event_id, after)
+    return _sse_response(
+        stream_job_events(job_id, after=after, include_seq=True, reconnect=resumed), job_id
+    )
+
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    """Cancel a queued or running job (from any worker)"""
+    job = await asyncio.to_thread(get_job_store().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in TERMINAL_STATUSES:
+        return {"job_id": job_id, "status": job["status"], "cancelled": False}
+    await asyncio.to_thread(cancel_job, job_id, "cancelled by client")
+    return {"job_id": job_id, "status": job["status"], "cancelled": True}
 
 
 @app.get("/")
@@ -0,0 +1,164 @@
+"""Application Warm-Up
+
+The API module only imports what /health and the job endpoints need, so a
+new worker answers within milliseconds. The heavy parts - CrewAI, the agents
+and tools, the LLM clients, the extraction workers and Chromium - are loaded
+by a background warm-up started from the app lifespan. /ready reports when
+it is done; an analysis that arrives earlier still works, it just pays the
+cold start itself.
+
+Configured via environment variables:
+    WARMUP_ENABLED:   Run the warm-up at startup (default: true)
+    WARMUP_BROWSER:   Launch Chromium once during warm-up (default: true)
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from utils.logger import logger
+from utils.resource_tracker import RESOURCE_TRACKING, resource_tracker
+
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_BROWSER = os.getenv("WARMUP_BROWSER", "true").lower() == "true"
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_READY = "ready"
+STATE_DEGRADED = "degraded"
+STATE_DISABLED = "disabled"
+
+
+class WarmupState:
+    """Progress and per-step timings of the warm-up (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.state = STATE_PENDING
+        self.import_ms: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def record_import(self, started: float):
+        """Record how long the API module took to import (perf_counter start)"""
+        self.import_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def run_step(self, name: str, step: Callable[[], None]):
+        """Run one warm-up step; failures are recorded, not raised"""
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            with self._lock:
+                self.errors[name] = str(e)
+            logger.warning("Warm-up step failed", step=name, error=str(e))
+        finally:
+            with self._lock:
+                self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def start(self):
+        with self._lock:
+            self.state = STATE_RUNNING
+            self.started_at = time.time()
+
+    def finish(self, state: Optional[str] = None):
+        with self._lock:
+            self.state = state or (STATE_DEGRADED if self.errors else STATE_READY)
+            self.finished_at = time.time()
+        self._done.set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total_ms = None
+            if self.started_at is not None and self.finished_at is not None:
+                total_ms = round((self.finished_at - self.started_at) * 1000, 1)
+            return {
+                "state": self.state,
+                "ready": self._done.is_set(),
+                "import_ms": self.import_ms,
+                "warmup_ms": total_ms,
+                "steps_ms": dict(self.steps),
+                "errors": dict(self.errors),
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _import_crew():
+    """CrewAI, the agents and the tools (playwright, google-genai, litellm)"""
+    import crew.comparison  # noqa: F401
+    import crew.crew  # noqa: F401
+
+
+def _build_llm_clients():
+    """One LLM per agent profile - primes litellm and the per-model rate limiters"""
+    from utils import llm_config
+
+    if not os.getenv("GEMINI_API_KEY"):
+        raise ValueError("GEMINI_API_KEY not set - LLM clients are built on first use")
+    for agent in llm_config.DEFAULT_PROFILES:
+        llm_config.get_gemini_llm(agent)
+
+    from tools.gemini_vision_tool import get_gemini_client
+
+    get_gemini_client()
+
+
+def _start_http_client():
+    from utils.http_pool import get_async_client, run_sync
+
+    run_sync(get_async_client)
+
+
+def _start_extraction_workers():
+    """Spawn the worker processes (each imports trafilatura once)"""
+    from utils.extraction_pool import extract_text
+
+    extract_text("<html><body><p>warm-up</p></body></html>")
+
+
+def _launch_browser():
+    """Launch and close Chromium once, so the first render doesn't load it cold"""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        browser.close()
+
+
+def _run_warmup():
+    warmup_state.start()
+    warmup_state.run_step("import_crew", _import_crew)
+    warmup_state.run_step("llm_clients", _build_llm_clients)
+    warmup_state.run_step("http_client", _start_http_client)
+    warmup_state.run_step("extraction_workers", _start_extraction_workers)
+    if WARMUP_BROWSER:
+        warmup_state.run_step("browser", _launch_browser)
+    warmup_state.finish()
+    logger.info("Warm-up finished", **warmup_state.snapshot())
+    _mark_resource_baseline()
+
+
+def _mark_resource_baseline():
+    """Pools and clients started so far are part of the baseline, not leaks"""
+    if RESOURCE_TRACKING:
+        resource_tracker.mark_baseline()
+
+
+def start_warmup():
+    """Start the warm-up in a background thread (marks ready at once if disabled)"""
+    if not WARMUP_ENABLED:
+        warmup_state.finish(STATE_DISABLED)
+        _mark_resource_baseline()
+        return
+    threading.Thread(target=_run_warmup, name="warmup", daemon=True).start()
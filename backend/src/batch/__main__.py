@@ -0,0 +1,101 @@
+"""Command-Line Entry Point of the Batch Runner
+
+Usage (from backend/src):
+    python -m batch manifest.jsonl --output results.jsonl --workers 4
+    python -m batch ads/ --landing-page-url https://example.com --output results.jsonl
+
+Run the same command again to resume an interrupted run.
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m batch",
+        description="Run ad quality analyses over a manifest without the API server",
+    )
+    parser.add_argument("manifest", help="JSONL or CSV manifest, or a directory of ad images")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=int(os.getenv("BATCH_WORKERS", "2")),
+        help="Analyses in parallel (default: BATCH_WORKERS or 2)",
+    )
+    parser.add_argument(
+        "--deadline-s", type=float, help="Budget per analysis (default: ANALYSIS_DEADLINE_S)"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="Run items again whose last attempt failed"
+    )
+    parser.add_argument(
+        "--max-tasks-per-child",
+        type=int,
+        default=int(os.getenv("BATCH_MAX_TASKS_PER_CHILD", "50")),
+        help="Replace a worker process after this many analyses (default: 50, 0 = never)",
+    )
+    parser.add_argument("--log-dir", help="Write each item's crew output to <log-dir>/<id>.log")
+    parser.add_argument("--landing-page-url", help="Default landing page for items without one")
+    parser.add_argument("--target-audience", help="Default target audience")
+    parser.add_argument("--campaign-goal", help="Default campaign goal")
+    parser.add_argument(
+        "--brand-guidelines", help="Default brand guidelines (JSON string or .json file)"
+    )
+    args = parser.parse_args(argv)
+
+    # Same .env as the API server (project root)
+    env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".env"))
+    load_dotenv(env_path)
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+    from batch.runner import ManifestError, read_manifest, run_batch
+
+    brand_guidelines = args.brand_guidelines
+    if brand_guidelines and brand_guidelines.endswith(".json"):
+        brand_guidelines = os.path.abspath(brand_guidelines)
+    defaults = {
+        "landing_page_url": args.landing_page_url,
+        "target_audience": args.target_audience,
+        "campaign_goal": args.campaign_goal,
+        "brand_guidelines": brand_guidelines,
+    }
+    try:
+        items = read_manifest(args.manifest, defaults)
+    except ManifestError as e:
+        print(f"[ERROR] {str(e)}", file=sys.stderr)
+        return 2
+    if not items:
+        print("[batch] Manifest has no items")
+        return 0
+
+    workers = max(1, args.workers)
+    print(f"[batch] {len(items)} items, {workers} worker(s) → {args.output}")
+    summary = run_batch(
+        items,
+        output_path=args.output,
+        checkpoint_path=args.checkpoint,
+        workers=workers,
+        deadline_s=args.deadline_s,
+        retry_failed=args.retry_failed,
+        max_tasks_per_child=args.max_tasks_per_child or None,
+        log_dir=args.log_dir,
+        env_path=env_path,
+    )
+    print(
+        f"[batch] Finished: {summary['succeeded']} succeeded, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped (already done)"
+    )
+    if summary["interrupted"]:
+        return 130
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,521 @@
+"""Offline Batch Runner
+
+Runs AdQualityRaterCrew over a manifest of creatives and landing pages
+without the API server. Analyses run in a process pool; each result is
+appended to a JSONL file as soon as it finishes and its id to a checkpoint
+file, so an interrupted run picks up where it stopped when started again
+with the same arguments.
+
+Manifest formats:
+    items.jsonl   One JSON object per line
+    items.csv     Header row with the same field names
+    directory/    Every image in it; landing_page_url etc. from a sidecar
+                  <image stem>.json or --landing-page-url
+
+Fields: ad (path or URL of the creative, required), landing_page_url
+(required), id, brand_guidelines (object, JSON string or path to a .json
+file), target_audience, campaign_goal. Relative paths are resolved against
+the manifest's directory. Without an id, one is derived from ad and
+landing_page_url.
+
+Gemini rate limits are per process, so GEMINI_RPM and GEMINI_TPM are
+divided among the workers.
+"""
+
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+
+from store.job_store import STATUS_FAILED, STATUS_SUCCEEDED, worker_id
+from utils.deadline import Deadline
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+ITEM_FIELDS = (
+    "id",
+    "ad",
+    "landing_page_url",
+    "brand_guidelines",
+    "target_audience",
+    "campaign_goal",
+)
+
+# Completions the throughput (and ETA) is averaged over
+RATE_WINDOW = 50
+
+
+class ManifestError(ValueError):
+    """Raised for unreadable manifests or items missing required fields"""
+
+
+# ----------------------------------------------------------------------------
+# Manifest
+# ----------------------------------------------------------------------------
+
+
+def _item_id(ad: str, landing_page_url: str) -> str:
+    return hashlib.sha1(f"{ad}\n{landing_page_url}".encode("utf-8")).hexdigest()[:16]
+
+
+def _resolve_path(value: str, base_dir: str) -> str:
+    """Make relative file paths absolute (URLs and data URLs stay as they are)"""
+    if value.startswith(("http://", "https://", "data:")) or os.path.isabs(value):
+        return value
+    return os.path.abspath(os.path.join(base_dir, value))
+
+
+def _load_guidelines(value, base_dir: str) -> Optional[dict]:
+    if not value:
+        return None
+    if isinstance(value, dict):
+        return value
+    if value.endswith(".json"):
+        with open(_resolve_path(value, base_dir), encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+def _normalize(raw: dict, base_dir: str, defaults: dict, line: str) -> dict:
+    """Fill defaults, resolve paths and check required fields of one item"""
+    item = {field: raw.get(field) or defaults.get(field) for field in ITEM_FIELDS}
+    if not item["ad"] or not item["landing_page_url"]:
+        raise ManifestError(f"{line}: 'ad' and 'landing_page_url' are required")
+    item["ad"] = _resolve_path(str(item["ad"]), base_dir)
+    try:
+        item["brand_guidelines"] = _load_guidelines(item["brand_guidelines"], base_dir)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ManifestError(f"{line}: invalid brand_guidelines ({str(e)})")
+    item["id"] = str(item["id"] or _item_id(item["ad"], item["landing_page_url"]))
+    return item
+
+
+def _read_directory(path: str, defaults: dict) -> Iterator[dict]:
+    for name in sorted(os.listdir(path)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in IMAGE_EXTENSIONS:
+            continue
+        raw = {"ad": name}
+        sidecar = os.path.join(path, f"{stem}.json")
+        if os.path.exists(sidecar):
+            with open(sidecar, encoding="utf-8") as f:
+                raw.update(json.load(f))
+        yield _normalize(raw, path, defaults, name)
+
+
+def read_manifest(path: str, defaults: Optional[dict] = None) -> list[dict]:
+    """
+    Load and validate all items of a manifest
+
+    Args:
+        path: JSONL or CSV file, or a directory of images
+        defaults: Field values for items that don't set them (e.g. landing_page_url)
+
+    Returns:
+        Items with id, ad, landing_page_url, brand_guidelines, target_audience,
+        campaign_goal - duplicates of an id are dropped
+
+    Raises:
+        ManifestError: If the manifest can't be read or an item is invalid
+    """
+    defaults = defaults or {}
+    if os.path.isdir(path):
+        items = list(_read_directory(path, defaults))
+    else:
+        base_dir = os.path.dirname(os.path.abspath(path))
+        items = []
+        try:
+            with open(path, encoding="utf-8", newline="") as f:
+                if path.endswith(".csv"):
+                    for number, row in enumerate(csv.DictReader(f), start=2):
+                        items.append(_normalize(row, base_dir, defaults, f"{path}:{number}"))
+                else:
+                    for number, line in enumerate(f, start=1):
+                        if line.strip():
+                            items.append(
+                                _normalize(json.loads(line), base_dir, defaults, f"{path}:{number}")
+                            )
+        except (OSError, json.JSONDecodeError) as e:
+            raise ManifestError(f"Cannot read manifest {path}: {str(e)}")
+
+    unique: dict[str, dict] = {}
+    for item in items:
+        if item["id"] in unique:
+            print(f"[WARN] Duplicate item id {item['id']} - keeping the first", file=sys.stderr)
+            continue
+        unique[item["id"]] = item
+    return list(unique.values())
+
+
+# ----------------------------------------------------------------------------
+# Checkpoint
+# ----------------------------------------------------------------------------
+
+
+def _repair_tail(path: str):
+    """Cut off a half-written last line left by a crash"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        f.seek(data.rfind(b"\n") + 1)
+        f.truncate()
+
+
+def _read_jsonl(path: str) -> Iterator[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Checkpoint:
+    """
+    Append-only log of finished item ids and their status
+
+    Results are written before their checkpoint entry. Results that made it
+    to the output but not to the checkpoint (crash in between) are recovered
+    from the output on load, so they aren't run twice.
+    """
+
+    def __init__(self, path: str, output_path: str):
+        self.path = path
+        self.status: dict[str, str] = {}
+        _repair_tail(path)
+        _repair_tail(output_path)
+        for entry in _read_jsonl(path):
+            self.status[entry["id"]] = entry["status"]
+        self._file = open(path, "a", encoding="utf-8")
+        written = {record["id"]: record["status"] for record in _read_jsonl(output_path)}
+        for item_id, status in written.items():
+            if self.status.get(item_id) != status:
+                self.mark(item_id, status)
+
+    def pending(self, items: list[dict], retry_failed: bool = False) -> list[dict]:
+        """Items without a checkpoint entry (or failed ones, with retry_failed)"""
+        return [
+            item
+            for item in items
+            if item["id"] not in self.status
+            or (retry_failed and self.status[item["id"]] == STATUS_FAILED)
+        ]
+
+    def mark(self, item_id: str, status: str):
+        self.status[item_id] = status
+        self._file.write(json.dumps({"id": item_id, "status": status}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# ----------------------------------------------------------------------------
+# Worker process
+# ----------------------------------------------------------------------------
+
+
+def _init_worker(workers: int, env_path: Optional[str]):
+    """Load the environment, share the Gemini quota, import the crew once"""
+    if env_path:
+        from dotenv import load_dotenv
+
+        load_dotenv(env_path)
+    # Each process has its own limiter - split the quota so the pool stays within it
+    for name, default in (("GEMINI_RPM", "1000"), ("GEMINI_TPM", "1000000")):
+        limit = int(os.getenv(name, default))
+        if limit > 0:
+            os.environ[name] = str(max(1, limit // workers))
+
+    from utils import output_capture
+
+    output_capture.install()
+    import crew.crew  # noqa: F401
+
+
+def analyze_item(item: dict, deadline_s: Optional[float], log_dir: Optional[str]) -> dict:
+    """
+    Run one analysis (in a worker process)
+
+    Args:
+        item: Manifest item (see read_manifest)
+        deadline_s: Budget of the analysis (None = ANALYSIS_DEADLINE_S)
+        log_dir: Directory for the crew's verbose output (<id>.log), None discards it
+
+    Returns:
+        Result record as written to the JSONL output
+    """
+    import threading
+
+    from crew.crew import AdQualityRaterCrew
+    from utils.cancellation import CancelToken, DeadlineExceeded
+    from utils.deadline import DEADLINE_EXCEEDED
+    from utils.output_capture import capture_lines
+    from utils.request_context import request_scope
+
+    started_at = time.time()
+    token = CancelToken()
+    deadline = Deadline.after(deadline_s)
+    deadline_timer = threading.Timer(
+        deadline.remaining(), token.cancel, args=(DEADLINE_EXCEEDED, DeadlineExceeded)
+    )
+    deadline_timer.daemon = True
+    deadline_timer.start()
+
+    log_file = (
+        open(os.path.join(log_dir, f"{item['id']}.log"), "w", encoding="utf-8") if log_dir else None
+    )
+    record = {
+        "id": item["id"],
+        "ad": item["ad"],
+        "landing_page_url": item["landing_page_url"],
+        "status": STATUS_FAILED,
+        "partial": False,
+        "result": None,
+        "scores": None,
+        "error": None,
+    }
+    with request_scope(item["id"], cancel_token=token, deadline=deadline) as request_ctx:
+        try:
+            with capture_lines(lambda line: log_file and log_file.write(line + "\n")):
+                crew = AdQualityRaterCrew(
+                    ad_url=item["ad"],
+                    landing_page_url=item["landing_page_url"],
+                    brand_guidelines=item.get("brand_guidelines"),
+                    target_audience=item.get("target_audience"),
+                    campaign_goal=item.get("campaign_goal"),
+                    cancel_token=token,
+                    deadline=deadline,
+                )
+                result_text = str(crew.kickoff())
+            record.update(
+                status=STATUS_SUCCEEDED if result_text else STATUS_FAILED,
+                partial=crew.partial,
+                result=result_text or None,
+                scores=crew.scores or None,
+                error=None if result_text else "No result received from crew",
+            )
+        except Exception as e:
+            record["error"] = f"Crew execution error: {str(e)}"
+            if log_file:
+                log_file.write(traceback.format_exc())
+        finally:
+            deadline_timer.cancel()
+            if log_file:
+                log_file.close()
+        record["metrics"] = request_ctx.snapshot()
+
+    record["elapsed_s"] = round(time.time() - started_at, 2)
+    record["finished_at"] = time.time()
+    record["worker"] = worker_id()
+    return record
+
+
+# ----------------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------------
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s"
+
+
+class Progress:
+    """Throughput over the last RATE_WINDOW completions, and the ETA from it"""
+
+    def __init__(self, total: int, already_done: int):
+        self.total = total
+        self.done = already_done
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at = time.time()
+        self._finished: deque[float] = deque([self.started_at], maxlen=RATE_WINDOW + 1)
+
+    def record(self, status: str):
+        self.done += 1
+        if status == STATUS_SUCCEEDED:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self._finished.append(time.time())
+
+    def rate(self) -> float:
+        """Items per second"""
+        span = self._finished[-1] - self._finished[0]
+        return (len(self._finished) - 1) / span if span > 0 else 0.0
+
+    def line(self) -> str:
+        rate = self.rate()
+        remaining = self.total - self.done
+        eta = _format_duration(remaining / rate) if rate > 0 else "?"
+        return (
+            f"[batch] {self.done}/{self.total} done "
+            f"(this run: {self.succeeded} ok, {self.failed} failed) | "
+            f"{rate * 60:.1f} items/min | "
+            f"elapsed {_format_duration(time.time() - self.started_at)} | ETA {eta}"
+        )
+
+
+def run_batch(
+    items: list[dict],
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    workers: int = 2,
+    deadline_s: Optional[float] = None,
+    retry_failed: bool = False,
+    max_tasks_per_child: Optional[int] = None,
+    log_dir: Optional[str] = None,
+    env_path: Optional[str] = None,
+) -> dict:
+    """
+    Analyse all items not yet in the checkpoint
+
+    Args:
+        items: Manifest items (see read_manifest)
+        output_path: JSONL file results are appended to
+        checkpoint_path: Checkpoint file (default: <output_path>.checkpoint)
+        workers: Analyses running in parallel (worker processes)
+        deadline_s: Budget per analysis (None = ANALYSIS_DEADLINE_S)
+        retry_failed: Run items again whose last attempt failed
+        max_tasks_per_child: Replace a worker process after this many analyses
+        log_dir: Directory for per-item crew logs
+        env_path: .env file loaded in every worker
+
+    Returns:
+        dict with total, skipped, succeeded, failed and interrupted
+    """
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint", output_path)
+    pending = checkpoint.pending(items, retry_failed=retry_failed)
+    skipped = len(items) - len(pending)
+    if skipped:
+        print(f"[batch] Resuming: {skipped} of {len(items)} items already done")
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    progress = Progress(total=len(items), already_done=skipped)
+    interrupted = False
+    queue = deque(pending)
+    # Items in flight when a worker died: rerun one at a time to find the one that kills it
+    suspects: deque[dict] = deque()
+    in_flight: dict[Future, dict] = {}
+
+    def create_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(workers, env_path),
+            max_tasks_per_child=max_tasks_per_child,
+        )
+
+    def write(record: dict):
+        output.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint.mark(record["id"], record["status"])
+        progress.record(record["status"])
+        print(progress.line(), flush=True)
+
+    def failed_record(item: dict, error: str) -> dict:
+        return {
+            "id": item["id"],
+            "ad": item["ad"],
+            "landing_page_url": item["landing_page_url"],
+            "status": STATUS_FAILED,
+            "error": error,
+            "finished_at": time.time(),
+        }
+
+    pool = create_pool()
+    try:
+        with open(output_path, "a", encoding="utf-8") as output:
+            while queue or suspects or in_flight:
+                broken = False
+                try:
+                    if suspects:
+                        # Isolation: a suspect runs alone, so a crash can only be its own
+                        if not in_flight:
+                            item = suspects.popleft()
+                            in_flight[pool.submit(analyze_item, item, deadline_s, log_dir)] = item
+                    else:
+                        # Keep every worker busy plus one queued item each, not 5,000 futures
+                        while queue and len(in_flight) < workers * 2:
+                            item = queue[0]
+                            in_flight[pool.submit(analyze_item, item, deadline_s, log_dir)] = item
+                            queue.popleft()
+                except BrokenProcessPool:
+                    broken = True
+
+                if not broken:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        if isinstance(future.exception(), BrokenProcessPool):
+                            broken = True
+                            continue
+                        item = in_flight.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            record = failed_record(item, f"Worker error: {str(e)}")
+                        write(record)
+
+                if broken:
+                    # A dead worker breaks the whole pool and fails every future in it
+                    victims = list(in_flight.values())
+                    in_flight.clear()
+                    if len(victims) == 1:
+                        # Alone in the pool (isolated suspect or last item) - it killed the worker
+                        culprit = victims[0]
+                        print(
+                            f"[batch] Worker process died on item {culprit['id']} "
+                            f"- marked as failed",
+                            flush=True,
+                        )
+                        write(
+                            failed_record(culprit, "Worker process died (out of memory or crash)")
+                        )
+                    elif victims:
+                        print(
+                            f"[batch] Worker process died - rerunning {len(victims)} "
+                            f"in-flight item(s) one at a time to find the cause",
+                            flush=True,
+                        )
+                        suspects.extend(victims)
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = create_pool()
+    except KeyboardInterrupt:
+        interrupted = True
+        print(
+            f"\n[batch] Interrupted - {len(in_flight) + len(suspects)} running item(s) "
+            f"will run again on resume"
+        )
+    finally:
+        pool.shutdown(wait=not interrupted, cancel_futures=True)
+        checkpoint.close()
+
+    return {
+        "total": len(items),
+        "skipped": skipped,
+        "succeeded": progress.succeeded,
+        "failed": progress.failed,
+        "interrupted": interrupted,
+    }
@@ -0,0 +1,217 @@
+"""Soak Test for Resource Leaks
+
+Runs the analyses of a manifest round after round in this process, through
+the same job path as the API (run_analysis_job), and fails if threads,
+child processes, temp files or memory don't return to the baseline taken
+after a warm-up round. Run it against recorded cassettes
+(LLM_REPLAY_MODE=replay) to soak without API key, quota or network noise.
+
+Usage (from backend/src):
+    python -m batch.soak manifest.jsonl --rounds 20
+    LLM_REPLAY_MODE=replay python -m batch.soak ads/ \
+        --landing-page-url https://example.com --rounds 50
+
+Exit status: 0 if everything returned to baseline, 1 if something leaked,
+2 for an unreadable manifest.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+from dotenv import load_dotenv
+
+
+def _prepare_ad(ad: str) -> str:
+    """Local creatives go through the blob store like uploads; URLs are passed on"""
+    from utils.blob_store import blob_store
+    from utils.image_fetch import guess_mime_from_extension, sniff_image_mime
+
+    if ad.startswith(("http://", "https://")):
+        return ad
+    with open(ad, "rb") as f:
+        data = f.read()
+    return blob_store.put(data, sniff_image_mime(data[:32]) or guess_mime_from_extension(ad))
+
+
+def _run_item(item: dict, deadline_s: float) -> str:
+    """One analysis through the API's job path; returns the job's final status"""
+    from api.jobs import run_analysis_job
+    from store.job_store import get_job_store
+
+    job_id = f"soak-{uuid.uuid4().hex[:12]}"
+    params = {
+        "landing_page_url": item["landing_page_url"],
+        "brand_guidelines": item.get("brand_guidelines"),
+        "target_audience": item.get("target_audience"),
+        "campaign_goal": item.get("campaign_goal"),
+        "deadline_at": time.time() + deadline_s,
+        "ad_filename": os.path.basename(item["ad"]),
+    }
+    store = get_job_store()
+    store.create_job(job_id, params)
+    run_analysis_job(job_id, [_prepare_ad(item["ad"])], params)
+    return (store.get_job(job_id) or {}).get("status", "unknown")
+
+
+def _settle(baseline: dict, seconds: float) -> dict:
+    """Give exiting threads and processes time to go; returns the final snapshot"""
+    from utils.resource_tracker import process_snapshot
+
+    deadline = time.monotonic() + seconds
+    while True:
+        gc.collect()
+        current = process_snapshot()
+        back = set(current["threads"]) <= set(baseline["threads"]) and set(
+            current["children"]
+        ) <= set(baseline["children"])
+        if back or time.monotonic() >= deadline:
+            return current
+        time.sleep(0.2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m batch.soak",
+        description="Run analyses repeatedly and fail if resources don't return to baseline",
+    )
+    parser.add_argument("manifest", help="JSONL or CSV manifest, or a directory of ad images")
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=10,
+        help="Passes over the manifest after the warm-up (default: 10)",
+    )
+    parser.add_argument(
+        "--deadline-s", type=float, default=180, help="Budget per analysis (default: 180)"
+    )
+    parser.add_argument(
+        "--settle-s",
+        type=float,
+        default=10,
+        help="Wait for threads/processes to exit (default: 10)",
+    )
+    parser.add_argument(
+        "--rss-tolerance-mb", type=float, default=64, help="Allowed RSS growth (default: 64)"
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Trace Python allocations for the whole run and check their growth too (slower)",
+    )
+    parser.add_argument(
+        "--traced-tolerance-mb", type=float, default=16, help="Allowed traced growth (default: 16)"
+    )
+    parser.add_argument("--landing-page-url", help="Default landing page for items without one")
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".env"))
+    load_dotenv(env_path)
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    # Per-analysis accounting is off by default - the soak test reports from it
+    os.environ["RESOURCE_TRACKING"] = "true"
+
+    from batch.runner import ManifestError, read_manifest
+    from utils import output_capture
+    from utils.resource_tracker import compare_snapshots, process_snapshot, resource_tracker
+
+    try:
+        items = read_manifest(args.manifest, {"landing_page_url": args.landing_page_url})
+    except ManifestError as e:
+        print(f"[ERROR] {str(e)}", file=sys.stderr)
+        return 2
+    if not items:
+        print("[soak] Manifest has no items")
+        return 0
+
+    output_capture.install()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    # Warm-up: imports, pools, clients and caches that legitimately stay
+    print(f"[soak] Warm-up round ({len(items)} analyses)")
+    for item in items:
+        _run_item(item, args.deadline_s)
+    gc.collect()
+    time.sleep(min(2.0, args.settle_s))
+    baseline = process_snapshot()
+    resource_tracker.reports.clear()
+
+    statuses: dict[str, int] = {}
+    for round_number in range(1, args.rounds + 1):
+        for item in items:
+            status = _run_item(item, args.deadline_s)
+            statuses[status] = statuses.get(status, 0) + 1
+        current = process_snapshot()
+        rss = (
+            f"{current['rss_bytes'] / (1024 * 1024):.1f} MB"
+            if current["rss_bytes"] is not None
+            else "n/a"
+        )
+        print(
+            f"[soak] Round {round_number}/{args.rounds} | threads {len(current['threads'])} | "
+            f"children {len(current['children'])} | rss {rss}"
+        )
+
+    final = _settle(baseline, args.settle_s)
+    diff = compare_snapshots(baseline, final)
+    failures = []
+    if diff["threads"]:
+        failures.append(
+            f"{len(diff['threads'])} thread(s) still alive: {', '.join(diff['threads'])}"
+        )
+    if diff["children"]:
+        failures.append(
+            f"{len(diff['children'])} child process(es) still running: "
+            f"{', '.join(diff['children'])}"
+        )
+    if diff["temp_files"]:
+        failures.append(
+            f"{len(diff['temp_files'])} temp file(s) left: {', '.join(diff['temp_files'][:10])}"
+        )
+    if diff["rss_growth_mb"] is not None and diff["rss_growth_mb"] > args.rss_tolerance_mb:
+        failures.append(
+            f"RSS grew by {diff['rss_growth_mb']} MB (tolerance {args.rss_tolerance_mb} MB)"
+        )
+    if diff["traced_growth_mb"] is not None and diff["traced_growth_mb"] > args.traced_tolerance_mb:
+        failures.append(
+            f"Traced Python memory grew by {diff['traced_growth_mb']} MB "
+            f"(tolerance {args.traced_tolerance_mb} MB)"
+        )
+
+    snapshot = resource_tracker.snapshot()
+    report = {
+        "rounds": args.rounds,
+        "analyses": args.rounds * len(items),
+        "statuses": statuses,
+        "since_baseline": diff,
+        "leaking_analyses": snapshot["leaking"],
+        "totals": snapshot["totals"],
+        "passed": not failures,
+        "failures": failures,
+    }
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if failures:
+        print("[soak] FAILED - resources did not return to baseline:")
+        for failure in failures:
+            print(f"  - {failure}")
+        if snapshot["leaking"]:
+            print(
+                f"  Analyses still holding threads/processes: {', '.join(snapshot['leaking'][:10])}"
+            )
+        return 1
+    print(f"[soak] Passed: {report['analyses']} analyses, resources back to baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""A/B Comparison of Creative Variants for one Landing Page
+
+The landing page is scraped once and its text handed to every variant, the
+per-image stages (visual, copy, brand) run concurrently per variant, and a
+single synthesis writes the comparison. The ranking itself is computed in
+Python from the weighted scores, like the single-ad score.
+
+Configured via environment variables:
+    COMPARE_MAX_PARALLEL:   Variants analysed at once (default: 3)
+    COMPARE_LP_MAX_CHARS:   Landing page text handed to each variant (default: 6000)
+"""
+
+import contextvars
+import os
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Optional
+
+from crewai import Crew, Process, Task
+
+from agents.quality_rating_synthesizer import create_quality_rating_synthesizer
+from crew.crew import AdQualityRaterCrew
+from utils import llm_streaming
+from utils.cancellation import AnalysisCancelled, CancelToken, DeadlineExceeded
+from utils.deadline import DEADLINE_EXCEEDED, SYNTHESIS_MIN_BUDGET_S, Deadline
+from utils.image_index import exact_matches_only
+from utils.output_capture import capture_lines
+from utils.request_context import record_metric
+
+
+MAX_PARALLEL = int(os.getenv("COMPARE_MAX_PARALLEL", "3"))
+LP_MAX_CHARS = int(os.getenv("COMPARE_LP_MAX_CHARS", "6000"))
+
+TASK_COMPARISON = "comparison_report"
+
+
+def condense_landing_page(text: str, max_chars: int = LP_MAX_CHARS) -> str:
+    """Collapse blank lines and cap the text, cutting at a line break where possible"""
+    lines = [line.strip() for line in text.splitlines()]
+    condensed = "\n".join(line for line in lines if line)
+    if len(condensed) <= max_chars:
+        return condensed
+    cut = condensed.rfind("\n", 0, max_chars)
+    return condensed[: cut if cut > max_chars // 2 else max_chars] + "\n[...]"
+
+
+class VariantComparisonCrew:
+    """
+    Compares N creative variants against one landing page
+
+    Shared work (scrape, report) runs once; only visual, copy and brand run
+    per variant.
+    """
+
+    def __init__(
+        self,
+        ad_urls: list[str],
+        landing_page_url: str,
+        variant_names: Optional[list[str]] = None,
+        brand_guidelines: Optional[dict] = None,
+        target_audience: Optional[str] = None,
+        campaign_goal: Optional[str] = None,
+        on_report_delta: Optional[Callable[[str], None]] = None,
+        on_report_reset: Optional[Callable[[], None]] = None,
+        on_task_complete: Optional[Callable[[dict], None]] = None,
+        on_variant_complete: Optional[Callable[[dict], None]] = None,
+        on_log: Optional[Callable[[str], None]] = None,
+        cancel_token: Optional[CancelToken] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        """
+        Args:
+            ad_urls: Blob handles, URLs or paths of the variants (at least 2)
+            variant_names: Display names (e.g. file names), same order as ad_urls
+            on_task_complete: Receives each task result, with the variant label added
+            on_variant_complete: Receives a variant's label, name and scores when it is done
+            on_log: Receives the verbose output of the variant threads, prefixed with the label
+            cancel_token: Shared by all variants
+            deadline: Shared by all variants; the comparison falls back to the
+                ranking table when too little is left for the report
+        """
+        if len(ad_urls) < 2:
+            raise ValueError(f"A comparison needs at least 2 variants, got {len(ad_urls)}")
+        self.ad_urls = ad_urls
+        self.landing_page_url = landing_page_url
+        self.labels = [f"Variante {letter}" for letter in string.ascii_uppercase[: len(ad_urls)]]
+        self.variant_names = variant_names or list(ad_urls)
+        self.brand_guidelines = brand_guidelines
+        self.target_audience = target_audience
+        self.campaign_goal = campaign_goal
+        self.on_report_delta = on_report_delta
+        self.on_report_reset = on_report_reset
+        self.on_task_complete = on_task_complete
+        self.on_variant_complete = on_variant_complete
+        self.on_log = on_log
+        self.cancel_token = cancel_token or CancelToken()
+        self.deadline = deadline
+        self.start_time = None
+        self.partial = False
+        self.landing_page_text: Optional[str] = None
+        self.variants: list[dict] = []
+        self.task_results: dict[str, dict] = {}
+        self.scores: dict[str, Any] = {}
+
+    def _crew_kwargs(self) -> dict:
+        return {
+            "landing_page_url": self.landing_page_url,
+            "brand_guidelines": self.brand_guidelines,
+            "target_audience": self.target_audience,
+            "campaign_goal": self.campaign_goal,
+            "cancel_token": self.cancel_token,
+            "deadline": self.deadline,
+        }
+
+    def _scrape(self) -> str:
+        crew = AdQualityRaterCrew(
+            ad_url="",
+            scrape_only=True,
+            on_task_complete=self.on_task_complete,
+            **self._crew_kwargs(),
+        )
+        text = crew.scrape_landing_page()
+        self.task_results.update(crew.task_results)
+        return condense_landing_page(text)
+
+    def _analyze_variant(self, index: int) -> dict:
+        """Per-image stages of one variant (runs in a pool thread)"""
+        label = self.labels[index]
+
+        def forward(task_result: dict):
+            if self.on_task_complete is not None:
+                self.on_task_complete({**task_result, "variant": label})
+
+        capture = (
+            capture_lines(lambda line: self.on_log(f"[{label}] {line}"))
+            if self.on_log
+            else nullcontext()
+        )
+        variant = {"label": label, "name": self.variant_names[index], "scores": None, "error": None}
+        # Variants differ in details the perceptual hashes barely see -
+        # never reuse another variant's analysis
+        crew = None
+        with capture, exact_matches_only():
+            try:
+                crew = AdQualityRaterCrew(
+                    ad_url=self.ad_urls[index],
+                    landing_page_text=self.landing_page_text,
+                    with_report=False,
+                    on_task_complete=forward,
+                    **self._crew_kwargs(),
+                )
+                crew.kickoff()
+                # kickoff() reports a failed run in its return value, not by raising
+                variant["error"] = crew.error
+                variant["scores"] = crew.scores or None
+            except AnalysisCancelled:
+                raise
+            except Exception as e:
+                variant["error"] = str(e)
+        variant["task_results"] = crew.task_results if crew is not None else {}
+        variant["cache"] = dict(crew.cache_status) if crew is not None else {}
+        for task_name, result in variant["task_results"].items():
+            self.task_results[f"{label}:{task_name}"] = result
+        if self.on_variant_complete is not None:
+            self.on_variant_complete(
+                {key: variant[key] for key in ("label", "name", "scores", "error")}
+            )
+        return variant
+
+    def ranking(self) -> list[dict]:
+        """Variants by weighted score, best first (unscored ones last)"""
+
+        def weighted(variant: dict) -> float:
+            score = ((variant.get("scores") or {}).get("weighted") or {}).get("score")
+            return score if score is not None else -1
+
+        return sorted(self.variants, key=weighted, reverse=True)
+
+    def ranking_table(self) -> str:
+        rows = [
+            "| Rang | Variante | Datei | Score | Visual | Copy | Brand |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for rank, variant in enumerate(self.ranking(), start=1):
+            scores = variant.get("scores") or {}
+            weighted = scores.get("weighted") or {}
+
+            def component(name: str) -> str:
+                value = (scores.get(name) or {}).get("score")
+                return str(value) if value is not None else "–"
+
+            total = f"{weighted['score']} ({weighted['assessment']})" if weighted else "–"
+            rows.append(
+                f"| {rank} | {variant['label']} | {variant['name']} | {total} "
+                f"| {component('visual')} | {component('copy')} | {component('brand')} |"
+            )
+        return "\n".join(rows)
+
+    def _report_description(self) -> str:
+        sections = []
+        for variant in self.variants:
+            results = variant.get("task_results") or {}
+            lines = [f"- {task_name}: {result['output']}" for task_name, result in results.items()]
+            if variant.get("error"):
+                lines.append(f"- Analysis failed: {variant['error']}")
+            analyses = "\n".join(lines)
+            sections.append(f"**{variant['label']} ({variant['name']}):**\n{analyses}")
+        variant_analyses = "\n\n".join(sections)
+        table = self.ranking_table()
+
+        return f"""Create a CONCISE comparison report of {len(self.variants)} ad creative variants
+            for the same landing page: {self.landing_page_url}
+
+            **Ranking (pre-computed - copy the table EXACTLY, do NOT recalculate or reorder):**
+{table}
+
+            **Per-variant analyses:**
+{variant_analyses}
+
+            **Report Structure (BRIEF!):**
+
+            # 🏆 Variant Comparison
+
+            [The ranking table]
+
+            ## 🥇 Winner: [Variant]
+            - Why it wins over the others (MAX 3 sentences)
+
+            ## 📋 Variants (MAX 2 sentences each)
+            - Strongest point and main weakness per variant
+
+            ## 🔥 Next Test
+            - One concrete change to the winner, with ready-to-use text
+
+            **RULES:**
+            - SCORES and RANKING are pre-computed. Copy them EXACTLY
+            - Compare the variants with each other, don't just review them one by one
+            - LANGUAGE: Use the SAME LANGUAGE as the variant analyses
+
+            Be concise and constructive."""
+
+    def _fallback_report(self) -> str:
+        """Ranking table without LLM synthesis (deadline reached)"""
+        processing_time = time.time() - self.start_time if self.start_time else 0
+        lines = [
+            "# 🏆 Variantenvergleich (Teilbericht, Zeitbudget erschöpft)",
+            "",
+            self.ranking_table(),
+            "",
+        ]
+        missing = [variant["label"] for variant in self.variants if not variant.get("scores")]
+        if missing:
+            lines.extend([f"_Nicht abgeschlossen: {', '.join(missing)}_", ""])
+        lines.append(f"---\n\n**⏱️ Verarbeitungszeit:** {processing_time:.1f} Sekunden")
+        return "\n".join(lines)
+
+    def _synthesize(self) -> str:
+        synthesizer = create_quality_rating_synthesizer(
+            stream=self.on_report_delta is not None and llm_streaming.STREAMING_AVAILABLE
+        )
+        started = time.time()
+
+        def callback(output: Any):
+            self.task_results[TASK_COMPARISON] = {
+                "task": TASK_COMPARISON,
+                "output": getattr(output, "raw", None) or str(output),
+                "duration_seconds": round(time.time() - started, 2),
+            }
+
+        task = Task(
+            description=self._report_description(),
+            expected_output="""Concise comparison report (max 20 sentences total) with:
+            - The pre-computed ranking table
+            - The winner and why
+            - One next test for the winner with ready-to-use text
+            - Response in the SAME LANGUAGE as the variant analyses""",
+            agent=synthesizer,
+            name=TASK_COMPARISON,
+            callback=callback,
+        )
+        detach_stream = lambda: None
+        if self.on_report_delta is not None:
+            detach_stream = llm_streaming.attach(
+                synthesizer.llm, self.on_report_delta, self.on_report_reset
+            )
+        try:
+            crew = Crew(
+                agents=[synthesizer], tasks=[task], process=Process.sequential, verbose=True
+            )
+            return str(crew.kickoff())
+        finally:
+            detach_stream()
+
+    def _update_scores(self):
+        self.scores = {
+            "variants": [
+                {
+                    "label": variant["label"],
+                    "name": variant["name"],
+                    **(variant.get("scores") or {}),
+                }
+                for variant in self.variants
+            ],
+            "ranking": [variant["label"] for variant in self.ranking()],
+        }
+
+    def _finish_partial(self) -> str:
+        self.partial = True
+        record_metric("partial_report", 1)
+        return self._fallback_report()
+
+    def kickoff(self) -> str:
+        """
+        Run the comparison
+
+        Returns:
+            Comparison report (markdown)
+
+        Raises:
+            AnalysisCancelled: If the cancel token fires (a deadline yields the
+                ranking table instead)
+        """
+        self.cancel_token.raise_if_cancelled()
+        self.start_time = time.time()
+        record_metric("variants", len(self.ad_urls))
+
+        try:
+            self.landing_page_text = self._scrape()
+            record_metric("landing_page_chars", len(self.landing_page_text))
+
+            # Each pool thread gets its own copy of the request context
+            with ThreadPoolExecutor(
+                max_workers=max(1, MAX_PARALLEL), thread_name_prefix="variant"
+            ) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._analyze_variant, index)
+                    for index in range(len(self.ad_urls))
+                ]
+                # A deadline ends each variant with partial scores, a cancel raises here
+                self.variants = [future.result() for future in futures]
+            self._update_scores()
+            record_metric(
+                "task_cache", {variant["label"]: variant["cache"] for variant in self.variants}
+            )
+
+            if self.deadline is not None and not self.deadline.allows(SYNTHESIS_MIN_BUDGET_S):
+                self.cancel_token.cancel(DEADLINE_EXCEEDED, DeadlineExceeded)
+            self.cancel_token.raise_if_cancelled()
+
+            report = self._synthesize()
+            processing_time = time.time() - self.start_time
+            return f"{report}\n\n---\n\n**⏱️ Verarbeitungszeit:** {processing_time:.1f} Sekunden"
+
+        except AnalysisCancelled:
+            if self.cancel_token.deadline_exceeded:
+                self._update_scores()
+                return self._finish_partial()
+            raise
+
+        except Exception as e:
+            if self.cancel_token.cancelled:
+                # CrewAI may wrap the cancellation in its own error
+                if self.cancel_token.deadline_exceeded:
+                    self._update_scores()
+                    return self._finish_partial()
+                raise AnalysisCancelled(f"Analysis cancelled ({self.cancel_token.reason})") from e
+            processing_time = time.time() - self.start_time
+
+            return f"""# ❌ Vergleich Fehlgeschlagen
+
+**Fehler:** {str(e)}
+
+**Verarbeitungszeit:** {processing_time:.1f} Sekunden
+
+Bitte versuchen Sie es erneut oder kontaktieren Sie den Support."""
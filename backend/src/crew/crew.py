@@ -1,7 +1,7 @@
 """Ad Quality Rater Crew - Main Orchestrator"""
 
 from crewai import Crew, Task, Process
-from typing import Optional
+from typing import Any, Callable, Optional
 import uuid
 from datetime import datetime
 import time
@@ -13,6 +13,63 @@ from agents.landing_page_scraper import create_landing_page_scraper
 from agents.copywriting_expert import create_copywriting_expert
 from agents.brand_consistency_agent import create_brand_consistency_agent
 from agents.quality_rating_synthesizer import create_quality_rating_synthesizer
+from crew.memo import (
+    CACHE_HIT,
+    CACHE_NEAR_DUPLICATE,
+    MemoizedConditionalTask,
+    MemoizedTask,
+    TaskMemo,
+    ad_fingerprint,
+)
+from crew.scoring import (
+    BrandScore,
+    CarouselVisualScore,
+    CopyScore,
+    VisualScore,
+    compute_weighted_score,
+)
+from utils import llm_streaming, replay
+from utils.cancellation import AnalysisCancelled, CancelToken, DeadlineExceeded
+from utils.deadline import (
+    BRAND_MIN_BUDGET_S,
+    DEADLINE_EXCEEDED,
+    SYNTHESIS_MIN_BUDGET_S,
+    Deadline,
+
+)
+from utils.logger import logger
+from utils.request_context import add_metric, budget_timeout, record_metric
+from utils.task_cache import get_task_cache
+from utils.url_canon import canonicalize_url, resolve_landing_page_url
+
+
+# Stable task names used in task_result events
+TASK_VISUAL = "visual_analysis"
+TASK_LANDING_PAGE = "landing_page"
+TASK_COPYWRITING = "copywriting"
+TASK_BRAND = "brand_compliance"
+TASK_REPORT = "report"
+
+TOKEN_USAGE_FIELDS = ("total_tokens", "prompt_tokens", "completion_tokens", "successful_requests")
+
+# Section titles of the partial report, in task order
+PARTIAL_REPORT_SECTIONS = (
+    (TASK_VISUAL, "🎨 Visual", "visual"),
+    (TASK_COPYWRITING, "✍️ Copywriting", "copy"),
+    (TASK_BRAND, "🏷️ Brand", "brand"),
+)
+
+
+def _token_usage(agent: Any) -> dict:
+    """Cumulative token usage of an agent's LLM calls (empty if unavailable)"""
+    process = getattr(agent, "_token_process", None)
+    if process is None:
+        return {}
+    try:
+        summary = process.get_summary()
+    except Exception:
+        return {}
+    return {field: getattr(summary, field, 0) or 0 for field in TOKEN_USAGE_FIELDS}
 
 
 class AdQualityRaterCrew:
@@ -30,74 +87,116 @@ class AdQualityRaterCrew:
         brand_guidelines: Optional[dict] = None,
         target_audience: Optional[str] = None,
         campaign_goal: Optional[str] = None,
+        on_report_delta: Optional[Callable[[str], None]] = None,
+        on_report_reset: Optional[Callable[[], None]] = None,
+        on_task_complete: Optional[Callable[[dict], None]] = None,
+        cancel_token: Optional[CancelToken] = None,
+        deadline: Optional[Deadline] = None,
+        landing_page_text: Optional[str] = None,
+        with_report: bool = True,
+        card_urls: Optional[list[str]] = None,
+        scrape_only: bool = False,
     ):
+        """
+        Args:
+            on_report_delta: Receives final report text as the synthesizer generates it
+            on_report_reset: Called if the synthesizer restarts its answer (discard deltas)
+            on_task_complete: Receives a dict (task, output, duration_seconds, token_usage)
+                as soon as each task finishes
+            cancel_token: Checked between tasks; once cancelled, pending tasks are
+                skipped and kickoff() raises AnalysisCancelled
+            deadline: End-to-end budget; the brand check and the LLM report are skipped
+                when it gets tight, and kickoff() returns a partial report when it runs out
+            landing_page_text: Landing page content scraped beforehand (shared by the
+                variants of a comparison); the scrape task is skipped
+            with_report: False stops after the per-ad tasks (scores and task results only)
+            card_urls: All cards of a carousel / multi-image ad in swipe order (ad_url is
+                the first); the visual task analyses them together and notes each card
+            scrape_only: Create only the landing page scraper, for scrape_landing_page()
+                (kickoff() is not available)
+        """
         self.ad_url = ad_url
-        self.landing_page_url = landing_page_url
+        self.card_urls = card_urls if card_urls and len(card_urls) > 1 else None
+        # Tracking parameters, fragments etc. would make every link variant a cache miss
+        self.landing_page_url = canonicalize_url(landing_page_url)
         self.brand_guidelines = brand_guidelines or {}
         self.target_audience = target_audience or "Allgemeine Zielgruppe"
         self.campaign_goal = campaign_goal or "Allgemeine Kampagne"
+        self.landing_page_text = landing_page_text
+        self.with_report = with_report
         self.report_id = str(uuid.uuid4())
         self.start_time = None
-
-        # Create agents
-        self.ad_visual_analyst = create_ad_visual_analyst()
-        self.landing_page_scraper = create_landing_page_scraper()
+        self.on_report_delta = on_report_delta
+        self.on_report_reset = on_report_reset
+        self.on_task_complete = on_task_complete
+        self.cancel_token = cancel_token or CancelToken()
+        self.deadline = deadline
+        self.partial = False
+        # Set when kickoff() failed - it returns an error report instead of raising
+        self.error: Optional[str] = None
+        self.task_results: dict[str, dict] = {}
+        self.scores: dict[str, Optional[dict]] = {}
+        self._score_models: dict[str, Any] = {}
+        self._synthesis_task: Optional[Task] = None
+        self._last_task_finished = None
+        self._token_baseline: dict[str, dict] = {}
+        self._memo: Optional[TaskMemo] = None
+        # Per task: "hit" (served from the task cache) or "miss"
+        self.cache_status: dict[str, str] = {}
+
+        self.scrape_only = scrape_only
+
+        # Create agents (scraper and synthesizer only if their tasks run)
+        self.landing_page_scraper = (
+            create_landing_page_scraper() if landing_page_text is None else None
+        )
+        if scrape_only:
+            self.ad_visual_analyst = self.copywriting_expert = self.brand_consistency_agent = None
+            self.quality_rating_synthesizer = None
+            return
+        self.ad_visual_analyst = create_ad_visual_analyst(carousel=self.card_urls is not None)
         self.copywriting_expert = create_copywriting_expert()
         self.brand_consistency_agent = create_brand_consistency_agent()
-        self.quality_rating_synthesizer = create_quality_rating_synthesizer()
+        self.quality_rating_synthesizer = (
+            create_quality_rating_synthesizer(
+                stream=on_report_delta is not None and llm_streaming.STREAMING_AVAILABLE
+            )
+            if with_report
+            else None
+        )
 
     def _create_tasks(self) -> list[Task]:
         """Create all tasks with proper context dependencies"""
 
         # Task 1: Analyze Ad Visuals
-        analyze_ad_task = Task(
-            description=f"""Analyze the ad visual using Gemini Vision Tool.
-
-            **Tool:** {{"image_url": "{self.ad_url}"}}
-            **Target Audience:** {self.target_audience}
-
-            **Evaluate and provide constructive feedback:**
-            1. Format: 1:1 (optimal) or other? Score: X/100
-            2. Authenticity: Stock photo or authentic?
-            3. Text Overlay: Max 7 words (best practice) or more?
-            4. Thumb-Stopper: Would you stop scrolling? Yes/No
-            5. CTA visibility? Score: X/100
-            6. Colors: [Hex codes]
-
-            **Improvement:** Specific recommendation OR "Good as is"
-
-            IMPORTANT: Detect the language from any text in the ad image, and respond in that SAME LANGUAGE.
-            If the ad has English text, respond in English. If German, respond in German, etc.
-            Be clear and constructive. MAX 6 sentences.""",
-            expected_output="""Clear, constructive visual analysis (max 6 sentences) with score and specific improvement suggestions. Response in the SAME LANGUAGE as the ad content.""",
+        analyze_ad_task = MemoizedTask(
+            description=self._visual_description(),
+            expected_output=(
+                "JSON object with scores and a clear, constructive visual analysis "
+                '(max 6 sentences) with specific improvement suggestions in the "analysis" field. '
+                "Response in the SAME LANGUAGE as the ad content."
+            ),
+            output_pydantic=CarouselVisualScore if self.card_urls else VisualScore,
             agent=self.ad_visual_analyst,
+            name=TASK_VISUAL,
+            callback=self._task_callback(TASK_VISUAL, self.ad_visual_analyst),
+            memo=self._memo,
         )
 
-        # Task 2: Scrape Landing Page
-        scrape_lp_task = Task(
-            description=f"""Extrahiere den vollständigen Text-Content von folgender Landingpage: {self.landing_page_url}
-
-            Verwende Playwright für dynamische Seiten und trafilatura als Fallback.
-
-            Achte auf:
-            - Vollständige Extraktion aller sichtbaren Texte
-            - Headlines, Subheadlines, Body-Text
-            - Call-to-Actions
-            - Entfernung von Boilerplate (Footer, Cookie-Banner-Text, etc.)
-
-            Bei Problemen (Timeout, 404, etc.) gib eine klare Fehlermeldung zurück.""",
-            expected_output="""Extrahierter Text-Content der Landingpage als String,
-            oder Fehlermeldung bei Problemen.""",
-            agent=self.landing_page_scraper,
+        # Task 2: Scrape Landing Page (skipped if the content was scraped beforehand)
+        scrape_lp_task = self._landing_page_task() if self.landing_page_text is None else None
+        upstream = [task for task in (analyze_ad_task, scrape_lp_task) if task is not None]
+        landing_page_input = (
+            "{scrape_lp_task.output}" if scrape_lp_task is not None else self.landing_page_text
         )
 
         # Task 3: Copywriting Analysis
-        copywriting_task = Task(
+        copywriting_task = MemoizedTask(
             description=f"""Evaluate copy quality. Be honest and constructive.
 
             **Input:**
             - Ad Analysis: {{analyze_ad_task.output}}
-            - Landing Page: {{scrape_lp_task.output}}
+            - Landing Page: {landing_page_input}
 
             **Evaluate:**
             1. Consistency Ad→LP: X/100
@@ -111,37 +210,185 @@ class AdQualityRaterCrew:
             **Improvement:** Ready-to-use text suggestion OR "Good as is"
 
             IMPORTANT: Use the SAME LANGUAGE as detected in the ad visual analysis.
-            Be clear and constructive. MAX 6 sentences.""",
-            expected_output="""Clear copywriting analysis (max 6 sentences) with score and ready-to-use improvement text. Response in the SAME LANGUAGE as the ad content.""",
+            Be clear and constructive. MAX 6 sentences.
+
+            **Output:** Return ONLY a JSON object with the fields score (overall 0-100),
+            consistency_score (0-100), tone ("educational" or "salesy"),
+            cta_appropriate (true/false), pain_point_clear (true/false), pio_formula (true/false)
+            and analysis (your text analysis incl. ready-to-use improvement text,
+            max 6 sentences).""",
+            expected_output=(
+                "JSON object with scores and a clear copywriting analysis (max 6 sentences) "
+                'with ready-to-use improvement text in the "analysis" field. '
+                "Response in the SAME LANGUAGE as the ad content."
+            ),
+            output_pydantic=CopyScore,
             agent=self.copywriting_expert,
-            context=[analyze_ad_task, scrape_lp_task],
+            name=TASK_COPYWRITING,
+            callback=self._task_callback(TASK_COPYWRITING, self.copywriting_expert),
+            memo=self._memo,
+            context=upstream,
         )
 
-        # Task 4: Brand Compliance Check (OPTIONAL - only if guidelines provided)
-        brand_compliance_task = Task(
-            description=f"""ONLY if brand guidelines are provided: Quick brand compliance check.
+        # Task 4: Brand Compliance Check (OPTIONAL - skipped without guidelines)
+        brand_compliance_task = MemoizedConditionalTask(
+            description=f"""Quick brand compliance check.
 
             **Brand Guidelines:**
-            {self.brand_guidelines if self.brand_guidelines else "NO Guidelines - SKIP this analysis"}
+            {self.brand_guidelines}
 
-            **If guidelines provided:**
             - Quick check: Tone, colors, forbidden words
             - Score (0-100): Overall rating
             - MAX 2-3 sentences feedback
 
-            **If NO guidelines:**
-            - Write: "No brand guidelines provided."
-
             IMPORTANT: Use the SAME LANGUAGE as detected in previous analyses.
-            Be BRIEF. Maximum 3 sentences.""",
-            expected_output="""Brief brand analysis (max 3 sentences) OR "No guidelines provided". Response in the SAME LANGUAGE as the ad content.""",
+            Be BRIEF. Maximum 3 sentences.
+
+            **Output:** Return ONLY a JSON object with the fields score (0-100),
+            tone_ok (true/false), colors_ok (true/false), forbidden_words_found (list)
+            and analysis (your feedback, max 3 sentences).""",
+            expected_output=(
+                "JSON object with the brand score and brief brand feedback (max 3 sentences) "
+                'in the "analysis" field. Response in the SAME LANGUAGE as the ad content.'
+            ),
+            condition=lambda _previous_output: bool(self.brand_guidelines)
+            and self._budget_allows_brand(),
+            output_pydantic=BrandScore,
             agent=self.brand_consistency_agent,
-            context=[analyze_ad_task, scrape_lp_task],
+            name=TASK_BRAND,
+            callback=self._task_callback(TASK_BRAND, self.brand_consistency_agent),
+            memo=self._memo,
+            context=upstream,
+        )
+
+        tasks = [*upstream, copywriting_task, brand_compliance_task]
+        if not self.with_report:
+            return tasks
+
+        # Task 5: Synthesize Final Report (score filled in once the inputs are done)
+        synthesize_report_task = MemoizedTask(
+            description=self._synthesis_description(None),
+            expected_output="""Concise performance report (max 15 sentences total) with:
+            - Clear assessment
+            - Top 2 improvements with ready-to-use text
+            - Constructive feedback
+            - Response in the SAME LANGUAGE as the ad content""",
+            agent=self.quality_rating_synthesizer,
+            name=TASK_REPORT,
+            callback=self._task_callback(TASK_REPORT, self.quality_rating_synthesizer),
+            memo=self._memo,
+            context=tasks,
+        )
+
+        self._synthesis_task = synthesize_report_task
+        return [*tasks, synthesize_report_task]
+
+    def _visual_description(self) -> str:
+        """Visual task prompt: one ad image, or all cards of a carousel"""
+        if not self.card_urls:
+            return f"""Analyze the ad visual using Gemini Vision Tool.
+
+            **Tool:** {{"image_url": "{self.ad_url}"}}
+            **Target Audience:** {self.target_audience}
+
+            **Evaluate and provide constructive feedback:**
+            1. Format: 1:1 (optimal) or other? Score: X/100
+            2. Authenticity: Stock photo or authentic?
+            3. Text Overlay: Max 7 words (best practice) or more?
+            4. Thumb-Stopper: Would you stop scrolling? Yes/No
+            5. CTA visibility? Score: X/100
+            6. Colors: [Hex codes]
+
+            **Improvement:** Specific recommendation OR "Good as is"
+
+            IMPORTANT: Detect the language from any text in the ad image,
+            and respond in that SAME LANGUAGE.
+            If the ad has English text, respond in English. If German, respond in German, etc.
+            Be clear and constructive. MAX 6 sentences.
+
+            **Output:** Return ONLY a JSON object with the fields score (overall 0-100),
+            format_score (0-100), cta_visibility (0-100), authentic (true/false),
+            text_overlay_words (number), thumb_stopper (true/false), colors (list of hex codes)
+            and analysis (your text analysis incl. improvement, max 6 sentences)."""
+
+        return f"""Analyze the carousel ad ({len(self.card_urls)} cards, in swipe order)
+            using the Gemini Carousel Analyzer Tool.
+
+            **Tool:** {{"image_urls": {json.dumps(self.card_urls)}}}
+            **Target Audience:** {self.target_audience}
+
+            **Evaluate the carousel as a whole and provide constructive feedback:**
+            1. Format: All cards 1:1 (optimal) or other? Score: X/100
+            2. Hook: Does card 1 stop the scroll and make swiping worthwhile?
+            3. Story: Does every card advance one idea, in a logical order?
+            4. Consistency: Same style, colors and branding on every card?
+            5. Text Overlay: Max 7 words per card (best practice) or more?
+            6. CTA visibility (on the last card)? Score: X/100
+            7. Colors: [Hex codes]
+
+            **Improvement:** Specific recommendation (name the card) OR "Good as is"
+
+            IMPORTANT: Detect the language from any text in the ad images,
+            and respond in that SAME LANGUAGE.
+            If the ad has English text, respond in English. If German, respond in German, etc.
+            Be clear and constructive. MAX 6 sentences in the analysis,
+            MAX 1 sentence per card note.
+
+            **Output:** Return ONLY a JSON object with the fields score (overall 0-100),
+            format_score (0-100), cta_visibility (0-100), authentic (true/false),
+            text_overlay_words (most words on any card), thumb_stopper (true/false, for card 1),
+            colors (list of hex codes), card_notes (one short note per card, in card order)
+            and analysis (your text analysis of the carousel incl. improvement, max 6 sentences)."""
+
+    def _landing_page_task(self) -> Task:
+        """The landing page scrape task"""
+        return MemoizedTask(
+            description=f"""Extrahiere den vollständigen Text-Content von folgender Landingpage:
+            {self.landing_page_url}
+
+            Verwende den Tiered Landing Page Scraper (statischer Abruf zuerst,
+            Playwright nur für JavaScript-gerenderte Seiten).
+
+            Achte auf:
+            - Vollständige Extraktion aller sichtbaren Texte
+            - Headlines, Subheadlines, Body-Text
+            - Call-to-Actions
+            - Entfernung von Boilerplate (Footer, Cookie-Banner-Text, etc.)
+
+            Bei Problemen (Timeout, 404, etc.) gib eine klare Fehlermeldung zurück.""",
+            expected_output="""Extrahierter Text-Content der Landingpage als String,
+            oder Fehlermeldung bei Problemen.""",
+            agent=self.landing_page_scraper,
+            name=TASK_LANDING_PAGE,
+            callback=self._task_callback(TASK_LANDING_PAGE, self.landing_page_scraper),
+            memo=self._memo,
         )
 
-        # Task 5: Synthesize Final Report
-        synthesize_report_task = Task(
-            description=f"""Create a CONCISE, CLEAR performance report.
+    def _synthesis_description(self, weighted: Optional[dict]) -> str:
+        """Synthesis prompt, with the pre-computed weighted score once it is known"""
+        if weighted:
+            labels = {"visual": "Visual", "copy": "Copy", "brand": "Brand"}
+            weights = ", ".join(
+                f"{labels[name]} {weight:g}%" for name, weight in weighted["weights"].items()
+            )
+            score_line = f"**Score:** {weighted['score']}/100 ({weights})"
+            assessment_line = f"**Assessment:** {weighted['assessment']}"
+            score_rule = (
+                "\n            - SCORE: Score and assessment are pre-computed. "
+                "Copy them EXACTLY, do NOT recalculate"
+            )
+        else:
+            score_line = "**Score:** X/100 (Visual 40%, Copy 50%, Brand 10%)"
+            assessment_line = "**Assessment:** [Good/Needs Improvement/Poor - BE HONEST]"
+            score_rule = ""
+        # Carousels: one line per card from the visual analysis' card notes
+        card_line = (
+            '\n            - Cards: [One short line per card, e.g. "Card 1: ..."]'
+            if self.card_urls
+            else ""
+        )
+
+        return f"""Create a CONCISE, CLEAR performance report.
 
             **Input Analyses:**
             - Visual: {{analyze_ad_task.output}}
@@ -152,15 +399,15 @@ class AdQualityRaterCrew:
 
             # 📊 Ad Performance Analysis
 
-            **Score:** X/100 (Visual 40%, Copy 50%, Brand 10%)
-            **Assessment:** [Good/Needs Improvement/Poor - BE HONEST]
+            {score_line}
+            {assessment_line}
 
             ---
 
             ## 🎨 Visual (MAX 4 sentences)
             - Format: [1:1 or other? Assessment]
             - Authenticity: [Stock photo? Yes/No]
-            - Text Overlay: [Assessment]
+            - Text Overlay: [Assessment]{card_line}
             - **Improvement:** [Specific suggestion OR "Good as is"]
 
             ## ✍️ Copy (MAX 4 sentences)
@@ -189,26 +436,181 @@ class AdQualityRaterCrew:
             - CLEAR: Be specific and constructive
             - ACTIONABLE: Every critique includes a concrete fix
             - FOCUS: Only TOP 2 improvements for highest impact
-            - Skip brand section if no guidelines provided
+            - Skip brand section if no guidelines provided{score_rule}
             - LANGUAGE: Use the SAME LANGUAGE as detected in all previous analyses
 
-            Be concise and constructive.""",
-            expected_output="""Concise performance report (max 15 sentences total) with:
-            - Clear assessment
-            - Top 2 improvements with ready-to-use text
-            - Constructive feedback
-            - Response in the SAME LANGUAGE as the ad content""",
-            agent=self.quality_rating_synthesizer,
-            context=[analyze_ad_task, scrape_lp_task, copywriting_task, brand_compliance_task],
+            Be concise and constructive."""
+
+    def _task_callback(self, task_name: str, agent: Any) -> Callable[[Any], None]:
+        """Build the CrewAI task callback that records and forwards a task's output"""
+
+        def callback(output: Any):
+            now = time.time()
+            started = self._last_task_finished or self.start_time or now
+            self._last_task_finished = now
+
+            usage = _token_usage(agent)
+            baseline = self._token_baseline.get(task_name, {})
+            usage = {field: usage[field] - baseline.get(field, 0) for field in usage}
+
+            structured = getattr(output, "pydantic", None)
+            result = {
+                "task": task_name,
+                "output": (
+                    structured.analysis
+                    if structured is not None
+                    else (getattr(output, "raw", None) or str(output))
+                ),
+                "duration_seconds": round(now - started, 2),
+                "token_usage": usage,
+                "cached": self.cache_status.get(task_name) == CACHE_HIT,
+            }
+            if structured is not None:
+                result["scores"] = structured.model_dump(exclude={"analysis"})
+                self._score_models[task_name] = structured
+                self._update_weighted_score()
+            self.task_results[task_name] = result
+
+            if self.on_task_complete is not None:
+                try:
+                    self.on_task_complete(result)
+                except Exception as e:
+                    logger.warning("on_task_complete failed", task=task_name, error=str(e))
+
+            # Not enough budget left for the LLM report - finish with a partial one
+            if (
+                task_name != TASK_REPORT
+                and self.deadline is not None
+                and not self.deadline.allows(SYNTHESIS_MIN_BUDGET_S)
+            ):
+                self.cancel_token.cancel(DEADLINE_EXCEEDED, DeadlineExceeded)
+
+            # Checkpoint between tasks - raising here skips the pending ones
+            self.cancel_token.raise_if_cancelled()
+
+        return callback
+
+    def _budget_allows_brand(self) -> bool:
+        """Brand is the optional 10% - drop it first when the deadline gets tight"""
+        if self.deadline is None or self.deadline.allows(BRAND_MIN_BUDGET_S):
+            return True
+        logger.info(
+            "Skipping brand check, deadline budget too short",
+            remaining_s=round(self.deadline.remaining(), 1),
         )
+        add_metric("deadline_skipped_brand")
+        return False
+
+    def partial_report(self) -> str:
+        """Report assembled from the finished tasks when the deadline ran out"""
+        processing_time = time.time() - self.start_time if self.start_time else 0
+        weighted = (self.scores or {}).get("weighted")
+
+        lines = ["# ⏱️ Teilbericht (Zeitbudget erschöpft)", ""]
+        if weighted:
+            lines.append(
+                f"**Score:** {weighted['score']}/100 – {weighted['assessment']} "
+                f"(aus den abgeschlossenen Teil-Analysen)"
+            )
+            lines.append("")
+
+        missing = []
+        for task_name, title, score_key in PARTIAL_REPORT_SECTIONS:
+            result = self.task_results.get(task_name)
+            if result is None:
+                if task_name != TASK_BRAND or self.brand_guidelines:
+                    missing.append(title)
+                continue
+            score = (result.get("scores") or {}).get("score")
+            heading = f"## {title} ({score}/100)" if score is not None else f"## {title}"
+            lines.extend([heading, "", str(result["output"]).strip(), ""])
+            card_notes = (result.get("scores") or {}).get("card_notes") or []
+            if card_notes:
+                lines.extend(
+                    [
+                        *(
+                            f"- Karte {number}: {note}"
+                            for number, note in enumerate(card_notes, start=1)
+                        ),
+                        "",
+                    ]
+                )
+
+        if missing:
+            lines.append(f"_Nicht abgeschlossen: {', '.join(missing)}_")
+            lines.append("")
+        lines.append(f"---\n\n**⏱️ Verarbeitungszeit:** {processing_time:.1f} Sekunden")
+        return "\n".join(lines)
+
+    def _update_weighted_score(self):
+        """Recompute the weighted score and hand it to the synthesis task as a fact"""
+        weighted = compute_weighted_score(
+            self._score_models.get(TASK_VISUAL),
+            self._score_models.get(TASK_COPYWRITING),
+            self._score_models.get(TASK_BRAND),
+        )
+        self.scores = {
+            "visual": self.task_results.get(TASK_VISUAL, {}).get("scores"),
+            "copy": self.task_results.get(TASK_COPYWRITING, {}).get("scores"),
+            "brand": self.task_results.get(TASK_BRAND, {}).get("scores"),
+            "weighted": weighted,
+        }
+        if self._synthesis_task is not None and weighted is not None:
+            self._synthesis_task.description = self._synthesis_description(weighted)
+
+    def scrape_landing_page(self) -> str:
+        """
+        Run only the landing page task (scraped once for all variants of a comparison)
 
-        return [
-            analyze_ad_task,
-            scrape_lp_task,
-            copywriting_task,
-            brand_compliance_task,
-            synthesize_report_task,
-        ]
+        Returns:
+            The extracted landing page text
+        """
+        self.cancel_token.raise_if_cancelled()
+        self.start_time = time.time()
+        self._resolve_landing_page()
+        self._memo = self._create_memo()
+        task = self._landing_page_task()
+        crew = Crew(
+            agents=[self.landing_page_scraper],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True,
+        )
+        return str(crew.kickoff())
+
+    def _resolve_landing_page(self):
+        """Follow the landing page's redirects before it is scraped (once per URL and TTL)"""
+        if self.landing_page_text is None and replay.get_mode() == replay.MODE_OFF:
+            self.landing_page_url = resolve_landing_page_url(
+                self.landing_page_url, timeout=budget_timeout(5)
+            )
+
+    def _create_memo(self) -> Optional[TaskMemo]:
+        """Task memoization for this run (off when disabled or while recording cassettes)"""
+        cache = get_task_cache()
+        if cache is None or replay.get_mode() == replay.MODE_RECORD:
+            return None
+        memo = TaskMemo(
+            cache,
+            inputs={
+                TASK_VISUAL: (
+                    {"ad": ad_fingerprint(self.ad_url)}
+                    if not self.card_urls
+                    else {
+                        "cards": [ad_fingerprint(card_url) for card_url in self.card_urls],
+                    }
+                )
+            },
+            volatile={TASK_LANDING_PAGE},
+        )
+        # Same object as the map in the response
+        memo.status = self.cache_status
+        return memo
+
+    def _finish_partial(self) -> str:
+        self.partial = True
+        record_metric("partial_report", 1)
+        return self.partial_report()
 
     def kickoff(self) -> str:
         """
@@ -216,20 +618,46 @@ class AdQualityRaterCrew:
 
         Returns:
             Text report from the analysis
+
+        Raises:
+            AnalysisCancelled: If the cancel token fires during the run (a deadline
+                yields a partial report instead)
         """
+        if self.scrape_only:
+            raise ValueError("This crew was created with scrape_only - use scrape_landing_page()")
+        self.cancel_token.raise_if_cancelled()
         self.start_time = time.time()
+        self._last_task_finished = None
+        self.error = None
+        self.scores = {}
+        self._score_models = {}
+        self._token_baseline = {
+            TASK_VISUAL: _token_usage(self.ad_visual_analyst),
+            TASK_LANDING_PAGE: _token_usage(self.landing_page_scraper),
+            TASK_COPYWRITING: _token_usage(self.copywriting_expert),
+            TASK_BRAND: _token_usage(self.brand_consistency_agent),
+            TASK_REPORT: _token_usage(self.quality_rating_synthesizer),
+        }
+        self.cache_status = {}
+        self._resolve_landing_page()
+        self._memo = self._create_memo()
+        detach_stream = lambda: None
+        tasks: list[Task] = []
 
         try:
+            if self.on_report_delta is not None and self.quality_rating_synthesizer is not None:
+                detach_stream = llm_streaming.attach(
+                    self.quality_rating_synthesizer.llm,
+                    self.on_report_delta,
+                    self.on_report_reset,
+                )
+
+            tasks = self._create_tasks()
+
             # Create crew
             crew = Crew(
-                agents=[
-                    self.ad_visual_analyst,
-                    self.landing_page_scraper,
-                    self.copywriting_expert,
-                    self.brand_consistency_agent,
-                    self.quality_rating_synthesizer,
-                ],
-                tasks=self._create_tasks(),
+                agents=[task.agent for task in tasks],
+                tasks=tasks,
                 process=Process.sequential,
                 verbose=True,
             )
@@ -248,8 +676,25 @@ class AdQualityRaterCrew:
 
             return result_text
 
+        except AnalysisCancelled:
+            skipped = max(0, len(tasks) - len(self.task_results))
+            add_metric("tasks_skipped", skipped)
+            logger.info(
+                "Analysis cancelled", reason=self.cancel_token.reason, tasks_skipped=skipped
+            )
+            if self.cancel_token.deadline_exceeded:
+                return self._finish_partial()
+            raise
+
         except Exception as e:
+            if self.cancel_token.cancelled:
+                # CrewAI may wrap the cancellation in its own error
+                add_metric("tasks_skipped", max(0, len(tasks) - len(self.task_results)))
+                if self.cancel_token.deadline_exceeded:
+                    return self._finish_partial()
+                raise AnalysisCancelled(f"Analysis cancelled ({self.cancel_token.reason})") from e
             processing_time = time.time() - self.start_time if self.start_time else 0
+            self.error = str(e)
 
             return f"""# ❌ Analyse Fehlgeschlagen
 
@@ -258,3 +703,17 @@ class AdQualityRaterCrew:
 **Verarbeitungszeit:** {processing_time:.1f} Sekunden
 
 Bitte versuchen Sie es erneut oder kontaktieren Sie den Support."""
+        finally:
+            detach_stream()
+            if self.cache_status:
+                record_metric("task_cache", dict(self.cache_status))
+                add_metric(
+                    "task_cache_hits",
+                    sum(1 for status in self.cache_status.values() if status == CACHE_HIT),
+                )
+                add_metric(
+                    "task_cache_near_duplicates",
+                    sum(
+                        1 for status in self.cache_status.values() if status == CACHE_NEAR_DUPLICATE
+                    ),
+                )
@@ -0,0 +1,246 @@
+"""Task-Level Memoization
+
+Each task's output is cached under a fingerprint of everything that shapes
+it: the prompt as sent (description, expected output, output schema), the
+agent's role/goal/backstory, the model and temperature, PROMPT_VERSION,
+task-specific inputs the prompt doesn't show (the ad's content) and the
+outputs of the upstream tasks. A changed image therefore reruns the visual
+analysis and everything downstream of it, but serves the landing page
+scrape from cache; changed brand guidelines rerun only brand and report.
+
+Outputs of external content (the landing page scrape) expire after
+TASK_CACHE_TTL_S, all others after TASK_CACHE_STABLE_TTL_S. When an expired
+scrape is rerun and its text's SimHash is within TASK_CACHE_SIMHASH_DISTANCE
+bits of the previous output, the page hasn't materially changed: the
+previous output is kept, so every downstream task is still served from
+the cache.
+
+Only clean outputs are cached: not those written around a failed tool call
+(counted per request, see track_tool_failures), nor structured outputs that
+didn't validate, nor those of a cancelled run.
+
+Configured via environment variables:
+    TASK_CACHE_SIMHASH_DISTANCE:   Differing SimHash bits (of 64) up to which a rescraped page
+                                   counts as unchanged (default: 3, -1 = off)
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from crewai import Task
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.tasks.output_format import OutputFormat
+from crewai.tasks.task_output import TaskOutput
+from pydantic import Field
+
+from utils.blob_store import is_blob_handle
+from utils.logger import logger
+from utils.request_context import cancel_token, tool_failures
+from utils.simhash import hamming, simhash
+from utils.task_cache import TaskCache
+
+
+# Bump when tools or agent behaviour change in ways the prompts don't show
+PROMPT_VERSION = "1"
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+# Rerun, but the output matched the previous one closely enough to keep that
+CACHE_NEAR_DUPLICATE = "near_duplicate"
+
+SIMHASH_MAX_DISTANCE = int(os.getenv("TASK_CACHE_SIMHASH_DISTANCE", "3"))
+
+
+def ad_fingerprint(ad_url: str) -> str:
+    """
+    Identify the ad image by content where possible
+
+    Blob handles are content-addressed already; local files are hashed, so a
+    replaced file under the same path counts as a new image. Remote URLs are
+    taken as they are.
+    """
+    if is_blob_handle(ad_url) or ad_url.startswith(("http://", "https://")):
+        return ad_url
+    if ad_url.startswith("data:"):
+        return hashlib.sha256(ad_url.encode("utf-8")).hexdigest()
+    try:
+        with open(ad_url, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ad_url
+
+
+class TaskMemo:
+    """Fingerprints, cache access and the hit/miss map of one crew run"""
+
+    def __init__(
+        self,
+        cache: TaskCache,
+        inputs: Optional[dict[str, dict]] = None,
+        volatile: Optional[set[str]] = None,
+    ):
+        """
+        Args:
+            cache: Output store
+            inputs: Per task name, inputs that shape the output but aren't in the prompt
+            volatile: Names of tasks that read external content (short TTL, SimHash reuse)
+        """
+        self.cache = cache
+        self.inputs = inputs or {}
+        self.volatile = volatile or set()
+        self.status: dict[str, str] = {}
+
+    def fingerprint(self, task: Task, agent: Any, context: Optional[str]) -> str:
+        llm = getattr(agent, "llm", None)
+        schema = task.output_pydantic.model_json_schema() if task.output_pydantic else None
+        payload = {
+            "prompt_version": PROMPT_VERSION,
+            "task": task.name,
+            "description": task.description,
+            "expected_output": task.expected_output,
+            "schema": schema,
+            "agent": [getattr(agent, field, None) for field in ("role", "goal", "backstory")],
+            "model": getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "inputs": self.inputs.get(task.name),
+            "context": context,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def lookup(self, key: str, task_name: str) -> Optional[dict]:
+        max_age = self.cache.ttl if task_name in self.volatile else self.cache.stable_ttl
+        try:
+            return self.cache.get(key, max_age=max_age)
+        except Exception as e:
+            logger.warning("Task cache lookup failed", error=str(e))
+            return None
+
+    def _unchanged_previous(self, key: str, task_name: str, output: TaskOutput) -> Optional[dict]:
+        """The expired output of a volatile task, if the new one is a near-duplicate of it"""
+        if task_name not in self.volatile or SIMHASH_MAX_DISTANCE < 0:
+            return None
+        try:
+            previous = self.cache.get(key, max_age=self.cache.stable_ttl)
+        except Exception as e:
+            logger.warning("Task cache lookup failed", error=str(e))
+            return None
+        if previous is None:
+            return None
+        distance = hamming(simhash(previous["raw"]), simhash(output.raw))
+        if distance > SIMHASH_MAX_DISTANCE:
+            logger.debug(
+                "Content changed since the cached output", task=task_name, simhash_distance=distance
+            )
+            return None
+        logger.info(
+            "Content unchanged, keeping the cached output",
+            task=task_name,
+            simhash_distance=distance,
+        )
+        return previous
+
+    def store(self, key: str, task_name: str, output: TaskOutput) -> Optional[dict]:
+        """
+        Cache a fresh output
+
+        Returns:
+            The previous output to use instead, if the task is volatile and
+            its content hasn't materially changed (None otherwise)
+        """
+        previous = self._unchanged_previous(key, task_name, output)
+        if previous is not None:
+            self.status[task_name] = CACHE_NEAR_DUPLICATE
+            raw, structured = previous["raw"], previous["structured"]
+        else:
+            raw = output.raw
+            structured = output.pydantic.model_dump() if output.pydantic is not None else None
+        try:
+            # Also renews the previous output's age
+            self.cache.put(key, task_name, raw, structured)
+        except Exception as e:
+            logger.warning("Task cache write failed", task=task_name, error=str(e))
+        return previous
+
+
+class MemoizedTaskMixin:
+    """Serves execute_sync from the task cache while the fingerprint is unchanged"""
+
+    def execute_sync(
+        self, agent: Any = None, context: Optional[str] = None, tools: Optional[list] = None
+    ) -> TaskOutput:
+        memo: Optional[TaskMemo] = self.memo
+        if memo is None:
+            return super().execute_sync(agent=agent, context=context, tools=tools)
+
+        key = memo.fingerprint(self, agent or self.agent, context)
+        cached = memo.lookup(key, self.name)
+        if cached is not None:
+            memo.status[self.name] = CACHE_HIT
+            output = self._cached_output(cached, agent or self.agent)
+            self.output = output
+            if self.callback:
+                self.callback(output)
+            return output
+
+        memo.status[self.name] = CACHE_MISS
+        failures_before = tool_failures()
+        try:
+            super().execute_sync(agent=agent, context=context, tools=tools)
+        finally:
+            # Also when the callback stops the run (deadline) after the output was produced
+            if self.output is not None and self._cacheable(failures_before):
+                previous = memo.store(key, self.name, self.output)
+                if previous is not None:
+                    # Downstream tasks see the unchanged output, so their cache entries match
+                    self.output = self._cached_output(previous, agent or self.agent)
+        return self.output
+
+    def _cacheable(self, failures_before: int) -> bool:
+        """
+        Only outputs of a clean run are cached
+
+        An output the agent wrote around a failed tool call (Gemini 5xx, missing
+        blob, scrape timeout) or that didn't validate against the task's schema
+        would otherwise be replayed for the whole TTL. A cancelled run's output
+        isn't trusted either; a deadline is covered by the checks above (tools
+        it interrupts report a failure, LLM calls it interrupts leave no output).
+        """
+        if tool_failures() > failures_before:
+            logger.info("Not caching task output, a tool call failed", task=self.name)
+            return False
+        if self.output_pydantic is not None and self.output.pydantic is None:
+            logger.info("Not caching task output, it did not validate", task=self.name)
+            return False
+        token = cancel_token()
+        if token is not None and token.cancelled and not token.deadline_exceeded:
+            return False
+        return True
+
+    def _cached_output(self, cached: dict, agent: Any) -> TaskOutput:
+        structured = None
+        if cached["structured"] is not None and self.output_pydantic is not None:
+            structured = self.output_pydantic.model_validate(cached["structured"])
+        return TaskOutput(
+            description=self.description,
+            name=self.name,
+            expected_output=self.expected_output,
+            raw=cached["raw"],
+            pydantic=structured,
+            agent=getattr(agent, "role", ""),
+            output_format=OutputFormat.PYDANTIC if structured is not None else OutputFormat.RAW,
+        )
+
+
+class MemoizedTask(MemoizedTaskMixin, Task):
+    memo: Optional[Any] = Field(
+        default=None, exclude=True, description="TaskMemo of the run (None = no caching)"
+    )
+
+
+class MemoizedConditionalTask(MemoizedTaskMixin, ConditionalTask):
+    memo: Optional[Any] = Field(
+        default=None, exclude=True, description="TaskMemo of the run (None = no caching)"
+    )
@@ -0,0 +1,114 @@
+"""Structured Agent Scores and Deterministic Weighted Score
+
+The visual, copywriting and brand tasks return these models (via CrewAI's
+output_pydantic) instead of free text. The weighted total is computed here
+in Python and handed to the synthesizer as a fact, so the LLM neither
+spends tokens on the arithmetic nor gets it wrong.
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+# Visual 40%, Copy 50%, Brand 10% - renormalized over the available scores
+SCORE_WEIGHTS = {"visual": 0.4, "copy": 0.5, "brand": 0.1}
+
+
+class VisualScore(BaseModel):
+    """Structured output of the visual analysis task"""
+
+    score: int = Field(ge=0, le=100, description="Overall visual score (0-100)")
+    format_score: int = Field(ge=0, le=100, description="Format score, 1:1 is optimal (0-100)")
+    cta_visibility: int = Field(ge=0, le=100, description="CTA visibility (0-100)")
+    authentic: bool = Field(description="True if authentic imagery, False if generic stock photo")
+    text_overlay_words: int = Field(ge=0, description="Number of words in the text overlay")
+    thumb_stopper: bool = Field(description="Would a user stop scrolling?")
+    colors: list[str] = Field(default_factory=list, description="Dominant colors as hex codes")
+    analysis: str = Field(description="The full text analysis with improvement suggestion")
+
+
+class CarouselVisualScore(VisualScore):
+    """Structured output of the visual analysis task for a carousel / multi-image ad"""
+
+    card_notes: list[str] = Field(
+        default_factory=list, description="One short note per card, in card order"
+    )
+
+
+class CopyScore(BaseModel):
+    """Structured output of the copywriting task"""
+
+    score: int = Field(ge=0, le=100, description="Overall copywriting score (0-100)")
+    consistency_score: int = Field(
+        ge=0, le=100, description="Message consistency ad -> landing page (0-100)"
+    )
+    tone: str = Field(description="'educational' or 'salesy'")
+    cta_appropriate: bool = Field(description="Is the CTA appropriate?")
+    pain_point_clear: bool = Field(description="Is a clear pain point addressed?")
+    pio_formula: bool = Field(description="Is the Pain-Impact-Offer formula present?")
+    analysis: str = Field(description="The full text analysis with ready-to-use improvement text")
+
+
+class BrandScore(BaseModel):
+    """Structured output of the brand compliance task"""
+
+    score: Optional[int] = Field(
+        default=None, ge=0, le=100, description="Brand score (0-100), null without guidelines"
+    )
+    tone_ok: Optional[bool] = None
+    colors_ok: Optional[bool] = None
+    forbidden_words_found: list[str] = Field(default_factory=list)
+    analysis: str = Field(description="Brief brand feedback (max 3 sentences)")
+
+
+def assessment_for(score: float) -> str:
+    """Map a weighted score to the report's assessment label"""
+    if score >= 90:
+        return "Good"
+    if score >= 70:
+        return "Needs Improvement"
+    return "Poor"
+
+
+def compute_weighted_score(
+    visual: Optional[VisualScore],
+    copy: Optional[CopyScore],
+    brand: Optional[BrandScore] = None,
+) -> Optional[dict]:
+    """
+    Compute the weighted total, renormalizing over the scores that exist
+
+    Brand is skipped when no guidelines were provided (or its score is null);
+    the remaining weights are scaled up to sum to 100%.
+
+    Args:
+        visual: Visual task output
+        copy: Copywriting task output
+        brand: Brand task output (optional)
+
+    Returns:
+        dict with score, assessment, the effective weights and component scores,
+        or None if no component score is available
+    """
+    components = {}
+    if visual is not None:
+        components["visual"] = visual.score
+    if copy is not None:
+        components["copy"] = copy.score
+    if brand is not None and brand.score is not None:
+        components["brand"] = brand.score
+
+    if not components:
+        return None
+
+    total_weight = sum(SCORE_WEIGHTS[name] for name in components)
+    weights = {name: SCORE_WEIGHTS[name] / total_weight for name in components}
+    score = sum(components[name] * weights[name] for name in components)
+
+    return {
+        "score": round(score),
+        "assessment": assessment_for(score),
+        "weights": {name: round(weight * 100, 1) for name, weight in weights.items()},
+        "components": components,
+    }
@@ -0,0 +1,167 @@
+"""Shared Job and Event Store
+
+Job status, the SSE event log and the final result live in a store that
+every uvicorn worker (and every pod) can reach, so any worker can serve the
+stream or status of an analysis started elsewhere.
+
+Backends are selected via JOB_STORE_URL:
+    sqlite:///path/to/jobs.db   SQLite file (default, shared by workers on one host)
+    redis://host:6379/0         Redis-compatible store (shared across nodes, needs `redis`)
+
+Other settings:
+    JOB_STORE_TTL_S:            Seconds finished jobs and their events are kept (default: 86400)
+    SSE_REPLAY_EVENTS:          Events kept per job for stream replay, report deltas not counted;
+                                older ones are trimmed while the job runs
+                                (default: 1000, 0 = keep all)
+"""
+
+import os
+import socket
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+TERMINAL_STATUSES = {STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED}
+
+# Fields that update_job() accepts; dict/list values are stored as JSON
+JOB_FIELDS = (
+    "status",
+    "params",
+    "result",
+    "error",
+    "scores",
+    "metrics",
+    "worker",
+    "cancel_requested",
+    "reconnects",
+)
+JSON_FIELDS = ("params", "scores", "metrics")
+
+DEFAULT_TTL_S = 24 * 60 * 60
+REPLAY_EVENTS = int(os.getenv("SSE_REPLAY_EVENTS", "1000"))
+
+
+def worker_id() -> str:
+    """Identifies the process running a job (host:pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore(ABC):
+    """Interface of the shared job/event store"""
+
+    @abstractmethod
+    def create_job(self, job_id: str, params: dict) -> None:
+        """Register a new job in status "queued" """
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        Load a job
+
+        Returns:
+            dict with id, status, params, result, error, scores, metrics,
+            worker, reconnects, events_trimmed, created_at and updated_at -
+            or None if unknown/expired
+        """
+
+    @abstractmethod
+    def update_job(self, job_id: str, **fields) -> None:
+        """Update job fields (see JOB_FIELDS)"""
+
+    @abstractmethod
+    def append_event(self, job_id: str, event: dict) -> int:
+        """
+        Append an event to the job's log
+
+        Returns:
+            Sequence number of the event (increasing per job)
+        """
+
+    @abstractmethod
+    def read_events(self, job_id: str, after: int = 0, limit: int = 500) -> list[tuple[int, dict]]:
+        """
+        Read events with a sequence number greater than `after`
+
+        Returns:
+            List of (seq, event) in order
+        """
+
+    @abstractmethod
+    def trim_events(self, job_id: str, keep: int) -> int:
+        """
+        Drop all but the newest `keep` events of a job
+
+        The highest dropped sequence number is recorded as the job's
+        "events_trimmed", so readers can tell a resume point is gone.
+
+        Returns:
+            Number of events dropped
+        """
+
+    def cleanup(self) -> int:
+        """Delete expired jobs and events (no-op for stores with native expiry)"""
+        return 0
+
+    def record_reconnect(self, job_id: str) -> int:
+        """Count a client reconnecting to the job's stream; returns the new count"""
+        job = self.get_job(job_id)
+        count = int((job or {}).get("reconnects") or 0) + 1
+        self.update_job(job_id, reconnects=count)
+        return count
+
+    def request_cancel(self, job_id: str) -> None:
+        """Flag a job for cancellation (picked up by the worker running it)"""
+        self.update_job(job_id, cancel_requested=1)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        return bool(job and int(job.get("cancel_requested") or 0))
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def create_job_store(url: str, ttl: float = DEFAULT_TTL_S) -> JobStore:
+    """
+    Create a store from a URL
+
+    Args:
+        url: sqlite:///path or redis://host:port/db (rediss:// for TLS)
+        ttl: Seconds jobs are kept
+
+    Returns:
+        JobStore instance
+
+    Raises:
+        ValueError: For unsupported URL schemes or a missing backend package
+    """
+    if url.startswith("sqlite:///"):
+        from store.sqlite_store import SQLiteJobStore
+
+        return SQLiteJobStore(url[len("sqlite:///") :], ttl=ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        from store.redis_store import RedisJobStore
+
+        return RedisJobStore(url, ttl=ttl)
+    raise ValueError(f"Unsupported JOB_STORE_URL: {url}")
+
+
+def get_job_store() -> JobStore:
+    """Get or create the process-wide store configured by JOB_STORE_URL"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            default_path = os.path.join(tempfile.gettempdir(), "ads_quality_rater_jobs.db")
+            _store = create_job_store(
+                os.getenv("JOB_STORE_URL", f"sqlite:///{default_path}"),
+                ttl=float(os.getenv("JOB_STORE_TTL_S", str(DEFAULT_TTL_S))),
+            )
+        return _store
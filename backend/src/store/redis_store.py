@@ -0,0 +1,132 @@
+"""Redis Job Store (shared across hosts)
+
+Works with any Redis-compatible server (Redis, Valkey, KeyDB, Dragonfly).
+Jobs are hashes, events are lists - the list length after RPUSH plus the
+number of trimmed events (job field "events_trimmed") is the event's
+sequence number. Keys expire after the TTL.
+"""
+
+import json
+import time
+from typing import Optional
+
+from store.job_store import (
+    DEFAULT_TTL_S,
+    JOB_FIELDS,
+    JSON_FIELDS,
+    STATUS_QUEUED,
+    JobStore,
+)
+
+try:
+    import redis
+except ImportError:  # Optional dependency
+    redis = None
+
+
+KEY_PREFIX = "adsqr:job:"
+
+# KEYS: events list, job hash - ARGV: events to keep
+TRIM_SCRIPT = """
+local dropped = redis.call('LLEN', KEYS[1]) - tonumber(ARGV[1])
+if dropped <= 0 then return 0 end
+redis.call('LTRIM', KEYS[1], dropped, -1)
+redis.call('HINCRBY', KEYS[2], 'events_trimmed', dropped)
+return dropped
+"""
+
+# KEYS: events list, job hash - ARGV: after, limit; returns {seq of the first item, items}
+READ_SCRIPT = """
+local trimmed = tonumber(redis.call('HGET', KEYS[2], 'events_trimmed') or '0')
+local start = math.max(tonumber(ARGV[1]) - trimmed, 0)
+return {trimmed + start + 1, redis.call('LRANGE', KEYS[1], start, start + tonumber(ARGV[2]) - 1)}
+"""
+
+
+class RedisJobStore(JobStore):
+    """Jobs as hashes (adsqr:job:<id>) and events as lists (adsqr:job:<id>:events)"""
+
+    def __init__(self, url: str, ttl: float = DEFAULT_TTL_S):
+        if redis is None:
+            raise ValueError(
+                "JOB_STORE_URL points to Redis, but the 'redis' package is not installed"
+            )
+        self.ttl = int(ttl)
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._trim = self.client.register_script(TRIM_SCRIPT)
+        self._read = self.client.register_script(READ_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{KEY_PREFIX}{job_id}"
+
+    def _events_key(self, job_id: str) -> str:
+        return f"{KEY_PREFIX}{job_id}:events"
+
+    def create_job(self, job_id: str, params: dict) -> None:
+        now = time.time()
+        key = self._job_key(job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(
+            key,
+            mapping={
+                "id": job_id,
+                "status": STATUS_QUEUED,
+                "params": json.dumps(params, default=str),
+                "created_at": now,
+                "updated_at": now,
+            },
+        )
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        job = self.client.hgetall(self._job_key(job_id))
+        if not job:
+            return None
+        for field in JSON_FIELDS:
+            if job.get(field):
+                job[field] = json.loads(job[field])
+        for field in ("created_at", "updated_at"):
+            job[field] = float(job[field])
+        for field in ("reconnects", "events_trimmed"):
+            job[field] = int(job.get(field) or 0)
+        for field in JOB_FIELDS:
+            job.setdefault(field, None)
+        return job
+
+    def update_job(self, job_id: str, **fields) -> None:
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        mapping = {"updated_at": time.time()}
+        for field, value in fields.items():
+            if value is None:
+                continue
+            mapping[field] = json.dumps(value, default=str) if field in JSON_FIELDS else value
+        key = self._job_key(job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def append_event(self, job_id: str, event: dict) -> int:
+        key = self._events_key(job_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, json.dumps(event, default=str))
+        pipe.hget(self._job_key(job_id), "events_trimmed")
+        pipe.expire(key, self.ttl)
+        length, trimmed, _ = pipe.execute()
+        return int(length) + int(trimmed or 0)
+
+    def read_events(self, job_id: str, after: int = 0, limit: int = 500) -> list[tuple[int, dict]]:
+        # seq n is stored at list index n - 1 - events_trimmed
+        first_seq, items = self._read(
+            keys=[self._events_key(job_id), self._job_key(job_id)], args=[after, limit]
+        )
+        return [(int(first_seq) + i, json.loads(item)) for i, item in enumerate(items)]
+
+    def trim_events(self, job_id: str, keep: int) -> int:
+        return int(self._trim(keys=[self._events_key(job_id), self._job_key(job_id)], args=[keep]))
+
+    def record_reconnect(self, job_id: str) -> int:
+        return int(self.client.hincrby(self._job_key(job_id), "reconnects", 1))
@@ -0,0 +1,177 @@
+"""SQLite Job Store (single host, any number of worker processes)"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from store.job_store import (
+    DEFAULT_TTL_S,
+    JOB_FIELDS,
+    JSON_FIELDS,
+    STATUS_QUEUED,
+    JobStore,
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    scores TEXT,
+    metrics TEXT,
+    worker TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    reconnects INTEGER NOT NULL DEFAULT 0,
+    events_trimmed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_job ON events (job_id, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at);
+"""
+
+
+def _encode(field: str, value: Any) -> Any:
+    if field in JSON_FIELDS and value is not None:
+        return json.dumps(value, default=str)
+    return value
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs and events in one SQLite file (WAL mode)
+
+    Event sequence numbers come from a global AUTOINCREMENT key, so they are
+    unique and increasing per job without any cross-process locking.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL_S):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Databases created before cancellation and stream replay support
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("cancel_requested", "reconnects", "events_trimmed"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, job_id: str, params: dict) -> None:
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, STATUS_QUEUED, _encode("params", params), now, now),
+        )
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in JSON_FIELDS:
+            if job.get(field):
+                job[field] = json.loads(job[field])
+        return job
+
+    def update_job(self, job_id: str, **fields) -> None:
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        values = [_encode(field, value) for field, value in fields.items()]
+        self._conn().execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+            (*values, time.time(), job_id),
+        )
+
+    def append_event(self, job_id: str, event: dict) -> int:
+        cursor = self._conn().execute(
+            "INSERT INTO events (job_id, data) VALUES (?, ?)",
+            (job_id, json.dumps(event, default=str)),
+        )
+        return cursor.lastrowid
+
+    def read_events(self, job_id: str, after: int = 0, limit: int = 500) -> list[tuple[int, dict]]:
+        rows = (
+            self._conn()
+            .execute(
+                "SELECT seq, data FROM events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            )
+            .fetchall()
+        )
+        return [(row["seq"], json.loads(row["data"])) for row in rows]
+
+    def trim_events(self, job_id: str, keep: int) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Newest event that is dropped: the (keep + 1)-th from the end
+            row = conn.execute(
+                "SELECT seq FROM events WHERE job_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                (job_id, keep),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return 0
+            deleted = conn.execute(
+                "DELETE FROM events WHERE job_id = ? AND seq <= ?", (job_id, row["seq"])
+            ).rowcount
+            conn.execute(
+                "UPDATE jobs SET events_trimmed = MAX(events_trimmed, ?) WHERE id = ?",
+                (row["seq"], job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted
+
+    def record_reconnect(self, job_id: str) -> int:
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET reconnects = reconnects + 1 WHERE id = ?", (job_id,))
+        row = conn.execute("SELECT reconnects FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["reconnects"] if row else 0
+
+    def cleanup(self) -> int:
+        cutoff = time.time() - self.ttl
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM events WHERE job_id IN (SELECT id FROM jobs WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            deleted = conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted
@@ -1,62 +1,245 @@
-"""Gemini Vision Tool for Ad Image Analysis"""
+"""Gemini Vision Tool for Ad Image Analysis
+
+Single images and carousel / multi-image ads (one card per image). A small
+carousel goes to Gemini as one multimodal request with all cards, a larger
+one is analysed card by card concurrently, so the time per card stays flat
+as the card count grows.
+
+Configured via environment variables:
+    CAROUSEL_BATCH_MAX_CARDS:   Carousels up to this many cards are analysed in a single
+                                request (default: 4, 0 = always card by card)
+    CAROUSEL_MAX_PARALLEL:      Cards analysed at once otherwise (default: 10)
+"""
 
 from crewai.tools import tool
 from typing import Optional, Any
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
-import requests
+import contextvars
 import os
 import base64
 import re
 import time
 
+from utils import replay
+from utils.blob_store import BlobNotFoundError, blob_store, is_blob_handle
+from utils.image_index import analysis_variant, compute_hashes, exact_matches_only, get_image_index
+from utils.llm_config import record_model_call
+from utils.logger import logger
+from utils.request_context import (
+    add_metric,
+    budget_timeout,
+    check_cancelled,
+    record_metric,
+    track_tool_failures,
+)
+from utils.image_fetch import (
+    MAX_IMAGE_SIZE,
+    ImageFetchError,
+    fetch_image,
+    guess_mime_from_extension,
+    sniff_image_mime,
+)
+from utils.rate_limiter import (
+
+    ESTIMATED_OUTPUT_TOKENS,
+    IMAGE_TOKENS,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+
+CAROUSEL_BATCH_MAX_CARDS = int(os.getenv("CAROUSEL_BATCH_MAX_CARDS", "4"))
+CAROUSEL_MAX_PARALLEL = int(os.getenv("CAROUSEL_MAX_PARALLEL", "10"))
+
+CAROUSEL_BATCHED = "batched"
+CAROUSEL_PARALLEL = "parallel"
+
+DEFAULT_PROMPT = """Analyze this advertisement image clearly and concisely:
+
+1. Format: 1:1 or other? (important for LinkedIn)
+2. Colors: Dominant hex codes
+3. Composition Score: 0-100
+4. Authenticity: Stock photo or authentic?
+5. Text Overlay: How many words?
+6. CTA Visibility: 0-100
+7. Brand Elements: Yes/No
+
+IMPORTANT: Detect the language from any text in the image, and respond in that SAME LANGUAGE.
+If the ad has English text, respond in English. If German text, respond in German, etc.
+MAX 6 sentences. Be clear and constructive."""
+
+CAROUSEL_PROMPT = """These {count} images are the cards of ONE carousel advertisement,
+in swipe order.
+
+For EACH card write one section that starts with the literal label "Card N:" (N = card number)
+and covers in MAX 2 sentences: format (1:1 or other?), words of text overlay, CTA visibility
+and the card's role in the story.
+
+Then write one section that starts with the literal label "Sequence:" and covers in MAX 4
+sentences: does card 1 stop the scroll and make swiping worthwhile, does every card advance
+one idea, are style, dominant colors (hex codes) and branding consistent across the cards,
+and is there a clear CTA on the last card?
+
+IMPORTANT: Detect the language from any text in the images, and respond in that SAME LANGUAGE
+(keep the labels "Card N:" and "Sequence:" in English). Be clear and constructive."""
+
+_CAROUSEL_SECTION = re.compile(
+    r"^[\s*#_-]*(Card\s+(\d+)|Sequence)\s*[*_]*\s*:[*_]*\s*", re.IGNORECASE | re.MULTILINE
+)
+
 
 # Initialize Gemini client
 def get_gemini_client():
-    """Get or create Gemini client"""
+    """Get or create Gemini client (wrapped by the record/replay layer if enabled)"""
+    model_name = os.getenv("MODEL", "gemini-2.5-flash")
+    if replay.get_mode() == replay.MODE_REPLAY:
+        # Cassettes only - no API key or network needed
+        return replay.wrap_genai_client(None), model_name
+
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY environment variable not set")
-    model_name = os.getenv("MODEL", "gemini-2.5-flash")
     client = genai.Client(api_key=api_key)
-    return client, model_name
+    return replay.wrap_genai_client(client), model_name
 
 
-@tool("Gemini Vision Analyzer")
-def analyze_ad_image(image_url: str) -> dict:
-    """Analyzes advertisement images using Gemini 2.5 Flash Vision.
+def _display_source(image_url: str) -> str:
+    return image_url if not image_url.startswith("data:image") else "[Base64 Data URL]"
+
+
+def _error_source(image_url: str) -> str:
+    if image_url and not image_url.startswith("data:image"):
+        return image_url
+    return "[Image]"
+
+
+def _load_image(image_url: str) -> tuple[bytes, str]:
+    """
+    Bytes and MIME type of an ad image
 
     Args:
-        image_url: The URL or local file path to the ad image (required)
+        image_url: Blob handle, data URL, http(s) URL or local file path
 
-    Returns:
-        JSON with 'success' (bool), 'analysis' (string), and 'image_source' (string)
-        The analysis includes: colors, composition quality, emotional tone, CTA visibility, and brand elements.
+    Raises:
+        ImageFetchError: If the image can't be fetched or is too large
+    """
+    if image_url.startswith("data:image"):
+        # Base64 data URL (from screenshot upload)
+        match = re.match(r"data:(image/\w+);base64,(.+)", image_url)
+        if match:
+            final_mime_type = match.group(1)
+            base64_data = match.group(2)
+        else:
+            final_mime_type = "image/jpeg"
+            base64_data = re.sub("^data:image/.+;base64,", "", image_url)
+
+        final_bytes = base64.b64decode(base64_data)
+
+    elif is_blob_handle(image_url):
+        # Uploaded creative, handed over in memory by the API
+        try:
+            final_bytes, final_mime_type = blob_store.get(image_url)
+        except BlobNotFoundError as e:
+            raise ImageFetchError(str(e.args[0])) from e
+
+    elif image_url.startswith(("http://", "https://")):
+        # Fetch through the shared pool (streamed, size-capped, cached)
+        fetched = fetch_image(image_url, max_bytes=MAX_IMAGE_SIZE, timeout=budget_timeout(30))
+        final_bytes = fetched["data"]
+        final_mime_type = fetched["mime_type"]
+        logger.debug("Image fetched", size=fetched["size"], cache=fetched["cache"])
+
+    else:
+        # Local file
+        if os.path.getsize(image_url) > MAX_IMAGE_SIZE:
+            raise ImageFetchError(
+                f"Image too large for analysis. Maximum size is 10MB, "
+                f"got {os.path.getsize(image_url) / (1024*1024):.1f}MB"
+            )
+        with open(image_url, "rb") as f:
+            final_bytes = f.read()
+
+        # Detect MIME type from magic bytes, falling back to the extension
+        final_mime_type = sniff_image_mime(final_bytes[:32]) or guess_mime_from_extension(image_url)
+
+    # Validate image size (max 10MB for Gemini)
+    if len(final_bytes) > MAX_IMAGE_SIZE:
+        raise ImageFetchError(
+            f"Image too large for analysis. Maximum size is 10MB, "
+            f"got {len(final_bytes) / (1024*1024):.1f}MB"
+        )
+    return final_bytes, final_mime_type
 
-    Example:
-        analyze_ad_image("/tmp/tmpX1Y2Z3.jpg")
+
+def _generate(client: Any, model_name: str, contents: list, images: int) -> Any:
     """
-    prompt = None  # Always use default prompt
-    try:
-        # Get Gemini client
-        client, model_name = get_gemini_client()
+    One generate_content call through the process-wide limiter
 
-        # Use default prompt if none provided
-        if not prompt:
-            prompt = """Analyze this advertisement image clearly and concisely:
+    (RPM/TPM budget, jittered backoff with server retry hints, circuit breaker)
+    """
 
-1. Format: 1:1 or other? (important for LinkedIn)
-2. Colors: Dominant hex codes
-3. Composition Score: 0-100
-4. Authenticity: Stock photo or authentic?
-5. Text Overlay: How many words?
-6. CTA Visibility: 0-100
-7. Brand Elements: Yes/No
+    def generate():
+        start = time.perf_counter()
+        failed = False
+        try:
+            return client.models.generate_content(
+                model=model_name,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    temperature=0.1,
+                    max_output_tokens=4096,
+                ),
+            )
+        except Exception:
+            failed = True
+            raise
+        finally:
+            record_model_call(model_name, (time.perf_counter() - start) * 1000, failed)
+
+    prompt_tokens = sum(estimate_tokens(part) for part in contents if isinstance(part, str))
+    return get_rate_limiter(model_name).call(
+        generate,
+        estimated_tokens=prompt_tokens
+        + images * IMAGE_TOKENS
+        + ESTIMATED_OUTPUT_TOKENS * max(1, images // 2),
+        count_output=lambda result: estimate_tokens(getattr(result, "text", None)),
+    )
+
+
+def _empty_response_error(response: Any) -> Optional[str]:
+    """Error message if Gemini returned no text (blocked or empty), else None"""
+    if hasattr(response, "text") and response.text and response.text.strip() != "":
+        return None
+
+    # Check for safety ratings or blocked content
+    if hasattr(response, "candidates") and response.candidates:
+        candidate = response.candidates[0]
+        logger.debug(
+            "Empty Gemini response",
+            finish_reason=getattr(candidate, "finish_reason", None),
+            safety_ratings=getattr(candidate, "safety_ratings", None),
+        )
 
-IMPORTANT: Detect the language from any text in the image, and respond in that SAME LANGUAGE.
-If the ad has English text, respond in English. If German text, respond in German, etc.
-MAX 6 sentences. Be clear and constructive."""
+        if hasattr(candidate, "finish_reason"):
+            finish_reason = str(candidate.finish_reason)
+            return (
+                f"Gemini could not analyze the image (reason: {finish_reason}). "
+                "The image may have been blocked by safety filters. Please try a different image."
+            )
+
+    logger.debug("Empty Gemini response, no finish_reason found")
+    return (
+        "Gemini could not create an analysis. The image might be too small, unclear, "
+        "or blocked by filters. Please try a different image."
+    )
 
+
+def _analyze_one(image_url: str, client: Any, model_name: str) -> dict:
+    """Analysis of one image (the result dict of analyze_ad_image)"""
+    prompt = DEFAULT_PROMPT
+    try:
         # Validate input
         if not image_url:
             return {
@@ -64,144 +247,245 @@ MAX 6 sentences. Be clear and constructive."""
                 "error": "image_url must be provided",
             }
 
-        display_source = image_url if not image_url.startswith("data:image") else "[Base64 Data URL]"
-
-        if image_url.startswith("data:image"):
-            # Base64 data URL (from screenshot upload)
-            match = re.match(r'data:(image/\w+);base64,(.+)', image_url)
-            if match:
-                final_mime_type = match.group(1)
-                base64_data = match.group(2)
-            else:
-                final_mime_type = "image/jpeg"
-                base64_data = re.sub('^data:image/.+;base64,', '', image_url)
-
-            final_bytes = base64.b64decode(base64_data)
-
-        elif image_url.startswith(("http://", "https://")):
-            # Fetch from URL
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            final_bytes = response.content
-
-            # Detect MIME type from URL
-            final_mime_type = "image/jpeg"  # default
-            if image_url.lower().endswith('.png'):
-                final_mime_type = "image/png"
-            elif image_url.lower().endswith('.gif'):
-                final_mime_type = "image/gif"
-            elif image_url.lower().endswith('.webp'):
-                final_mime_type = "image/webp"
+        display_source = _display_source(image_url)
+        final_bytes, final_mime_type = _load_image(image_url)
 
-        else:
-            # Local file
-            with open(image_url, 'rb') as f:
-                final_bytes = f.read()
-
-            # Detect MIME type from file extension
-            final_mime_type = "image/jpeg"  # default
-            if image_url.lower().endswith('.png'):
-                final_mime_type = "image/png"
-            elif image_url.lower().endswith('.gif'):
-                final_mime_type = "image/gif"
-            elif image_url.lower().endswith('.webp'):
-                final_mime_type = "image/webp"
-
-        # Validate image size (max 10MB for Gemini)
-        MAX_IMAGE_SIZE = 10 * 1024 * 1024
-        if len(final_bytes) > MAX_IMAGE_SIZE:
-            return {
-                "success": False,
-                "error": f"Image too large for analysis. Maximum size is 10MB, got {len(final_bytes) / (1024*1024):.1f}MB",
-                "image_source": display_source,
-            }
+        # A near-duplicate of an analyzed creative (resized, recompressed, ...) reuses its analysis
+        image_index = get_image_index() if replay.get_mode() == replay.MODE_OFF else None
+        image_hashes = None
+        variant = analysis_variant(model_name, prompt)
+        if image_index is not None:
+            try:
+                image_hashes = compute_hashes(final_bytes)
+                near = image_index.find(image_hashes, variant)
+            except Exception as e:
+                logger.debug("Perceptual hash lookup skipped", error=str(e))
+                near = None
+            if near is not None:
+                logger.info(
+                    (
+                        "Reusing analysis of identical creative"
+                        if near.exact
+                        else "Reusing analysis of near-duplicate creative"
+                    ),
+                    distance=near.distance,
+                    lookup_ms=near.lookup_ms,
+                    reused_from=near.sha256[:12],
+                )
+                add_metric("vision_reused")
+                record_metric("vision_reuse_distance", near.distance)
+                return {
+                    "success": True,
+                    "analysis": near.analysis,
+                    "image_source": display_source,
+                    "reused": True,
+                    "reuse_distance": near.distance,
+                }
 
         # Create Part from bytes (proper Gemini SDK method)
         image_part = types.Part.from_bytes(
             data=final_bytes,
             mime_type=final_mime_type
         )
+        response = _generate(client, model_name, [prompt, image_part], images=1)
 
-        # Generate analysis with retry logic (up to 3 attempts)
-        max_retries = 3
-        last_error = None
+        # Debug: Log response structure
+        logger.debug("Gemini response received", has_candidates=hasattr(response, "candidates"))
 
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=[prompt, image_part],
-                    config=types.GenerateContentConfig(
-                        temperature=0.1,
-                        max_output_tokens=4096,
-                    )
-                )
-
-                # Debug: Log response structure
-                print(f"[DEBUG] Gemini response received (attempt {attempt + 1})")
-                print(f"[DEBUG] Has candidates: {hasattr(response, 'candidates')}")
-
-                # Check if response has text
-                if not hasattr(response, 'text') or not response.text or response.text.strip() == "":
-                    # Check for safety ratings or blocked content
-                    if hasattr(response, 'candidates') and response.candidates:
-                        candidate = response.candidates[0]
-                        print(f"[DEBUG] Candidate finish_reason: {getattr(candidate, 'finish_reason', 'None')}")
-                        print(f"[DEBUG] Candidate safety_ratings: {getattr(candidate, 'safety_ratings', 'None')}")
-
-                        if hasattr(candidate, 'finish_reason'):
-                            finish_reason = str(candidate.finish_reason)
-                            return {
-                                "success": False,
-                                "error": f"Gemini could not analyze the image (reason: {finish_reason}). The image may have been blocked by safety filters. Please try a different image.",
-                                "image_source": display_source,
-                            }
-
-                    print(f"[DEBUG] Empty response, no finish_reason found")
-                    return {
-                        "success": False,
-                        "error": "Gemini could not create an analysis. The image might be too small, unclear, or blocked by filters. Please try a different image.",
-                        "image_source": display_source,
-                    }
-
-                print(f"[DEBUG] Success! Analysis length: {len(response.text)} chars")
-                return {
-                    "success": True,
-                    "analysis": response.text,
-                    "image_source": display_source,
-                }
+        error = _empty_response_error(response)
+        if error is not None:
+            return {
+                "success": False,
+                "error": error,
+                "image_source": display_source,
+            }
 
+        logger.debug("Image analysed", analysis_chars=len(response.text))
+        if image_hashes is not None:
+            try:
+                image_index.add(image_hashes, variant, response.text)
             except Exception as e:
-                last_error = e
-                print(f"[DEBUG] Attempt {attempt + 1} failed: {str(e)}")
-                if attempt < max_retries - 1:
-                    # Exponential backoff: 1s, 2s
-                    wait_time = 2 ** attempt
-                    print(f"[DEBUG] Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    # All retries failed
-                    print(f"[DEBUG] All retries failed. Last error: {str(e)}")
-                    raise
-
-    except requests.exceptions.RequestException as e:
-        error_source = "[Image]"
-        if image_url and not image_url.startswith("data:image"):
-            error_source = image_url
+                logger.warning("Indexing image analysis failed", error=str(e))
+        return {
+            "success": True,
+            "analysis": response.text,
+            "image_source": display_source,
+            "reused": False,
+        }
 
+    except ImageFetchError as e:
         return {
             "success": False,
-            "error": f"Failed to fetch image: {str(e)}",
-            "image_source": error_source,
+            "error": str(e),
+            "image_source": _error_source(image_url),
         }
     except Exception as e:
-        error_source = "[Image]"
-        if image_url and not image_url.startswith("data:image"):
-            error_source = image_url
+        return {
+            "success": False,
+            "error": f"Analysis failed: {str(e)}",
+            "image_source": _error_source(image_url),
+        }
+
+
+@tool("Gemini Vision Analyzer")
+@track_tool_failures
+def analyze_ad_image(image_url: str) -> dict:
+    """Analyzes advertisement images using Gemini 2.5 Flash Vision.
 
+    Args:
+        image_url: The blob handle (blob://...), URL or local file path of the ad image (required)
+
+    Returns:
+        JSON with 'success' (bool), 'analysis' (string), 'image_source' (string) and 'reused'
+        (bool, true if the analysis of a near-duplicate creative was reused)
+        The analysis includes: colors, composition quality, emotional tone, CTA visibility,
+        and brand elements.
+
+    Example:
+        analyze_ad_image("blob://3f2a9c0e1b7d4a65")
+    """
+    check_cancelled()
+    try:
+        # Get Gemini client
+        client, model_name = get_gemini_client()
+    except Exception as e:
         return {
             "success": False,
             "error": f"Analysis failed: {str(e)}",
-            "image_source": error_source,
+            "image_source": _error_source(image_url),
         }
+    return _analyze_one(image_url, client, model_name)
+
+
+def _split_carousel_sections(text: str, count: int) -> tuple[list[Optional[str]], Optional[str]]:
+    """Per-card notes ("Card N:") and the sequence assessment ("Sequence:") of a batched analysis"""
+    notes: list[Optional[str]] = [None] * count
+    sequence = None
+    matches = list(_CAROUSEL_SECTION.finditer(text))
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        body = text[match.end() : end].strip()
+        if match.group(2) is None:
+            sequence = body or None
+        elif 1 <= int(match.group(2)) <= count:
+            notes[int(match.group(2)) - 1] = body or None
+    return notes, sequence
+
+
+def _analyze_carousel_batched(image_urls: list[str], client: Any, model_name: str) -> dict:
+    """All cards in one multimodal request; raises if it can't produce a usable analysis"""
+    contents: list = [CAROUSEL_PROMPT.format(count=len(image_urls))]
+    for number, image_url in enumerate(image_urls, start=1):
+        final_bytes, final_mime_type = _load_image(image_url)
+        contents.append(f"Card {number}:")
+        contents.append(types.Part.from_bytes(data=final_bytes, mime_type=final_mime_type))
+
+    response = _generate(client, model_name, contents, images=len(image_urls))
+    error = _empty_response_error(response)
+    if error is not None:
+        raise ValueError(error)
+
+    notes, sequence = _split_carousel_sections(response.text, len(image_urls))
+    if not any(notes):
+        raise ValueError("Batched carousel analysis has no per-card sections")
+    return {
+        "success": True,
+        "analysis": response.text,
+        "sequence": sequence,
+        "cards": [
+            {
+                "card": number,
+                "success": note is not None,
+                "analysis": note,
+                "image_source": _display_source(image_url),
+            }
+            for number, (image_url, note) in enumerate(zip(image_urls, notes), start=1)
+        ],
+    }
+
+
+def _analyze_carousel_parallel(image_urls: list[str], client: Any, model_name: str) -> dict:
+    """Each card on its own (near-duplicate reuse included), CAROUSEL_MAX_PARALLEL at a time"""
+    workers = max(1, min(CAROUSEL_MAX_PARALLEL, len(image_urls)))
+    # Each pool thread gets its own copy of the request context (metrics, cancel token, deadline);
+    # cards of one carousel share a template, so only identical cards reuse an analysis
+    with (
+        exact_matches_only(),
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="carousel-card") as pool,
+    ):
+        futures = [
+            pool.submit(contextvars.copy_context().run, _analyze_one, image_url, client, model_name)
+            for image_url in image_urls
+        ]
+        results = [future.result() for future in futures]
+
+    cards = [{"card": number, **result} for number, result in enumerate(results, start=1)]
+    sections = [
+        f"Card {card['card']}: "
+        + (card["analysis"].strip() if card["success"] else f"(not analysed: {card['error']})")
+        for card in cards
+    ]
+    return {
+        "success": any(card["success"] for card in cards),
+        "analysis": "\n\n".join(sections),
+        "sequence": None,
+        "cards": cards,
+    }
+
+
+@tool("Gemini Carousel Analyzer")
+@track_tool_failures
+def analyze_carousel_images(image_urls: list[str]) -> dict:
+    """Analyzes all cards of a carousel / multi-image ad using Gemini 2.5 Flash Vision.
+
+    Args:
+        image_urls: Blob handles (blob://...), URLs or local file paths of the cards,
+            in swipe order (required)
+
+    Returns:
+        JSON with 'success' (bool), 'analysis' (string with a "Card N:" section per card),
+        'sequence' (string or null, assessment of hook, story flow, consistency and final CTA),
+        'cards' (list with 'card', 'success', 'analysis' per card)
+        and 'mode' ("batched" or "parallel")
+
+    Example:
+        analyze_carousel_images(["blob://3f2a9c0e1b7d4a65", "blob://8e1c2d3f4a5b6c7d"])
+    """
+    check_cancelled()
+    if not image_urls:
+        return {
+            "success": False,
+            "error": "image_urls must contain at least one card",
+        }
+    try:
+        client, model_name = get_gemini_client()
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Analysis failed: {str(e)}",
+        }
+
+    started = time.perf_counter()
+    result = None
+    mode = CAROUSEL_PARALLEL
+    if len(image_urls) <= CAROUSEL_BATCH_MAX_CARDS:
+        try:
+            result = _analyze_carousel_batched(image_urls, client, model_name)
+            mode = CAROUSEL_BATCHED
+        except Exception as e:
+            # Card by card still gets per-card notes (and reuses known cards)
+            logger.info("Batched carousel analysis failed, analysing card by card", error=str(e))
+            check_cancelled()
+    if result is None:
+        result = _analyze_carousel_parallel(image_urls, client, model_name)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.debug(
+        "Carousel analysed", cards=len(image_urls), mode=mode, duration_ms=round(elapsed_ms, 1)
+    )
+    record_metric("carousel_cards", len(image_urls))
+    record_metric("carousel_mode", mode)
+    record_metric("carousel_ms_per_card", round(elapsed_ms / len(image_urls), 1))
+    if not result["success"]:
+        result["error"] = "None of the carousel cards could be analysed"
+    return {**result, "mode": mode}
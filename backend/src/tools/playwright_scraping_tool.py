@@ -1,12 +1,270 @@
 """Playwright Scraping Tool for Landing Page Content Extraction"""
 
 from crewai.tools import tool
-from typing import Any
+from typing import Any, Optional
+from urllib.parse import urlparse
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-import trafilatura
+import os
+
+from utils.cancellation import AnalysisCancelled, CancelToken
+from utils.logger import logger
+from utils.request_context import budget_timeout, cancel_token, track_tool_failures
+
+
+def _env_list(name: str, default: str) -> set[str]:
+    """Parse a comma-separated environment variable into a set"""
+    return {item.strip().lower() for item in os.getenv(name, default).split(",") if item.strip()}
+
+
+# Resource types never needed for text extraction. "stylesheet" is opt-in:
+# without CSS, hidden elements (menus, modals) can't be told apart from content.
+BLOCKED_RESOURCE_TYPES = _env_list("SCRAPER_BLOCK_RESOURCE_TYPES", "image,media,font")
+
+# Analytics, tag managers and ad networks common on marketing pages
+BLOCKED_DOMAINS = _env_list(
+    "SCRAPER_BLOCK_DOMAINS",
+    "google-analytics.com,googletagmanager.com,googleadservices.com,doubleclick.net,"
+    "googlesyndication.com,facebook.net,connect.facebook.net,snap.licdn.com,px.ads.linkedin.com,"
+    "ads.linkedin.com,bat.bing.com,clarity.ms,hotjar.com,hs-analytics.net,hs-scripts.com,"
+    "hubspot.com,segment.com,segment.io,mixpanel.com,fullstory.com,intercom.io,"
+    "tiktok.com,analytics.tiktok.com,criteo.com,taboola.com,outbrain.com,adnxs.com,"
+    "matomo.cloud,cookiebot.com",
+)
+
+# Domains that are never blocked, regardless of type or blocklist
+ALLOWED_DOMAINS = _env_list("SCRAPER_ALLOW_DOMAINS", "")
+
+# Second-level labels under which domains are registered (example.co.uk, example.com.au)
+PUBLIC_SECOND_LEVEL = {"co", "com", "org", "net", "ac", "gov", "edu", "or", "ne", "go"}
+
+
+# Upper bound for the extracted main body text
+MAX_BODY_CHARS = int(os.getenv("SCRAPER_MAX_TEXT_CHARS", "20000"))
+
+# Runs inside the page: collects visible title, headings, CTAs, hero and
+# main body text in a single round-trip instead of shipping the full HTML.
+EXTRACT_SCRIPT = """
+(maxChars) => {
+  const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim();
+  const BOILERPLATE = 'nav, footer, aside, [role=navigation], [role=contentinfo], ' +
+    '[aria-hidden=true], [id*=cookie i], [class*=cookie i], [id*=consent i], [class*=consent i]';
+
+  const visibility = new WeakMap();
+  const isVisible = (el) => {
+    if (!el || el.nodeType !== 1) return false;
+    if (visibility.has(el)) return visibility.get(el);
+    let visible;
+    if (el.checkVisibility) {
+      visible = el.checkVisibility({ checkOpacity: true, checkVisibilityCSS: true });
+    } else {
+      const style = getComputedStyle(el);
+      const rect = el.getBoundingClientRect();
+      visible = style.display !== 'none' && style.visibility !== 'hidden' &&
+        style.opacity !== '0' && rect.width > 0 && rect.height > 0;
+    }
+    visibility.set(el, visible);
+    return visible;
+  };
+
+  const texts = (selector, limit, maxLength) => {
+    const out = [];
+    const seen = new Set();
+    for (const el of document.querySelectorAll(selector)) {
+      if (out.length >= limit) break;
+      if (!isVisible(el)) continue;
+      const text = clean(el.innerText || el.value);
+      if (!text || text.length > maxLength || seen.has(text)) continue;
+      seen.add(text);
+      out.push(text);
+    }
+    return out;
+  };
+
+  const firstH1 = Array.from(document.querySelectorAll('h1')).find(isVisible);
+  let hero = '';
+  if (firstH1) {
+    const section = firstH1.closest('section, header, [class*=hero i]') || firstH1.parentElement;
+    hero = clean(section.innerText).slice(0, 600);
+  }
+
+  const root = document.querySelector('main, [role=main], article') || document.body;
+  const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT, {
+    acceptNode: (node) => {
+      const parent = node.parentElement;
+      if (!parent || !node.nodeValue.trim()) return NodeFilter.FILTER_REJECT;
+      if (parent.closest('script, style, noscript, template, svg')) return NodeFilter.FILTER_REJECT;
+      if (parent.closest(BOILERPLATE) || !isVisible(parent)) return NodeFilter.FILTER_REJECT;
+      return NodeFilter.FILTER_ACCEPT;
+    },
+  });
+
+  const blocks = [];
+  let lastBlock = null;
+  let length = 0;
+  let truncated = false;
+  while (walker.nextNode()) {
+    const text = clean(walker.currentNode.nodeValue);
+    const block = walker.currentNode.parentElement.closest(
+      'p, li, h1, h2, h3, h4, h5, h6, td, blockquote, div, section');
+    if (block === lastBlock && blocks.length) {
+      blocks[blocks.length - 1] += ' ' + text;
+    } else {
+      blocks.push(text);
+      lastBlock = block;
+    }
+    length += text.length + 1;
+    if (length >= maxChars) {
+      truncated = true;
+      break;
+    }
+  }
+
+  const meta = document.querySelector('meta[name=description]');
+  return {
+    title: clean(document.title),
+    meta_description: meta ? clean(meta.content) : '',
+    headings: {
+      h1: texts('h1', 5, 300),
+      h2: texts('h2', 20, 300),
+      h3: texts('h3', 30, 300),
+    },
+    ctas: texts('button, [role=button], a[class*=btn i], a[class*=button i], a[class*=cta i], ' +
+      'input[type=submit]', 15, 60),
+    hero: hero,
+    body: blocks.join('\\n').slice(0, maxChars),
+    truncated: truncated,
+  };
+}
+"""
+
+
+def format_structured_text(payload: dict) -> str:
+    """Render the structured extraction payload as text for the agents"""
+    headings = payload.get("headings", {})
+    lines = []
+    if payload.get("title"):
+        lines.append(f"Title: {payload['title']}")
+    if payload.get("meta_description"):
+        lines.append(f"Meta Description: {payload['meta_description']}")
+    for level in ("h1", "h2", "h3"):
+        if headings.get(level):
+            lines.append(f"{level.upper()}: " + " | ".join(headings[level]))
+    if payload.get("ctas"):
+        lines.append("CTAs: " + " | ".join(payload["ctas"]))
+    if payload.get("hero"):
+        lines.append(f"Hero: {payload['hero']}")
+    if payload.get("body"):
+        lines.append("")
+        lines.append(payload["body"])
+    return "\n".join(lines)
+
+
+def _domain_matches(host: str, domains: set[str]) -> bool:
+    """True if host equals or is a subdomain of any listed domain"""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def registrable_domain(host: str) -> str:
+    """The domain a host is registered under (www.shop.example.co.uk -> example.co.uk)"""
+    labels = host.lower().rstrip(".").split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in PUBLIC_SECOND_LEVEL:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class RequestInterceptor:
+    """Playwright route handler that blocks unneeded resources and counts traffic"""
+
+    def __init__(self, cancel_token: Optional[CancelToken] = None, page_url: Optional[str] = None):
+        """
+        Args:
+            cancel_token: Aborts all requests once cancelled
+            page_url: The scraped page; its own domain is never blocked (hubspot.com,
+                segment.com etc. are trackers elsewhere, but may be the landing page itself)
+        """
+        # Captured up front: handlers run in Playwright's greenlet, outside the request context
+        self.cancel_token = cancel_token
+        self.site_domains: set[str] = set()
+        if page_url:
+            self._add_site(page_url)
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.blocked_by_type: dict[str, int] = {}
+        self.blocked_by_domain: dict[str, int] = {}
+        self.bytes_loaded = 0
+
+    def _add_site(self, url: str):
+        host = (urlparse(url).hostname or "").lower()
+        if host:
+            self.site_domains.add(registrable_domain(host))
+
+    def block_reason(self, resource_type: str, url: str, navigation: bool = False) -> str | None:
+        """Return why a request should be blocked, or None to let it through"""
+        # The page itself (and where it redirects to) always loads
+        if navigation or resource_type == "document":
+            return None
+        host = (urlparse(url).hostname or "").lower()
+        if _domain_matches(host, ALLOWED_DOMAINS) or _domain_matches(host, self.site_domains):
+            return None
+        if resource_type in BLOCKED_RESOURCE_TYPES:
+            return f"type:{resource_type}"
+        if _domain_matches(host, BLOCKED_DOMAINS):
+            return f"domain:{host}"
+        return None
+
+    def handle_route(self, route):
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            # Analysis cancelled - stop loading so the page can be closed right away
+            route.abort("aborted")
+            return
+        request = route.request
+        navigation = request.is_navigation_request()
+        if navigation and self._is_main_frame(request):
+            # Redirect targets count as the page's own domain too
+            self._add_site(request.url)
+        reason = self.block_reason(request.resource_type, request.url, navigation)
+        if reason is None:
+            self.allowed_requests += 1
+            route.continue_()
+            return
+
+        self.blocked_requests += 1
+        if reason.startswith("type:"):
+            self.blocked_by_type[request.resource_type] = (
+                self.blocked_by_type.get(request.resource_type, 0) + 1
+            )
+        else:
+            host = reason[len("domain:") :]
+            self.blocked_by_domain[host] = self.blocked_by_domain.get(host, 0) + 1
+        route.abort("blockedbyclient")
+
+    @staticmethod
+    def _is_main_frame(request) -> bool:
+        try:
+            return request.frame.parent_frame is None
+        except Exception:
+            # Service worker requests have no frame
+            return False
+
+    def handle_response(self, response):
+        try:
+            self.bytes_loaded += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        """Request and byte counters for the scrape result"""
+        return {
+            "requests_allowed": self.allowed_requests,
+            "requests_blocked": self.blocked_requests,
+            "blocked_by_type": self.blocked_by_type,
+            "blocked_by_domain": self.blocked_by_domain,
+            "bytes_loaded": self.bytes_loaded,
+        }
 
 
 @tool("Playwright Landing Page Scraper")
+@track_tool_failures
 def scrape_landing_page(url: str, timeout: int = 20000) -> dict:
     """Scrapes full text content from landing pages.
     Supports JavaScript-rendered pages, handles cookie banners, lazy loading.
@@ -16,8 +274,39 @@ def scrape_landing_page(url: str, timeout: int = 20000) -> dict:
         timeout: Timeout in milliseconds (default: 20000)
 
     Returns:
-        dict with scraped content including success status, url, text, and text_length
+        dict with scraped content including success status, url, text, text_length,
+        and structured fields (title, headings, ctas, hero, body)
     """
+    return render_with_playwright(url, timeout)
+
+
+def render_with_playwright(url: str, timeout: int = 20000) -> dict:
+    """
+    Render a landing page in headless Chromium and extract its text
+
+    Plain function behind the scrape_landing_page tool, also used as the
+    browser tier of the tiered scraper.
+
+    Args:
+        url: URL of the landing page to scrape
+        timeout: Timeout in milliseconds
+
+    Returns:
+        dict with scraped content including success status, url, text, text_length,
+        the structured extraction payload, and network stats
+
+    Raises:
+        AnalysisCancelled: If the request is cancelled (the browser is closed first)
+    """
+    token = cancel_token()
+
+    def checkpoint():
+        if token is not None:
+            token.raise_if_cancelled()
+
+    checkpoint()
+    # Never wait longer than the request's remaining deadline budget
+    timeout = int(budget_timeout(timeout / 1000) * 1000)
     try:
         with sync_playwright() as p:
             # Launch with faster settings
@@ -29,17 +318,23 @@ def scrape_landing_page(url: str, timeout: int = 20000) -> dict:
                 viewport={'width': 1280, 'height': 720},
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             )
+            interceptor = RequestInterceptor(token, page_url=url)
+            context.route("**/*", interceptor.handle_route)
             page = context.new_page()
+            page.on("response", interceptor.handle_response)
 
             try:
                 # Navigate to page - use domcontentloaded (faster than networkidle)
                 page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                checkpoint()
 
                 # Quick cookie banner handling (try first match only, don't iterate all)
                 try:
                     page.click(
                         'button:has-text("Accept"), button:has-text("Akzeptieren"), #onetrust-accept-btn-handler',
-                        timeout=1000  # Only wait 1 second
+                        timeout=min(
+                            1000, timeout // 10
+                        ),  # Only wait 1 second (less on a tight budget)
                     )
                 except:
                     pass  # No cookie banner or already accepted
@@ -48,35 +343,43 @@ def scrape_landing_page(url: str, timeout: int = 20000) -> dict:
                 page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
                 page.wait_for_timeout(500)  # Reduced from 2s to 0.5s
 
-                # Get HTML
-                html = page.content()
+                checkpoint()
 
-                # Extract text with trafilatura
-                text = trafilatura.extract(
-                    html,
-                    include_comments=False,
-                    include_tables=True,
-                    no_fallback=False,
-                )
+                # Extract structured, visible content in one round-trip
+                structured = None
+                try:
+                    structured = page.evaluate(EXTRACT_SCRIPT, MAX_BODY_CHARS)
+                except Exception as e:
+                    logger.debug("In-page extraction failed", url=url, error=str(e))
 
-                if not text:
+                if structured and structured.get("body"):
+                    text = format_structured_text(structured)
+                else:
                     # Fallback: get all text
-                    text = page.inner_text("body")
+                    text = page.inner_text("body")[:MAX_BODY_CHARS]
 
                 return {
                     "success": True,
                     "url": url,
                     "text": text,
                     "text_length": len(text) if text else 0,
+                    "structured": structured,
+                    "network": interceptor.stats(),
                 }
 
+            except AnalysisCancelled:
+                raise
             except PlaywrightTimeout:
+                checkpoint()
                 return {
                     "success": False,
                     "url": url,
                     "error": f"Page load timeout ({timeout}ms)",
+                    "network": interceptor.stats(),
                 }
             except Exception as e:
+                # Aborted navigation after a cancel surfaces as a generic error
+                checkpoint()
                 return {
                     "success": False,
                     "url": url,
@@ -86,6 +389,8 @@ def scrape_landing_page(url: str, timeout: int = 20000) -> dict:
                 context.close()
                 browser.close()
 
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         return {
             "success": False,
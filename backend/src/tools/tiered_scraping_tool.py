@@ -0,0 +1,244 @@
+"""Tiered Landing Page Scraper - Static HTTP First, Playwright Only When Needed"""
+
+from crewai.tools import tool
+from typing import Optional
+from urllib.parse import urlparse
+import os
+import re
+import threading
+import time
+
+from tools.playwright_scraping_tool import render_with_playwright
+from utils.extraction_pool import EXTRACTION_TIMEOUT, extract_text
+from utils.http_pool import fetch_page
+from utils.deadline import BROWSER_MIN_BUDGET_S
+from utils.logger import logger
+from utils.request_context import (
+    add_metric,
+    budget_allows,
+
+    budget_timeout,
+    check_cancelled,
+    track_tool_failures,
+)
+from utils.url_canon import canonicalize_url
+
+TIER_STATIC = "static"
+TIER_BROWSER = "browser"
+
+# Below this many extracted characters a static page is considered incomplete
+MIN_STATIC_TEXT_LENGTH = int(os.getenv("SCRAPER_MIN_STATIC_TEXT", "500"))
+STATIC_FETCH_TIMEOUT = float(os.getenv("SCRAPER_STATIC_TIMEOUT", "10"))
+DOMAIN_TIER_TTL = float(os.getenv("SCRAPER_DOMAIN_TIER_TTL", str(6 * 3600)))
+
+# Empty mount points of client-side rendered apps
+SPA_ROOT_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](root|app|__next|__nuxt|___gatsby|svelte)["\'][^>]*>\s*</div>'
+    r"|<app-root[^>]*>\s*</app-root>",
+    re.IGNORECASE,
+)
+NOSCRIPT_PATTERN = re.compile(
+    r"<noscript[^>]*>[^<]*(enable javascript|javascript (is )?(required|disabled)"
+    r"|javascript aktivieren|javascript ist deaktiviert)",
+    re.IGNORECASE,
+)
+# Status codes that usually mean "bot blocked" rather than "page missing"
+ESCALATE_STATUS_CODES = {401, 403, 406, 429, 503}
+
+
+class DomainTierCache:
+    """Remembers per domain whether the static tier was sufficient"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._tiers: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, domain: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tiers.get(domain)
+            if entry is None:
+                return None
+            tier, expires_at = entry
+            if expires_at < time.time():
+                del self._tiers[domain]
+                return None
+            return tier
+
+    def set(self, domain: str, tier: str):
+        with self._lock:
+            self._tiers[domain] = (tier, time.time() + self.ttl)
+
+
+domain_tiers = DomainTierCache(DOMAIN_TIER_TTL)
+
+
+def escalation_reason(html: str, text: Optional[str]) -> Optional[str]:
+    """
+    Decide from the static HTML whether the page needs a real browser
+
+    Args:
+        html: Raw HTML from the static fetch
+        text: Text extracted from that HTML by trafilatura
+
+    Returns:
+        Reason string if escalation to Playwright is needed, otherwise None
+    """
+    text_length = len(text) if text else 0
+
+    if SPA_ROOT_PATTERN.search(html) and text_length < 2 * MIN_STATIC_TEXT_LENGTH:
+        return "spa_root"
+    if NOSCRIPT_PATTERN.search(html) and text_length < 2 * MIN_STATIC_TEXT_LENGTH:
+        return "noscript_hint"
+    if text_length < MIN_STATIC_TEXT_LENGTH:
+        return "text_too_short"
+    return None
+
+
+def _scrape_static(url: str) -> dict:
+    """Static tier: pooled HTTP fetch + trafilatura extraction"""
+    page = fetch_page(url, timeout=budget_timeout(STATIC_FETCH_TIMEOUT))
+
+    if page["status_code"] in ESCALATE_STATUS_CODES:
+        return {"success": False, "escalate": f"http_{page['status_code']}"}
+    if page["status_code"] >= 400:
+        return {
+            "success": False,
+            "escalate": None,
+            "error": f"HTTP {page['status_code']} for {page['final_url']}",
+        }
+
+    html = page["html"]
+    extraction = extract_text(html, timeout=budget_timeout(EXTRACTION_TIMEOUT))
+    text = extraction["text"]
+    timings = {
+        "extract_queue": extraction["queue_ms"],
+        "extract_parse": extraction["parse_ms"],
+    }
+
+    reason = escalation_reason(html, text)
+    if reason:
+        # The thin static text is still the fallback when there's no time for the browser
+        return {"success": False, "escalate": reason, "text": text, "timings": timings}
+
+    return {"success": True, "text": text, "final_url": page["final_url"], "timings": timings}
+
+
+def scrape_tiered(url: str, timeout: int = 20000) -> dict:
+    """
+    Scrape a landing page with the cheapest tier that yields usable text
+
+    Args:
+        url: URL of the landing page
+        timeout: Playwright timeout in milliseconds for the browser tier
+
+    Returns:
+        dict with success status, url, text, text_length, tier, tier_reason and timings_ms
+    """
+    check_cancelled()
+    start = time.perf_counter()
+    url = canonicalize_url(url)
+    domain = urlparse(url).netloc.lower()
+    timings = {}
+    reason = None
+
+    # Browser-only domains still get the static tier when the deadline budget is too short
+    if domain_tiers.get(domain) == TIER_BROWSER and budget_allows(BROWSER_MIN_BUDGET_S):
+        reason = "domain_cached"
+    else:
+        static_start = time.perf_counter()
+        try:
+            static = _scrape_static(url)
+        except Exception as e:
+            static = {"success": False, "escalate": f"static_failed: {e}"}
+        timings[TIER_STATIC] = round((time.perf_counter() - static_start) * 1000, 1)
+        timings.update(static.get("timings", {}))
+
+        if static["success"]:
+            domain_tiers.set(domain, TIER_STATIC)
+            timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.debug(
+                "Scraped landing page", url=url, tier=TIER_STATIC, total_ms=timings["total"]
+            )
+            return {
+                "success": True,
+                "url": url,
+                "text": static["text"],
+                "text_length": len(static["text"]),
+                "tier": TIER_STATIC,
+                "tier_reason": None,
+                "timings_ms": timings,
+            }
+
+        if not static.get("escalate"):
+            timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+            return {
+                "success": False,
+                "url": url,
+                "error": static["error"],
+                "tier": TIER_STATIC,
+                "timings_ms": timings,
+            }
+        reason = static["escalate"]
+
+        if not budget_allows(BROWSER_MIN_BUDGET_S):
+            # Degrade: no time left for a browser render
+            add_metric("deadline_skipped_browser")
+            timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+            text = static.get("text") or ""
+            logger.info("Skipping browser tier, deadline budget too short", url=url, reason=reason)
+            if not text:
+                return {
+                    "success": False,
+                    "url": url,
+                    "error": (
+                        f"Static scrape insufficient ({reason}) "
+                        "and no time budget left for browser rendering"
+                    ),
+                    "tier": TIER_STATIC,
+                    "timings_ms": timings,
+                }
+            return {
+                "success": True,
+                "url": url,
+                "text": text,
+                "text_length": len(text),
+                "tier": TIER_STATIC,
+                "tier_reason": f"deadline ({reason})",
+                "timings_ms": timings,
+            }
+
+    check_cancelled()
+    browser_start = time.perf_counter()
+    result = render_with_playwright(url, timeout)
+    timings[TIER_BROWSER] = round((time.perf_counter() - browser_start) * 1000, 1)
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    if result.get("success") and reason != "domain_cached":
+        domain_tiers.set(domain, TIER_BROWSER)
+
+    logger.debug(
+        "Scraped landing page", url=url, tier=TIER_BROWSER, reason=reason, total_ms=timings["total"]
+    )
+    return {
+        **result,
+        "tier": TIER_BROWSER,
+        "tier_reason": reason,
+        "timings_ms": timings,
+    }
+
+
+@tool("Tiered Landing Page Scraper")
+@track_tool_failures
+def scrape_landing_page_tiered(url: str) -> dict:
+    """Scrapes landing page text, trying a fast static HTTP fetch first and
+    rendering with a headless browser only for JavaScript-heavy pages.
+
+    Args:
+        url: URL of the landing page to scrape
+
+    Returns:
+        dict with success status, url, text, text_length, the tier used ('static' or 'browser')
+        and timings
+    """
+    return scrape_tiered(url)
@@ -5,8 +5,12 @@ from typing import Any
 import trafilatura
 import requests
 
+from utils.extraction_pool import EXTRACTION_TIMEOUT, extract_text, ExtractionTimeout
+from utils.request_context import budget_timeout, track_tool_failures
+
 
 @tool("Trafilatura Fast Parser")
+@track_tool_failures
 def parse_with_trafilatura(url: str) -> dict:
     """Fast text extraction for static HTML pages.
     Use this as a fallback when Playwright is too slow or fails.
@@ -28,13 +32,9 @@ def parse_with_trafilatura(url: str) -> dict:
                 "error": "Failed to download page",
             }
 
-        # Extract text
-        text = trafilatura.extract(
-            downloaded,
-            include_comments=False,
-            include_tables=True,
-            no_fallback=False,
-        )
+        # Extract text (in the process pool, off the crew thread)
+        extraction = extract_text(downloaded, timeout=budget_timeout(EXTRACTION_TIMEOUT))
+        text = extraction["text"]
 
         if not text:
             return {
@@ -48,8 +48,19 @@ def parse_with_trafilatura(url: str) -> dict:
             "url": url,
             "text": text,
             "text_length": len(text),
+            "extraction": {
+                "queue_ms": extraction["queue_ms"],
+                "parse_ms": extraction["parse_ms"],
+                "truncated": extraction["truncated"],
+            },
         }
 
+    except ExtractionTimeout as e:
+        return {
+            "success": False,
+            "url": url,
+            "error": str(e),
+        }
     except Exception as e:
         return {
             "success": False,
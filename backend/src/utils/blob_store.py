@@ -0,0 +1,186 @@
+"""In-Memory Blob Store for Uploaded Creatives
+
+Uploads are kept in memory under a content-addressed handle
+("blob://<sha256 prefix>") instead of a temp file. The handle is what goes
+into the agent prompt and back into the vision tool, so no file-system
+path reaches the LLM and nothing touches the disk.
+
+Blobs are reference-counted: each analysis holds one reference and releases
+it when it ends, and the last release frees the blob. A blob that is still
+referenced - its analysis queued for a worker slot or running - is never
+dropped, however long it sits idle. A background sweeper only drops
+unreferenced blobs idle for BLOB_TTL_S. Above its size cap the store
+refuses new blobs instead of growing without bound.
+
+Configured via environment variables:
+    BLOB_TTL_S:              Seconds an idle, unreferenced blob survives (default: 900)
+    BLOB_STORE_MAX_BYTES:    Cap of stored bytes (default: 256MB)
+    BLOB_SWEEP_INTERVAL_S:   Sweeper interval (default: 60)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.logger import logger
+
+
+BLOB_SCHEME = "blob://"
+# 16 hex chars (64 bit) - short enough for the LLM to copy reliably
+HANDLE_DIGEST_CHARS = 16
+
+BLOB_TTL_S = float(os.getenv("BLOB_TTL_S", "900"))
+BLOB_STORE_MAX_BYTES = int(os.getenv("BLOB_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+BLOB_SWEEP_INTERVAL_S = float(os.getenv("BLOB_SWEEP_INTERVAL_S", "60"))
+
+
+class BlobNotFoundError(KeyError):
+    """Raised for unknown, released or swept handles"""
+
+
+class BlobStoreFullError(RuntimeError):
+    """Raised when a new blob would exceed BLOB_STORE_MAX_BYTES"""
+
+
+@dataclass
+class Blob:
+    data: bytes
+    mime_type: str
+    refcount: int = 0
+    last_access: float = field(default_factory=time.time)
+
+
+def is_blob_handle(value: str) -> bool:
+    """True for strings of the form blob://<digest>"""
+    return isinstance(value, str) and value.startswith(BLOB_SCHEME)
+
+
+class BlobStore:
+    """Content-addressed, reference-counted in-memory blobs"""
+
+    def __init__(self, ttl: float = BLOB_TTL_S, max_bytes: int = BLOB_STORE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._blobs: dict[str, Blob] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self.stats = {"puts": 0, "dedup_hits": 0, "released": 0, "swept": 0, "rejected": 0}
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        """
+        Store bytes and take one reference
+
+        Args:
+            data: Blob content
+            mime_type: MIME type returned with the content
+
+        Returns:
+            Handle (blob://<digest>); identical content yields the same handle
+
+        Raises:
+            BlobStoreFullError: If the blob doesn't fit under the size cap
+        """
+        digest = hashlib.sha256(data).hexdigest()[:HANDLE_DIGEST_CHARS]
+        with self._lock:
+            self.stats["puts"] += 1
+            blob = self._blobs.get(digest)
+            if blob is None:
+                if self._size + len(data) > self.max_bytes:
+                    self.stats["rejected"] += 1
+                    raise BlobStoreFullError(
+                        f"Blob store full ({self._size / (1024 * 1024):.0f}MB in use), "
+                        "try again later"
+                    )
+                blob = Blob(data=data, mime_type=mime_type)
+                self._blobs[digest] = blob
+                self._size += len(data)
+            else:
+                self.stats["dedup_hits"] += 1
+            blob.refcount += 1
+            blob.last_access = time.time()
+        self._ensure_sweeper()
+        return f"{BLOB_SCHEME}{digest}"
+
+    def get(self, handle: str) -> tuple[bytes, str]:
+        """
+        Read a blob
+
+        Returns:
+            (data, mime_type)
+
+        Raises:
+            BlobNotFoundError: If the handle is unknown or was released
+        """
+        digest = handle[len(BLOB_SCHEME) :] if is_blob_handle(handle) else handle
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                raise BlobNotFoundError(f"Unknown or expired blob handle: {handle}")
+            blob.last_access = time.time()
+            return blob.data, blob.mime_type
+
+    def retain(self, handle: str):
+        """Take an additional reference"""
+        with self._lock:
+            blob = self._blobs.get(handle[len(BLOB_SCHEME) :])
+            if blob is None:
+                raise BlobNotFoundError(f"Unknown or expired blob handle: {handle}")
+            blob.refcount += 1
+            blob.last_access = time.time()
+
+    def release(self, handle: str):
+        """Drop one reference; the blob is freed when none are left"""
+        digest = handle[len(BLOB_SCHEME) :]
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return
+            blob.refcount -= 1
+            if blob.refcount <= 0:
+                self._remove_locked(digest)
+                self.stats["released"] += 1
+
+    def sweep(self) -> int:
+        """Drop unreferenced blobs idle for longer than the TTL (referenced ones are kept)"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            orphans = [
+                digest
+                for digest, blob in self._blobs.items()
+                if blob.refcount <= 0 and blob.last_access < cutoff
+            ]
+            for digest in orphans:
+                self._remove_locked(digest)
+            self.stats["swept"] += len(orphans)
+        return len(orphans)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"blobs": len(self._blobs), "bytes": self._size, **self.stats}
+
+    def _remove_locked(self, digest: str):
+        blob = self._blobs.pop(digest)
+        self._size -= len(blob.data)
+
+    def _ensure_sweeper(self):
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, name="blob-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(BLOB_SWEEP_INTERVAL_S)
+            swept = self.sweep()
+            if swept:
+                logger.info("Blob sweeper dropped unreferenced blobs", count=swept)
+
+
+blob_store = BlobStore()
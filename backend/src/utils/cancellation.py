@@ -0,0 +1,108 @@
+"""Cooperative Cancellation of Analyses
+
+A CancelToken travels with the request context (see utils.request_context).
+The crew, the tools and the Gemini rate limiter check it at their natural
+checkpoints - before a task, a tool run or an LLM call - and stop with
+AnalysisCancelled instead of burning quota for a client that is gone.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+from utils.logger import logger
+
+
+class AnalysisCancelled(Exception):
+    """Raised at a checkpoint once the analysis was cancelled"""
+
+
+class DeadlineExceeded(AnalysisCancelled):
+    """Raised at a checkpoint once the analysis ran out of its deadline budget"""
+
+
+class CancelToken:
+    """Thread-safe, one-shot cancellation flag with callbacks"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+        self._error: type[AnalysisCancelled] = AnalysisCancelled
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def deadline_exceeded(self) -> bool:
+        return self.cancelled and issubclass(self._error, DeadlineExceeded)
+
+    def cancel(self, reason: str = "cancelled", error: type[AnalysisCancelled] = AnalysisCancelled):
+        """
+        Cancel once and run the registered callbacks (later calls are no-ops)
+
+        Args:
+            reason: Shown in logs and the job error
+            error: Exception raised at checkpoints (DeadlineExceeded for timeouts)
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self._error = error
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Cancel callback failed", error=str(e))
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run callback on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        """Checkpoint: raise AnalysisCancelled if cancelled"""
+        if self._event.is_set():
+            raise self._error(f"Analysis cancelled ({self.reason})")
+
+    def sleep(self, seconds: float):
+        """time.sleep that wakes up and raises on cancellation"""
+        if self._event.wait(seconds):
+            self.raise_if_cancelled()
+
+
+class CancelStats:
+    """Process-wide counters of cancelled runs and the work they skipped"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelled_runs = 0
+        self.tasks_skipped = 0
+        self.llm_calls_skipped = 0
+
+    def record(self, tasks_skipped: int, llm_calls_skipped: int):
+        with self._lock:
+            self.cancelled_runs += 1
+            self.tasks_skipped += tasks_skipped
+            self.llm_calls_skipped += llm_calls_skipped
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "cancelled_runs": self.cancelled_runs,
+                "tasks_skipped": self.tasks_skipped,
+                "llm_calls_skipped": self.llm_calls_skipped,
+            }
+
+
+cancel_stats = CancelStats()
@@ -0,0 +1,68 @@
+"""End-to-End Deadline Budget for Analyses
+
+Each analysis gets one deadline (request parameter deadline_seconds, or the
+server default). It travels with the request context (see
+utils.request_context), and every stage sizes its timeouts from the
+remaining budget instead of its own fixed value. When the budget gets
+tight, stages degrade - static scraping instead of the browser, no brand
+check, no LLM synthesis - and the crew returns a partial report rather
+than nothing.
+
+Configured via environment variables:
+    ANALYSIS_DEADLINE_S:        Default budget per analysis (default: 110, below the
+                                frontend's 120s)
+    ANALYSIS_MAX_DEADLINE_S:    Upper bound for deadline_seconds (default: 600)
+    DEADLINE_BROWSER_MIN_S:     Don't escalate to the browser tier with less left (default: 20)
+    DEADLINE_BRAND_MIN_S:       Skip the brand check with less left (default: 30)
+    DEADLINE_SYNTHESIS_MIN_S:   Skip the LLM report with less left - partial report (default: 15)
+"""
+
+import os
+import time
+from typing import Optional
+
+
+DEFAULT_DEADLINE_S = float(os.getenv("ANALYSIS_DEADLINE_S", "110"))
+MAX_DEADLINE_S = float(os.getenv("ANALYSIS_MAX_DEADLINE_S", "600"))
+
+BROWSER_MIN_BUDGET_S = float(os.getenv("DEADLINE_BROWSER_MIN_S", "20"))
+BRAND_MIN_BUDGET_S = float(os.getenv("DEADLINE_BRAND_MIN_S", "30"))
+SYNTHESIS_MIN_BUDGET_S = float(os.getenv("DEADLINE_SYNTHESIS_MIN_S", "15"))
+
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+class Deadline:
+    """Absolute wall-clock deadline (comparable across workers)"""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: Optional[float] = None) -> "Deadline":
+        """
+        Deadline `seconds` from now, clamped to (0, ANALYSIS_MAX_DEADLINE_S]
+
+        Args:
+            seconds: Requested budget (None = ANALYSIS_DEADLINE_S)
+        """
+        budget = (
+            DEFAULT_DEADLINE_S if seconds is None or seconds <= 0 else min(seconds, MAX_DEADLINE_S)
+        )
+        return cls(time.time() + budget)
+
+    def remaining(self) -> float:
+        """Seconds left (0 once expired)"""
+        return max(0.0, self.expires_at - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """True if at least `seconds` of budget are left"""
+        return self.remaining() >= seconds
+
+    def clamp(self, timeout: float, minimum: float = 1.0) -> float:
+        """A stage timeout shortened to the remaining budget (never below `minimum`)"""
+        return max(minimum, min(timeout, self.remaining()))
@@ -0,0 +1,292 @@
+"""Process Pool for trafilatura Text Extraction
+
+trafilatura.extract is CPU-bound lxml work that holds the GIL. Running it in
+worker processes keeps crew threads and SSE streaming responsive and lets
+concurrent analyses parse HTML on multiple cores.
+
+The timeout counts from the moment a worker picks the page up (workers
+report it on a marker queue), so waiting behind other parses doesn't use
+it up. A request that is still queued when its timeout runs out fails on
+its own; the pool is only touched if a worker is stuck on an overdue
+parse. Such a parse can't be cancelled, so the pool is recycled: its
+workers are terminated and extractions that were running on them are
+resubmitted to the fresh pool. Timeouts are counted per request
+(extraction_timeouts, extraction_queue_timeouts) and process-wide (/health).
+
+Configured via environment variables:
+    EXTRACTION_WORKERS:        Worker processes (default: min(4, cpu_count)); 0 runs inline
+    EXTRACTION_TIMEOUT_S:      Max. seconds for one parse, and for the queue wait (default: 15)
+    EXTRACTION_MAX_HTML_BYTES: Larger HTML (UTF-8) is truncated before parsing (default: 3 MB)
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT_S", "15"))
+EXTRACTION_MAX_HTML_BYTES = int(os.getenv("EXTRACTION_MAX_HTML_BYTES", str(3 * 1024 * 1024)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_markers = None  # Queue the current pool's workers report (task id, started_at) on
+_pool_lock = threading.Lock()
+_timeouts = 0
+_queue_timeouts = 0
+_recycles = 0
+
+_task_ids = itertools.count()
+_started: dict[int, float] = {}  # Task id -> when a worker picked it up
+_limits: dict[int, float] = {}  # Task id -> its parse timeout
+_started_lock = threading.Lock()
+
+_worker_markers = None  # Set in the worker processes
+
+
+class ExtractionTimeout(TimeoutError):
+    """Raised when an extraction does not finish within EXTRACTION_TIMEOUT_S"""
+
+
+def _init_worker(markers=None):
+    """Import trafilatura once per worker instead of once per task"""
+    global _worker_markers
+    _worker_markers = markers
+    import trafilatura  # noqa: F401
+
+
+def _extract(html: str, task_id: Optional[int] = None) -> tuple[Optional[str], float, float]:
+    """Worker entry point: returns (text, started_at, finished_at)"""
+    import trafilatura
+
+    started_at = time.time()
+    if task_id is not None and _worker_markers is not None:
+        _worker_markers.put((task_id, started_at))
+    text = trafilatura.extract(
+        html,
+        include_comments=False,
+        include_tables=True,
+        no_fallback=False,
+    )
+    return text, started_at, time.time()
+
+
+def _get_pool():
+    """Get or create the worker pool (spawned, since the parent runs threads)
+
+    Returns:
+        Tuple of (pool, marker queue of its workers)
+    """
+    global _pool, _markers
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _markers = context.SimpleQueue()
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_markers,),
+            )
+        return _pool, _markers
+
+
+def _reset_pool():
+    """Drop a broken pool so the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _recycle_pool(pool: ProcessPoolExecutor):
+    """Terminate the workers of a pool with a stuck parse and start over with a fresh one"""
+    global _pool, _recycles
+    with _pool_lock:
+        if _pool is not pool:
+            return  # Already replaced by another caller
+        _pool = None
+        _recycles += 1
+    # Private, but the only handle on the processes before Python 3.14 (terminate_workers)
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def stats() -> dict:
+    """Process-wide extraction counters (for /health)"""
+    with _pool_lock:
+        return {
+            "workers": EXTRACTION_WORKERS,
+            "timeouts": _timeouts,
+            "queue_timeouts": _queue_timeouts,
+            "recycles": _recycles,
+        }
+
+
+def _drain(markers):
+    """Move start markers reported by the workers into _started"""
+    with _started_lock:
+        while not markers.empty():
+            task_id, started_at = markers.get()
+            _started[task_id] = started_at
+
+
+def _forget(task_id: int, markers, future: Future):
+    """Done callback: drop the bookkeeping of a finished task"""
+    # The marker is written before the result, so it's readable by now - unless the
+    # pool was torn down, in which case a worker may have died mid-write
+    if not future.cancelled() and not isinstance(future.exception(), BrokenProcessPool):
+        _drain(markers)
+    with _started_lock:
+        _started.pop(task_id, None)
+        _limits.pop(task_id, None)
+
+
+def _overdue(now: float) -> bool:
+    """Whether a worker has been parsing longer than its task's timeout"""
+    with _started_lock:
+        return any(
+            started_at + _limits.get(task_id, EXTRACTION_TIMEOUT) <= now
+            for task_id, started_at in _started.items()
+        )
+
+
+class _StillQueued(Exception):
+    """The timeout ran out before a worker picked the task up"""
+
+
+def _await_result(future: Future, task_id: int, markers, timeout: float):
+    """
+    Wait for a pool task, giving its parse `timeout` seconds from the moment a worker starts it
+
+    Raises:
+        _StillQueued: If no worker picked the task up within `timeout`
+        TimeoutError: If the parse itself exceeds `timeout`
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.time()))
+        except TimeoutError:
+            if future.done():
+                return future.result()
+            _drain(markers)
+            with _started_lock:
+                started_at = _started.get(task_id)
+            if started_at is None:
+                # Fails once the task sits in the call queue - it then runs unobserved
+                future.cancel()
+                raise _StillQueued()
+            if started_at + timeout <= time.time():
+                raise
+            deadline = started_at + timeout
+
+
+def _truncate(html: str) -> tuple[str, bool]:
+    """Cut HTML to EXTRACTION_MAX_HTML_BYTES of UTF-8 (characters can take up to 4 bytes)"""
+    if len(html) * 4 <= EXTRACTION_MAX_HTML_BYTES:
+        return html, False
+    encoded = html.encode("utf-8")
+    if len(encoded) <= EXTRACTION_MAX_HTML_BYTES:
+        return html, False
+    # A character cut in half is dropped
+    return encoded[:EXTRACTION_MAX_HTML_BYTES].decode("utf-8", errors="ignore"), True
+
+
+def _run_in_pool(html: str, timeout: float) -> tuple[Optional[str], float, float]:
+    global _timeouts, _queue_timeouts
+    # Once more when the pool was recycled under a running extraction
+    for attempt in range(2):
+        pool, markers = _get_pool()
+        task_id = next(_task_ids)
+        with _started_lock:
+            _limits[task_id] = timeout
+        try:
+            future = pool.submit(_extract, html, task_id)
+            future.add_done_callback(lambda f, t=task_id, m=markers: _forget(t, m, f))
+            return _await_result(future, task_id, markers, timeout)
+        except _StillQueued:
+            # Not imported at module level: the spawned workers import this module
+            from utils.logger import logger
+            from utils.request_context import add_metric
+
+            with _pool_lock:
+                _queue_timeouts += 1
+            add_metric("extraction_queue_timeouts")
+            stuck = _overdue(time.time())
+            logger.warning(
+                "Text extraction still queued at its timeout",
+                timeout_s=timeout,
+                html_chars=len(html),
+                worker_stuck=stuck,
+            )
+            # Only a worker stuck on an overdue parse (whose caller gave up) is worth a recycle
+            if stuck:
+                _recycle_pool(pool)
+            raise ExtractionTimeout(f"Text extraction waited {timeout:.0f}s for a free worker")
+        except TimeoutError:
+            from utils.logger import logger
+            from utils.request_context import add_metric
+
+            with _pool_lock:
+                _timeouts += 1
+            add_metric("extraction_timeouts")
+            logger.warning(
+                "Text extraction timed out, recycling the worker pool",
+                timeout_s=timeout,
+                html_chars=len(html),
+            )
+            _recycle_pool(pool)
+            raise ExtractionTimeout(f"Text extraction exceeded {timeout:.0f}s")
+        except BrokenProcessPool:
+            with _started_lock:
+                _limits.pop(task_id, None)
+            with _pool_lock:
+                replaced = _pool is not pool
+            if replaced and attempt == 0:
+                continue
+            # A worker died (e.g. OOM on a huge page) - recover and parse inline once
+            _reset_pool()
+            return _extract(html)
+
+
+def shutdown():
+    """Stop the worker processes (called on application shutdown)"""
+    _reset_pool()
+
+
+def extract_text(html: str, timeout: Optional[float] = None) -> dict:
+    """
+    Extract main text from HTML in the process pool
+
+    Args:
+        html: Raw HTML document
+        timeout: Seconds for the parse, and for waiting for a free worker
+            (default: EXTRACTION_TIMEOUT_S)
+
+    Returns:
+        dict with text (or None), truncated flag, queue_ms and parse_ms
+
+    Raises:
+        ExtractionTimeout: If the parse exceeds the timeout or no worker frees up in time
+    """
+    html, truncated = _truncate(html)
+
+    submitted_at = time.time()
+    if EXTRACTION_WORKERS <= 0:
+        text, started_at, finished_at = _extract(html)
+    else:
+        text, started_at, finished_at = _run_in_pool(html, timeout or EXTRACTION_TIMEOUT)
+
+    return {
+        "text": text,
+        "truncated": truncated,
+        "queue_ms": round(max(0.0, started_at - submitted_at) * 1000, 1),
+        "parse_ms": round((finished_at - started_at) * 1000, 1),
+    }
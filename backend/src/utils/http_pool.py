@@ -0,0 +1,130 @@
+"""Shared Async HTTP Client Pool
+
+A single httpx.AsyncClient lives on a background event loop so connections
+are pooled across requests and crew threads. Synchronous callers (CrewAI
+tools) submit coroutines to that loop and block on the result.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+MAX_PAGE_BYTES = int(os.getenv("HTTP_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    """Start the background event loop thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="http-pool-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+async def get_async_client() -> httpx.AsyncClient:
+    """Get or create the pooled client (must be called on the pool loop)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            headers={"User-Agent": DEFAULT_USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10")),
+            ),
+        )
+    return _client
+
+
+def run_sync(coro_factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the pool loop from synchronous code
+
+    Args:
+        coro_factory: Zero-argument callable returning the coroutine to run
+        timeout: Maximum seconds to wait for the result
+
+    Returns:
+        The coroutine's result
+    """
+    loop = _ensure_loop()
+    future = asyncio.run_coroutine_threadsafe(coro_factory(), loop)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+async def fetch_page_async(url: str, timeout: float = 10.0) -> dict:
+    """
+    Fetch a page's HTML with the pooled client
+
+    The body is streamed and truncated at HTTP_MAX_PAGE_BYTES.
+
+    Returns:
+        dict with status_code, final_url, content_type, html, truncated, and elapsed_ms
+    """
+    client = await get_async_client()
+    start = time.perf_counter()
+    async with client.stream("GET", url, timeout=timeout) as response:
+        chunks = []
+        received = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= MAX_PAGE_BYTES:
+                truncated = True
+                break
+        body = b"".join(chunks)[:MAX_PAGE_BYTES]
+        encoding = response.encoding or "utf-8"
+
+        return {
+            "status_code": response.status_code,
+            "final_url": str(response.url),
+            "content_type": response.headers.get("content-type", ""),
+            "html": body.decode(encoding, errors="replace"),
+            "truncated": truncated,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+        }
+
+
+def fetch_page(url: str, timeout: float = 10.0) -> dict:
+    """Synchronous wrapper around fetch_page_async for CrewAI tools"""
+    return run_sync(lambda: fetch_page_async(url, timeout=timeout), timeout=timeout + 1)
+
+
+async def resolve_url_async(url: str, timeout: float = 5.0) -> str:
+    """
+    Follow a URL's redirects without downloading the page
+
+    HEAD first; servers that reject it get a GET whose body isn't read.
+
+    Returns:
+        The final URL
+    """
+    client = await get_async_client()
+    response = await client.head(url, timeout=timeout)
+    if response.status_code not in (405, 501):
+        return str(response.url)
+    async with client.stream("GET", url, timeout=timeout) as response:
+        return str(response.url)
+
+
+def resolve_url(url: str, timeout: float = 5.0) -> str:
+    """Synchronous wrapper around resolve_url_async"""
+    return run_sync(lambda: resolve_url_async(url, timeout=timeout), timeout=timeout + 1)
@@ -0,0 +1,228 @@
+"""Pooled, Size-Capped Image Downloads
+
+Remote ad images are streamed through the shared HTTP pool (utils.http_pool)
+and aborted as soon as they exceed the size cap. The MIME type is sniffed
+from magic bytes, and repeat URLs are served from a small LRU cache that is
+revalidated with conditional requests (ETag / Last-Modified).
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from utils.http_pool import get_async_client, run_sync
+
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # Gemini inline data limit
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class ImageFetchError(Exception):
+    """Raised when a remote image cannot be downloaded or is not an image"""
+
+
+class ImageTooLargeError(ImageFetchError):
+    """Raised when an image exceeds the size cap (detected before or while streaming)"""
+
+    def __init__(self, size: Optional[int], limit: int):
+        self.size = size
+        self.limit = limit
+        got = f", got {size / (1024 * 1024):.1f}MB" if size else ""
+        super().__init__(
+            f"Image too large for analysis. Maximum size is {limit // (1024 * 1024)}MB{got}"
+        )
+
+
+def sniff_image_mime(data: bytes) -> Optional[str]:
+    """
+    Detect the image MIME type from magic bytes
+
+    Args:
+        data: The first bytes (or all bytes) of the file
+
+    Returns:
+        MIME type string, or None if the data is not a supported image
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp":
+        brand = data[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"hevx"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1", b"heif"):
+            return "image/heif"
+        if brand == b"avif":
+            return "image/avif"
+    return None
+
+
+def guess_mime_from_extension(path: str) -> str:
+    """Fallback MIME detection from the file extension"""
+    lowered = path.lower()
+    if lowered.endswith(".png"):
+        return "image/png"
+    if lowered.endswith(".gif"):
+        return "image/gif"
+    if lowered.endswith(".webp"):
+        return "image/webp"
+    return "image/jpeg"
+
+
+@dataclass
+class CachedImage:
+    data: bytes
+    mime_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+
+
+class ImageCache:
+    """Byte-bounded LRU cache of downloaded images"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedImage] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, entry: CachedImage):
+        if len(entry.data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._size -= len(previous.data)
+            self._entries[url] = entry
+            self._size += len(entry.data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+
+
+image_cache = ImageCache(IMAGE_CACHE_MAX_BYTES)
+
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def _fresh_until(cache_control: str) -> float:
+    """Expiry timestamp from a Cache-Control header (0 = revalidate every time)"""
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    return time.time() + int(match.group(1)) if match else 0.0
+
+
+async def fetch_image_async(
+    url: str, max_bytes: int = MAX_IMAGE_SIZE, timeout: float = 30.0
+) -> dict:
+    """
+    Download an image with early abort at the size cap
+
+    Returns:
+        dict with data, mime_type, size and cache ("miss", "hit" or "revalidated")
+
+    Raises:
+        ImageTooLargeError: If Content-Length or the streamed body exceeds max_bytes
+        ImageFetchError: On HTTP errors or non-image content
+    """
+    cached = image_cache.get(url)
+    if cached is not None and cached.fresh_until > time.time():
+        return {
+            "data": cached.data,
+            "mime_type": cached.mime_type,
+            "size": len(cached.data),
+            "cache": "hit",
+        }
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    try:
+        return await _download(url, headers, cached, max_bytes, timeout)
+    except httpx.HTTPError as e:
+        raise ImageFetchError(f"Failed to fetch image: {str(e)}") from e
+
+
+async def _download(
+    url: str, headers: dict, cached: Optional[CachedImage], max_bytes: int, timeout: float
+) -> dict:
+    """Stream the response body, enforcing the size cap and sniffing the type"""
+    client = await get_async_client()
+    async with client.stream("GET", url, headers=headers, timeout=timeout) as response:
+        if response.status_code == 304 and cached is not None:
+            cached.fresh_until = _fresh_until(response.headers.get("cache-control", ""))
+            return {
+                "data": cached.data,
+                "mime_type": cached.mime_type,
+                "size": len(cached.data),
+                "cache": "revalidated",
+            }
+        if response.status_code >= 400:
+            raise ImageFetchError(f"HTTP {response.status_code} for {url}")
+
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ImageTooLargeError(int(content_length), max_bytes)
+
+        chunks = []
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > max_bytes:
+                raise ImageTooLargeError(None, max_bytes)
+            chunks.append(chunk)
+        data = b"".join(chunks)
+
+        mime_type = sniff_image_mime(data[:32])
+        if mime_type is None:
+            header_type = response.headers.get("content-type", "").split(";")[0].strip()
+            if not header_type.startswith("image/"):
+                raise ImageFetchError(
+                    f"URL did not return an image (content-type: {header_type or 'unknown'})"
+                )
+            mime_type = header_type
+
+        image_cache.put(
+            url,
+            CachedImage(
+                data=data,
+                mime_type=mime_type,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                fresh_until=_fresh_until(response.headers.get("cache-control", "")),
+            ),
+        )
+
+    return {"data": data, "mime_type": mime_type, "size": len(data), "cache": "miss"}
+
+
+def fetch_image(url: str, max_bytes: int = MAX_IMAGE_SIZE, timeout: float = 30.0) -> dict:
+    """Synchronous wrapper around fetch_image_async for CrewAI tools"""
+    return run_sync(
+        lambda: fetch_image_async(url, max_bytes=max_bytes, timeout=timeout),
+        timeout=timeout + 1,
+    )
@@ -0,0 +1,435 @@
+"""Perceptual-Hash Index of Analyzed Creatives
+
+The same creative exported at another size or compression level, or with a
+one-pixel change, has different bytes but (nearly) the same perceptual
+hash. Every successful Gemini vision analysis is indexed under the image's
+SHA-256, pHash (64-bit DCT hash) and dHash (64-bit gradient hash). The
+same bytes always reuse the analysis; otherwise an upload whose hashes are
+both within IMAGE_INDEX_MAX_DISTANCE bits of an indexed image with the
+same aspect ratio, model and prompt gets that analysis instead of a new
+vision call. The distance is kept small on purpose: a changed headline,
+CTA text or button colour moves the hashes by only a few bits, and such
+variants must be analysed on their own. For the same reason the variants
+of a comparison and the cards of a carousel only reuse exact matches
+(see exact_matches_only).
+
+Lookups search a BK-tree over the pHashes held in memory (microseconds
+for tens of thousands of entries). Entries are persisted in SQLite, so
+uvicorn workers and batch worker processes on one host share them; each
+process picks up rows written by the others on its next lookup. Entries
+unused for IMAGE_INDEX_TTL_S are dropped, and beyond IMAGE_INDEX_MAX_ENTRIES
+the least recently used ones; each process then rebuilds its tree, so
+neither the table nor the memory of long-lived workers grows without bound.
+
+Needs NumPy and Pillow; without them the index is disabled.
+
+Configured via environment variables:
+    IMAGE_INDEX_ENABLED:        Reuse analyses of near-duplicate creatives (default: true)
+    IMAGE_INDEX_PATH:           SQLite file (default: <tempdir>/ads_quality_rater_image_index.db)
+    IMAGE_INDEX_MAX_DISTANCE:   Hamming distance (of 64 bits) up to which two images count as
+                                the same creative (default: 2, 0 = identical hashes only)
+    IMAGE_INDEX_TTL_S:          Seconds an unused entry is kept (default: 2592000 = 30 days)
+    IMAGE_INDEX_MAX_ENTRIES:    Entries kept, least recently used dropped first (default: 20000)
+    IMAGE_INDEX_PRUNE_S:        Interval of expiry and tree rebuild per process (default: 600)
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # Optional dependencies
+    np = None
+    Image = None
+
+from utils.logger import logger
+
+
+IMAGE_INDEX_ENABLED = os.getenv("IMAGE_INDEX_ENABLED", "true").lower() == "true"
+IMAGE_INDEX_PATH = os.getenv(
+    "IMAGE_INDEX_PATH", os.path.join(tempfile.gettempdir(), "ads_quality_rater_image_index.db")
+)
+IMAGE_INDEX_MAX_DISTANCE = int(os.getenv("IMAGE_INDEX_MAX_DISTANCE", "2"))
+IMAGE_INDEX_TTL_S = float(os.getenv("IMAGE_INDEX_TTL_S", str(30 * 24 * 3600)))
+IMAGE_INDEX_MAX_ENTRIES = int(os.getenv("IMAGE_INDEX_MAX_ENTRIES", "20000"))
+IMAGE_INDEX_PRUNE_S = float(os.getenv("IMAGE_INDEX_PRUNE_S", "600"))
+
+# Crops change the format verdict of the analysis, resizes don't
+ASPECT_TOLERANCE = 0.02
+
+PHASH_SIZE = 32  # Side of the grayscale image the DCT runs on
+PHASH_BITS = 8  # Side of the low-frequency block that forms the hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phash INTEGER NOT NULL,
+    dhash INTEGER NOT NULL,
+    aspect REAL NOT NULL,
+    variant TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS image_analyses_sha ON image_analyses (sha256, variant);
+"""
+
+# Near-duplicate reuse of the current analysis (off inside comparisons and carousels)
+_near_duplicates: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "image_index_near_duplicates", default=True
+)
+
+
+@contextlib.contextmanager
+def exact_matches_only() -> Iterator[None]:
+    """
+    Reuse only analyses of byte-identical images within the block
+
+    For creatives that are meant to differ in details (the variants of an
+    A/B comparison, the cards of one carousel): their hashes are close, but
+    another variant's analysis is not this one's.
+    """
+    token = _near_duplicates.set(False)
+    try:
+        yield
+    finally:
+        _near_duplicates.reset(token)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _dct_matrix(n: int):
+    """Orthonormal DCT-II basis, so dct(x) = C @ x @ C.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE) if np is not None else None
+
+
+def _bits_to_int(bits) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _to_signed(value: int) -> int:
+    """64-bit hashes as SQLite INTEGER (signed)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+@dataclass
+class ImageHashes:
+    phash: int
+    dhash: int
+    aspect: float
+    sha256: str
+
+
+def compute_hashes(data: bytes) -> ImageHashes:
+    """
+    pHash, dHash and aspect ratio of an encoded image
+
+    Raises:
+        OSError: If Pillow can't decode the image
+    """
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    # JPEG: let the decoder downscale, a full-size decode isn't needed
+    image.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+    gray = image.convert("L")
+
+    pixels = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:PHASH_BITS, :PHASH_BITS]
+    # Median without the DC term, which only carries overall brightness
+    phash = _bits_to_int(low > np.median(low.ravel()[1:]))
+
+    small = np.asarray(gray.resize((PHASH_BITS + 1, PHASH_BITS), Image.LANCZOS), dtype=np.int16)
+    dhash = _bits_to_int(small[:, 1:] > small[:, :-1])
+
+    return ImageHashes(phash, dhash, width / height, hashlib.sha256(data).hexdigest())
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance"""
+
+    def __init__(self):
+        # Node: [hash, entry ids, {distance: child node}]
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, value: int, entry_id: int):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [entry_id], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(entry_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [entry_id], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, int]]:
+        """(distance, entry id) of all hashes within max_distance, nearest first"""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, entry_id) for entry_id in node[1])
+            # Triangle inequality: only subtrees at distance d +- max_distance can match
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        matches.sort()
+        return matches
+
+
+@dataclass
+class _Entry:
+    dhash: int
+    aspect: float
+    variant: str
+    sha256: str
+
+
+@dataclass
+class NearDuplicate:
+    """An indexed analysis that can stand in for the queried image"""
+
+    analysis: str
+    sha256: str  # of the image the analysis was made for
+    distance: int  # pHash bits that differ (0 for the same bytes)
+    lookup_ms: float
+    exact: bool = False
+
+
+class ImageIndex:
+    """Analyses of creatives by perceptual hash (BK-tree in memory, rows in SQLite)"""
+
+    def __init__(
+        self,
+        path: str = IMAGE_INDEX_PATH,
+        max_distance: int = IMAGE_INDEX_MAX_DISTANCE,
+        ttl: float = IMAGE_INDEX_TTL_S,
+        max_entries: int = IMAGE_INDEX_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pruned_at = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._entries: dict[int, _Entry] = {}
+        self._loaded_id = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(image_analyses)")}
+        if columns and "last_used" not in columns:
+            # Index files written before entries expired
+            conn.execute("ALTER TABLE image_analyses ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+        conn.executescript(SCHEMA)
+        self._refresh()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _prune(self):
+        """Drop expired and least recently used rows, then rebuild the tree from the table"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM image_analyses WHERE MAX(created_at, last_used) < ?", (now - self.ttl,)
+        )
+        conn.execute(
+            "DELETE FROM image_analyses WHERE id NOT IN "
+            "(SELECT id FROM image_analyses ORDER BY MAX(created_at, last_used) DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        with self._lock:
+            # Rows deleted by any process disappear from this one's tree too
+            self._tree = BKTree()
+            self._entries = {}
+            self._loaded_id = 0
+            self._pruned_at = now
+
+    def _refresh(self):
+        """Add rows written since the last refresh (by this or another process) to the tree"""
+        if time.time() - self._pruned_at >= IMAGE_INDEX_PRUNE_S:
+            try:
+                self._prune()
+            except sqlite3.Error as e:
+                logger.warning("Image index pruning failed", error=str(e))
+        rows = (
+            self._conn()
+            .execute(
+                "SELECT id, phash, dhash, aspect, variant, sha256 FROM image_analyses "
+                "WHERE id > ? ORDER BY id",
+                (self._loaded_id,),
+            )
+            .fetchall()
+        )
+        with self._lock:
+            for entry_id, phash, dhash, aspect, variant, sha256 in rows:
+                if entry_id <= self._loaded_id:
+                    continue
+                self._tree.add(phash & (2**64 - 1), entry_id)
+                self._entries[entry_id] = _Entry(dhash & (2**64 - 1), aspect, variant, sha256)
+                self._loaded_id = entry_id
+
+    def find(self, hashes: ImageHashes, variant: str) -> Optional[NearDuplicate]:
+        """
+        Nearest indexed analysis of the same creative
+
+        Args:
+            hashes: Hashes of the queried image (see compute_hashes)
+            variant: Model and prompt the analysis must have been made with
+
+        Returns:
+            NearDuplicate, or None if no image is within max_distance
+        """
+        started = time.perf_counter()
+        exact = (
+            self._conn()
+            .execute(
+                "SELECT id, analysis FROM image_analyses WHERE sha256 = ? AND variant = ? "
+                "ORDER BY id DESC LIMIT 1",
+                (hashes.sha256, variant),
+            )
+            .fetchone()
+        )
+        if exact is not None:
+            self._touch(exact[0])
+            return NearDuplicate(
+                analysis=exact[1],
+                sha256=hashes.sha256,
+                distance=0,
+                lookup_ms=round((time.perf_counter() - started) * 1000, 3),
+                exact=True,
+            )
+        if not _near_duplicates.get():
+            return None
+
+        self._refresh()
+        with self._lock:
+            candidates = self._tree.search(hashes.phash, self.max_distance)
+            match = None
+            for distance, entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.variant != variant:
+                    continue
+                if abs(entry.aspect - hashes.aspect) > ASPECT_TOLERANCE * hashes.aspect:
+                    continue
+                if hamming(entry.dhash, hashes.dhash) > self.max_distance:
+                    continue
+                match = (distance, entry_id, entry.sha256)
+                break
+        if match is None:
+            return None
+        row = (
+            self._conn()
+            .execute("SELECT analysis FROM image_analyses WHERE id = ?", (match[1],))
+            .fetchone()
+        )
+        if row is None:
+            # Pruned by another process since this one's last rebuild
+            return None
+        self._touch(match[1])
+        return NearDuplicate(
+            analysis=row[0],
+            sha256=match[2],
+            distance=match[0],
+            lookup_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+    def _touch(self, entry_id: int):
+        """Mark an entry as used (expiry and the LRU cap go by last use)"""
+        try:
+            self._conn().execute(
+                "UPDATE image_analyses SET last_used = ? WHERE id = ?", (time.time(), entry_id)
+            )
+        except sqlite3.Error as e:
+            logger.debug("Image index touch failed", error=str(e))
+
+    def add(self, hashes: ImageHashes, variant: str, analysis: str):
+        """Index the analysis of an image"""
+        self._conn().execute(
+            "INSERT INTO image_analyses "
+            "(phash, dhash, aspect, variant, sha256, analysis, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                _to_signed(hashes.phash),
+                _to_signed(hashes.dhash),
+                hashes.aspect,
+                variant,
+                hashes.sha256,
+                analysis,
+                time.time(),
+                time.time(),
+            ),
+        )
+        self._refresh()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": self._tree.size,
+                "max_distance": self.max_distance,
+                "max_entries": self.max_entries,
+            }
+
+
+def analysis_variant(model_name: str, prompt: str) -> str:
+    """Analyses are only reused for the same model and prompt"""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+_index: Optional[ImageIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_image_index() -> Optional[ImageIndex]:
+    """The process-wide index, or None if disabled or NumPy/Pillow are missing"""
+    global _index
+    if not IMAGE_INDEX_ENABLED or np is None:
+        return None
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = ImageIndex()
+            except Exception as e:
+                logger.warning("Image index unavailable", error=str(e))
+                return None
+        return _index
@@ -1,25 +1,285 @@
-"""LLM Configuration for CrewAI Agents"""
+"""LLM Configuration for CrewAI Agents
+
+Every agent gets its own model profile, so lightweight agents (scraper,
+brand check) can run on a faster model while copywriting and synthesis
+keep the stronger one.
+
+Configured via environment variables (take precedence) or a YAML profile:
+    LLM_MODEL:                Model for all agents, including those whose built-in profile uses
+                              the lite model (default: gemini/gemini-2.5-flash)
+    LLM_MODEL_<AGENT>:        Model of one agent, e.g. LLM_MODEL_BRAND=gemini/gemini-2.5-flash-lite
+    LLM_TEMPERATURE_<AGENT>:  Temperature of one agent
+    LLM_FALLBACK_MODEL:       Model used when a call fails with a transient error or times out;
+                              it takes over on the first failure, without retries on the
+                              primary model (default: unset = no fallback)
+    LLM_TIMEOUT_S:            Request timeout per LLM call (default: 120, shortened to the
+                              request's remaining deadline budget)
+    LLM_PROFILE_FILE:         Optional YAML file with the same settings:
+
+        default_model: gemini/gemini-2.5-flash
+        fallback_model: gemini/gemini-2.0-flash
+        agents:
+          brand: {model: gemini/gemini-2.5-flash-lite, temperature: 0.3}
+"""
 
 import os
+import time
+from typing import Any, Optional
+
 from crewai import LLM
 
+from utils import llm_streaming, rate_limiter, replay
+from utils.logger import logger
+from utils.rate_limiter import CircuitOpenError, is_retryable
+from utils.request_context import add_metric, budget_timeout
+
+
+DEFAULT_MODEL = "gemini/gemini-2.5-flash"
+LIGHT_MODEL = "gemini/gemini-2.5-flash-lite"
+
+AGENT_VISUAL = "visual"
+AGENT_LANDING_PAGE = "landing_page"
+AGENT_COPYWRITING = "copywriting"
+AGENT_BRAND = "brand"
+AGENT_SYNTHESIZER = "synthesizer"
+
+# Built-in profiles - the scraper and the three-sentence brand check don't need the strong model
+DEFAULT_PROFILES = {
+    AGENT_VISUAL: {"model": None, "temperature": 0.7},
+    AGENT_LANDING_PAGE: {"model": LIGHT_MODEL, "temperature": 0.2},
+    AGENT_COPYWRITING: {"model": None, "temperature": 0.7},
+    AGENT_BRAND: {"model": LIGHT_MODEL, "temperature": 0.3},
+    AGENT_SYNTHESIZER: {"model": None, "temperature": 0.7},
+}
+
+_profile_file_cache: Optional[dict] = None
+
+
+def _load_profile_file() -> dict:
+    """Parse LLM_PROFILE_FILE once (empty dict if unset)"""
+    global _profile_file_cache
+    if _profile_file_cache is not None:
+        return _profile_file_cache
+
+    path = os.getenv("LLM_PROFILE_FILE")
+    if not path:
+        _profile_file_cache = {}
+        return _profile_file_cache
+
+    try:
+        import yaml
+    except ImportError as e:
+        raise ValueError("LLM_PROFILE_FILE requires PyYAML (pip install pyyaml)") from e
+
+    with open(path, "r", encoding="utf-8") as f:
+        _profile_file_cache = yaml.safe_load(f) or {}
+    return _profile_file_cache
+
+
+def _with_prefix(model: str) -> str:
+    """CrewAI routes Gemini models via the "gemini/" prefix"""
+    return model if "/" in model else f"gemini/{model}"
+
+
+def _first(*values: Any) -> Any:
+    """First value that is set (0 / 0.0 count as set)"""
+    for value in values:
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def resolve_profile(agent: Optional[str]) -> dict:
+    """
+    Resolve model, temperature and fallback of an agent
+
+    Model precedence: LLM_MODEL_<AGENT>, the YAML agent profile, LLM_MODEL,
+    YAML default_model, built-in profile, DEFAULT_MODEL - a configured
+    default replaces the built-in lite model. Temperature: LLM_TEMPERATURE_<AGENT>,
+    YAML agent profile, built-in profile.
+
+    Args:
+        agent: Agent key (AGENT_* constant), or None for the default profile
+
+    Returns:
+        dict with model, temperature, fallback_model and timeout
+    """
+    file_profile = _load_profile_file()
+    file_agent = (file_profile.get("agents") or {}).get(agent or "", {}) or {}
+    builtin = DEFAULT_PROFILES.get(agent or "", {})
+    suffix = (agent or "").upper()
+
+    model = _first(
+        os.getenv(f"LLM_MODEL_{suffix}") if suffix else None,
+        file_agent.get("model"),
+        os.getenv("LLM_MODEL"),
+        file_profile.get("default_model"),
+        builtin.get("model"),
+        DEFAULT_MODEL,
+    )
+    temperature = _first(
+        os.getenv(f"LLM_TEMPERATURE_{suffix}") if suffix else None,
+        file_agent.get("temperature"),
+        builtin.get("temperature"),
+        0.7,
+    )
+    fallback_model = _first(
+        os.getenv("LLM_FALLBACK_MODEL"),
+        file_agent.get("fallback_model"),
+        file_profile.get("fallback_model"),
+    )
+
+    return {
+        "model": _with_prefix(model),
+        "temperature": float(temperature),
+        "fallback_model": _with_prefix(fallback_model) if fallback_model else None,
+        "timeout": float(_first(os.getenv("LLM_TIMEOUT_S"), file_profile.get("timeout"), 120)),
+    }
+
 
-def get_gemini_llm():
+def record_model_call(model: str, elapsed_ms: float, failed: bool = False):
+    """
+    Record one model call on the current request
+
+    Metrics are keyed per model, e.g. llm_calls[gemini-2.5-flash] and
+    llm_latency_ms[gemini-2.5-flash] (summed; divide by calls for the mean).
+
+    Args:
+        model: Model name, with or without the "gemini/" prefix
+        elapsed_ms: Wall time of the call (excluding rate-limiter waits)
+        failed: Whether the call raised
+    """
+    name = model.split("/", 1)[1] if model.startswith("gemini/") else model
+    add_metric(f"llm_calls[{name}]")
+    add_metric(f"llm_latency_ms[{name}]", elapsed_ms)
+    if failed:
+        add_metric(f"llm_errors[{name}]")
+
+
+def _timed(llm: Any) -> Any:
+    """Record per-model call count, latency and errors on the current request"""
+    original_call = llm.call
+    model = getattr(llm, "model", "unknown")
+
+    def call(messages, *args, **kwargs):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return original_call(messages, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            record_model_call(model, (time.perf_counter() - start) * 1000, failed)
+
+    object.__setattr__(llm, "call", call)
+    return llm
+
+
+def _deadline_bound(llm: Any, timeout: float) -> Any:
+    """Shorten the request timeout of each call to the current request's remaining budget"""
+    original_call = llm.call
+
+    def call(messages, *args, **kwargs):
+        try:
+            object.__setattr__(llm, "timeout", budget_timeout(timeout))
+        except Exception:
+            pass  # Provider class without a mutable timeout - keep the configured one
+        return original_call(messages, *args, **kwargs)
+
+    object.__setattr__(llm, "call", call)
+    return llm
+
+
+def _with_fallback(primary: Any, fallback: Any) -> Any:
+    """
+    Retry a failed call once on the fallback model (transient errors, timeouts, open circuit)
+
+    The primary is built without limiter retries, so the fallback takes over
+    on its first failure; the fallback retries as usual.
+    """
+    original_call = primary.call
+
+    def call(messages, *args, **kwargs):
+        try:
+            return original_call(messages, *args, **kwargs)
+        except Exception as e:
+            if not (isinstance(e, CircuitOpenError) or is_retryable(e)):
+                raise
+            logger.warning(
+                "LLM call failed, falling back",
+                model=primary.model,
+                fallback=fallback.model,
+                error=str(e)[:120],
+            )
+            add_metric("llm_fallbacks")
+            return fallback.call(messages, *args, **kwargs)
+
+    object.__setattr__(primary, "call", call)
+    # Streams into the primary's sink (see utils.llm_streaming.attach)
+    object.__setattr__(primary, "fallback_llm", fallback)
+    return primary
+
+
+def _build_llm(
+    model: str,
+    temperature: float,
+    timeout: float,
+    api_key: str,
+    stream: bool,
+    max_retries: Optional[int] = None,
+) -> Any:
+    """Create one instrumented LLM (replay, timing, deadline, attempt marks, rate limiter)"""
+    # Return CrewAI's LLM with gemini/ prefix as per official docs
+    llm = LLM(
+        model=model,
+        api_key=api_key,
+        temperature=temperature,
+        timeout=timeout,
+        stream=stream,
+    )
+    llm = llm_streaming.mark_attempts(_deadline_bound(_timed(replay.wrap_llm(llm)), timeout))
+    if replay.get_mode() == replay.MODE_REPLAY:
+        return llm
+    return rate_limiter.wrap_llm(llm, max_retries=max_retries)
+
+
+def get_gemini_llm(agent: Optional[str] = None, stream: bool = False):
     """
     Create and return configured Gemini LLM for CrewAI agents
 
-    Uses CrewAI's native LLM class with Gemini.
+    Uses CrewAI's native LLM class with Gemini. Live calls share the
+    process-wide rate limiter of their model (see utils.rate_limiter). When
+    LLM_REPLAY_MODE is set, calls go through the record/replay layer (see
+    utils.replay).
+
+    Args:
+        agent: Agent key (AGENT_* constant) selecting the model profile
+        stream: Stream tokens as LLMStreamChunkEvents (see utils.llm_streaming),
+            the fallback model's included
 
     Returns:
         LLM instance configured for Gemini
     """
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable not set")
+        # Replay mode serves cassettes and never reaches the API
+        if replay.get_mode() != replay.MODE_REPLAY:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        api_key = "replay"
 
-    # Return CrewAI's LLM with gemini/ prefix as per official docs
-    return LLM(
-        model='gemini/gemini-2.5-flash',
-        api_key=api_key,
-        temperature=0.7
+    profile = resolve_profile(agent)
+    fallback_model = profile["fallback_model"]
+    if not fallback_model or fallback_model == profile["model"]:
+        return _build_llm(
+            profile["model"], profile["temperature"], profile["timeout"], api_key, stream
+        )
+
+    # No retries on the primary - its first transient failure goes to the fallback
+    llm = _build_llm(
+        profile["model"], profile["temperature"], profile["timeout"], api_key, stream, max_retries=0
+    )
+    fallback = _build_llm(
+        fallback_model, profile["temperature"], profile["timeout"], api_key, stream
     )
+    return _with_fallback(llm, fallback)
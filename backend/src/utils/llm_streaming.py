@@ -0,0 +1,185 @@
+"""Token Streaming from CrewAI LLM Calls
+
+CrewAI emits LLMStreamChunkEvent on its event bus for LLMs created with
+stream=True. This module routes those chunks to per-LLM sinks, e.g. to
+forward the synthesizer's report to the SSE stream while it is generated.
+
+Agents answer in the ReAct format ("Thought: ... Final Answer: ..."), so
+text is held back until the "Final Answer:" marker and only the answer
+itself is forwarded.
+
+Every attempt restarts the answer: the rate limiter's retries and the
+fallback model's call included. LLMs built by utils.llm_config mark each
+attempt (mark_attempts, beneath the limiter), and a fallback LLM shares
+the sink of its primary.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:  # CrewAI < 1.0
+    try:
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        crewai_event_bus = None
+        LLMStreamChunkEvent = None
+
+
+STREAMING_AVAILABLE = crewai_event_bus is not None
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class FinalAnswerFilter:
+    """Forwards only the text after the "Final Answer:" marker of one LLM call"""
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self._buffer = ""
+        self._streaming = False
+        self.emitted = 0
+
+    def feed(self, chunk: str):
+        if self._streaming:
+            self._emit(chunk)
+            return
+        self._buffer += chunk
+        index = self._buffer.find(FINAL_ANSWER_MARKER)
+        if index >= 0:
+            self._streaming = True
+            remainder = self._buffer[index + len(FINAL_ANSWER_MARKER) :].lstrip()
+            self._buffer = ""
+            if remainder:
+                self._emit(remainder)
+
+    def _emit(self, text: str):
+        self.emitted += len(text)
+        self.on_delta(text)
+
+
+class _StreamSink:
+    """Sink for one LLM instance; a new filter is started for every call"""
+
+    def __init__(self, on_delta: Callable[[str], None], on_reset: Optional[Callable[[], None]]):
+        self.on_delta = on_delta
+        self.on_reset = on_reset
+        self.filter = FinalAnswerFilter(on_delta)
+        self.lock = threading.Lock()
+
+    def start_call(self):
+        with self.lock:
+            # A retry or ReAct re-prompt restarts the answer - tell the client to discard
+            if self.filter.emitted and self.on_reset is not None:
+                self.on_reset()
+            self.filter = FinalAnswerFilter(self.on_delta)
+
+    def feed(self, chunk: str):
+        with self.lock:
+            self.filter.feed(chunk)
+
+
+_sinks: dict[int, _StreamSink] = {}
+_sinks_lock = threading.Lock()
+_handler_registered = False
+
+
+def _on_stream_chunk(source: Any, event: Any):
+    with _sinks_lock:
+        sink = _sinks.get(id(source))
+    chunk = getattr(event, "chunk", None)
+    if sink is not None and chunk:
+        sink.feed(chunk)
+
+
+def _start_call(llm: Any):
+    with _sinks_lock:
+        sink = _sinks.get(id(llm))
+    if sink is not None:
+        sink.start_call()
+
+
+def _starting_call(llm: Any, original_call: Callable) -> Callable:
+    def call(messages, *args, **kwargs):
+        _start_call(llm)
+        return original_call(messages, *args, **kwargs)
+
+    return call
+
+
+def mark_attempts(llm: Any) -> Any:
+    """
+    Start a new answer on every call that reaches this point of an LLM's wrappers
+
+    Applied beneath the rate limiter, so each of its retries counts as a
+    new call instead of appending to the previous attempt's text.
+
+    Args:
+        llm: CrewAI LLM instance
+
+    Returns:
+        The same instance
+    """
+    object.__setattr__(llm, "call", _starting_call(llm, llm.call))
+    object.__setattr__(llm, "_marks_attempts", True)
+    return llm
+
+
+def _register_handler():
+    global _handler_registered
+    with _sinks_lock:
+        if _handler_registered:
+            return
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_stream_chunk)
+        _handler_registered = True
+
+
+def attach(
+    llm: Any, on_delta: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None
+) -> Callable[[], None]:
+    """
+    Forward the final-answer tokens of an LLM (created with stream=True) to a callback
+
+    The fallback LLM of llm (fallback_llm, see utils.llm_config) streams
+    into the same sink.
+
+    Args:
+        llm: CrewAI LLM instance used by exactly one agent
+        on_delta: Called with each new piece of answer text
+        on_reset: Called when a new call starts after text was already emitted
+
+    Returns:
+        Function that detaches the sink again
+    """
+    if not STREAMING_AVAILABLE:
+        return lambda: None
+
+    _register_handler()
+    sink = _StreamSink(on_delta, on_reset)
+    llms = [llm]
+    fallback = getattr(llm, "fallback_llm", None)
+    if fallback is not None:
+        llms.append(fallback)
+
+    # LLMs without attempt marks start a new answer per outer call only
+    restore = []
+    for target in llms:
+        if getattr(target, "_marks_attempts", False):
+            continue
+        original_call = target.call
+        restore.append((target, original_call))
+        object.__setattr__(target, "call", _starting_call(target, original_call))
+
+    with _sinks_lock:
+        for target in llms:
+            _sinks[id(target)] = sink
+
+    def detach():
+        with _sinks_lock:
+            for target in llms:
+                _sinks.pop(id(target), None)
+        for target, original_call in restore:
+            object.__setattr__(target, "call", original_call)
+
+    return detach
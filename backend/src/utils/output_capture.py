@@ -0,0 +1,92 @@
+"""Per-Thread stdout/stderr Capture
+
+CrewAI's verbose output is printed to stdout. Swapping sys.stdout per
+analysis would mix the output of concurrent analyses (and of the server
+itself), so a routing stream is installed once instead: writes from a
+thread with an active capture go to that capture, everything else passes
+through to the real console.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, TextIO
+
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+
+class _LineSink:
+    """Buffers writes and emits complete, non-blank lines"""
+
+    def __init__(self, on_line: Callable[[str], None]):
+        self.on_line = on_line
+        self._buffer = ""
+
+    def write(self, text: str):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.on_line(line)
+
+    def flush(self):
+        if self._buffer.strip():
+            self.on_line(self._buffer)
+        self._buffer = ""
+
+
+class _RoutingStream:
+    """sys.stdout/sys.stderr replacement that routes by thread"""
+
+    def __init__(self, original: TextIO):
+        self.original = original
+
+    def write(self, text: str) -> int:
+        sink = getattr(_local, "sink", None)
+        if sink is None:
+            return self.original.write(text)
+        sink.write(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(_local, "sink", None) is None:
+            self.original.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self.original, name)
+
+
+def install():
+    """Install the routing streams (idempotent)"""
+    with _install_lock:
+        if not isinstance(sys.stdout, _RoutingStream):
+            sys.stdout = _RoutingStream(sys.stdout)
+        if not isinstance(sys.stderr, _RoutingStream):
+            sys.stderr = _RoutingStream(sys.stderr)
+
+
+def console() -> TextIO:
+    """The real stderr, for diagnostics that must not end up in a capture"""
+    stream = sys.stderr
+    return stream.original if isinstance(stream, _RoutingStream) else stream
+
+
+@contextmanager
+def capture_lines(on_line: Callable[[str], None]) -> Iterator[None]:
+    """
+    Route this thread's stdout/stderr to a callback, line by line
+
+    Args:
+        on_line: Called with each complete non-blank line
+    """
+    install()
+    sink = _LineSink(on_line)
+    previous = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
+        sink.flush()
@@ -0,0 +1,392 @@
+"""Process-Wide Gemini Rate Limiter with Adaptive Backoff and Circuit Breaker
+
+Both the vision client and the CrewAI LLMs go through one limiter per model
+(Gemini quotas are per model), so concurrent analyses share a single
+requests-per-minute and tokens-per-minute budget instead of hitting quota
+errors at once.
+
+Configured via environment variables:
+    GEMINI_RPM:                    Requests per minute per model (default: 1000, 0 = unlimited)
+    GEMINI_TPM:                    Tokens per minute per model (default: 1000000, 0 = unlimited)
+    GEMINI_MAX_RETRIES:            Retries on retryable errors (default: 3)
+    GEMINI_BACKOFF_BASE_S:         Base delay for jittered backoff (default: 1)
+    GEMINI_BACKOFF_MAX_S:          Maximum backoff delay (default: 30)
+    GEMINI_BREAKER_THRESHOLD:      Consecutive failures that open the circuit (default: 5)
+    GEMINI_BREAKER_COOLDOWN_S:     Seconds the circuit stays open (default: 30)
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from utils.cancellation import AnalysisCancelled
+from utils.logger import logger
+from utils.request_context import add_metric, budget_allows, cancel_token
+
+
+# Gemini bills each inline image as a fixed number of input tokens
+IMAGE_TOKENS = 258
+# Assumed completion size when reserving budget before a call
+ESTIMATED_OUTPUT_TOKENS = 500
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_MARKERS = (
+    "resource_exhausted",
+    "rate limit",
+    "ratelimit",
+    "quota",
+    "unavailable",
+    "overloaded",
+    "timeout",
+    "timed out",
+    "deadline exceeded",
+    "internal error",
+)
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE),
+    re.compile(r"retry (?:in|after) (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling Gemini while the circuit breaker is open"""
+
+
+def _sleep(seconds: float):
+    """Sleep that ends early (raising AnalysisCancelled) if the request is cancelled"""
+    token = cancel_token()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+def estimate_tokens(payload: Any) -> int:
+    """
+    Rough token estimate (~4 characters per token) for prompts and messages
+
+    Args:
+        payload: Prompt string or list of chat messages
+
+    Returns:
+        Estimated token count
+    """
+    if payload is None:
+        return 0
+    if isinstance(payload, str):
+        return len(payload) // 4 + 1
+    if isinstance(payload, dict):
+        return estimate_tokens(payload.get("content"))
+    if isinstance(payload, (list, tuple)):
+        return sum(estimate_tokens(item) for item in payload)
+    return len(str(payload)) // 4 + 1
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate-limit, overload and transient server errors"""
+    if isinstance(error, (CircuitOpenError, AnalysisCancelled)):
+        return False
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def retry_hint(error: Exception) -> Optional[float]:
+    """Server-suggested delay in seconds (Retry-After header or RetryInfo), if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    message = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, lets one trial call through after the cooldown"""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls are currently not allowed"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Gemini circuit breaker open after repeated failures, "
+                    f"retry in {remaining:.0f}s"
+                )
+            if self._trial_in_flight:
+                raise CircuitOpenError("Gemini circuit breaker half-open, trial call in progress")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_inconclusive(self):
+        """A call that says nothing about the service (bad request) - only frees the trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class GeminiRateLimiter:
+    """Sliding-window RPM/TPM limiter with retries and a circuit breaker"""
+
+    WINDOW = 60.0
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, cooldown=30.0)
+        self._window: deque[list] = deque()  # [timestamp, tokens]
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._window and now - self._window[0][0] >= self.WINDOW:
+            self._window.popleft()
+
+    def acquire(self, tokens: int) -> tuple[list, float]:
+        """
+        Block until the request fits into the RPM/TPM budget
+
+        Args:
+            tokens: Estimated tokens of the call
+
+        Returns:
+            (reservation, seconds waited)
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                used_tokens = sum(entry[1] for entry in self._window)
+                over_rpm = self.rpm and len(self._window) >= self.rpm
+                # A single oversized call is let through on an empty window
+                over_tpm = self.tpm and self._window and used_tokens + tokens > self.tpm
+                if not over_rpm and not over_tpm:
+                    reservation = [now, tokens]
+                    self._window.append(reservation)
+                    return reservation, waited
+                delay = max(0.01, self.WINDOW - (now - self._window[0][0]))
+            delay = min(delay, 1.0)
+            _sleep(delay)
+            waited += delay
+
+    def settle(self, reservation: list, actual_tokens: int):
+        """Replace a reservation's estimate with the observed token count"""
+        with self._lock:
+            reservation[1] = actual_tokens
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Server hint if present, otherwise full-jitter exponential backoff"""
+        hint = retry_hint(error)
+        if hint is not None:
+            return min(hint + random.uniform(0, 0.5), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2**attempt)))
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        estimated_tokens: int,
+        count_output: Optional[Callable[[Any], int]] = None,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """
+        Run a Gemini call under the limiter
+
+        Args:
+            fn: Zero-argument callable performing the request
+            estimated_tokens: Tokens to reserve (input + expected output)
+            count_output: Optional function returning the output tokens of a result
+            max_retries: Retries of this call instead of GEMINI_MAX_RETRIES
+
+        Returns:
+            The result of fn()
+
+        Raises:
+            AnalysisCancelled: If the current request was cancelled
+            CircuitOpenError: If the circuit breaker is open
+            Exception: The last error once retries are exhausted or it is not retryable
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            token = cancel_token()
+            if token is not None and token.cancelled:
+                add_metric("gemini_calls_skipped")
+                token.raise_if_cancelled()
+            self.breaker.before_call()
+
+            try:
+                reservation, waited = self.acquire(estimated_tokens)
+            except BaseException:
+                # Cancelled while throttled - no call was made, free a half-open trial slot
+                self.breaker.record_inconclusive()
+                raise
+            add_metric("gemini_calls")
+            if waited:
+                add_metric("gemini_throttled_calls")
+                add_metric("gemini_throttle_wait_ms", waited * 1000)
+
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    # Bad request etc. - neither an outage signal nor proof of recovery
+                    self.breaker.record_inconclusive()
+                    raise
+                self.breaker.record_failure()
+                add_metric("gemini_errors")
+                if attempt >= retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                if not budget_allows(delay):
+                    # Retrying would overrun the request's deadline
+                    add_metric("gemini_retries_skipped_deadline")
+                    raise
+                logger.warning(
+                    "Gemini call failed, retrying", error=str(e)[:120], delay_s=round(delay, 1)
+                )
+                add_metric("gemini_retries")
+                add_metric("gemini_backoff_wait_ms", delay * 1000)
+                _sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.record_inconclusive()
+                raise
+
+            self.breaker.record_success()
+            if count_output is not None:
+                self.settle(
+                    reservation, estimated_tokens - ESTIMATED_OUTPUT_TOKENS + count_output(result)
+                )
+            return result
+
+
+_limiters: dict[str, GeminiRateLimiter] = {}
+_limiter_lock = threading.Lock()
+
+
+def _model_key(model: Optional[str]) -> str:
+    """Normalize "gemini/gemini-2.5-flash" and "gemini-2.5-flash" to one key"""
+    if not model:
+        return "default"
+    return model.split("/", 1)[1] if model.startswith("gemini/") else model
+
+
+def get_rate_limiter(model: Optional[str] = None) -> GeminiRateLimiter:
+    """
+    Get or create the process-wide limiter of a model
+
+    Args:
+        model: Model name, with or without the "gemini/" prefix
+
+    Returns:
+        The shared GeminiRateLimiter for that model
+    """
+    key = _model_key(model)
+    with _limiter_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = GeminiRateLimiter(
+                rpm=int(os.getenv("GEMINI_RPM", "1000")),
+                tpm=int(os.getenv("GEMINI_TPM", "1000000")),
+                max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+                backoff_base=float(os.getenv("GEMINI_BACKOFF_BASE_S", "1")),
+                backoff_max=float(os.getenv("GEMINI_BACKOFF_MAX_S", "30")),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+                    cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN_S", "30")),
+                ),
+            )
+            _limiters[key] = limiter
+        return limiter
+
+
+def wrap_llm(llm: Any, max_retries: Optional[int] = None) -> Any:
+    """
+    Route a CrewAI LLM's call() through the process-wide limiter of its model
+
+    Args:
+        llm: CrewAI LLM instance
+        max_retries: Retries per call instead of GEMINI_MAX_RETRIES (e.g. 0 when
+            a fallback model takes over)
+
+    Returns:
+        The same instance with a governed call()
+    """
+    original_call = llm.call
+    limiter = get_rate_limiter(getattr(llm, "model", None))
+
+    def call(messages, *args, **kwargs):
+        return limiter.call(
+            lambda: original_call(messages, *args, **kwargs),
+            estimated_tokens=estimate_tokens(messages) + ESTIMATED_OUTPUT_TOKENS,
+            count_output=estimate_tokens,
+            max_retries=max_retries,
+        )
+
+    object.__setattr__(llm, "call", call)
+    return llm
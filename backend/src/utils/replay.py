@@ -0,0 +1,301 @@
+"""Record/Replay Layer for Gemini LLM and Vision Calls
+
+Lets the crew run against recorded Gemini responses instead of the live API,
+so orchestration overhead can be profiled in isolation and performance
+regressions can be reproduced offline.
+
+Configured via environment variables:
+    LLM_REPLAY_MODE:    "off" (default), "record" or "replay"
+    LLM_CASSETTE_DIR:   Directory for cassette files (default: "cassettes")
+    LLM_REPLAY_LATENCY: Simulated latency in replay mode. "0" (default) serves
+                        responses instantly, "recorded" sleeps for the originally
+                        recorded duration, any other number is a fixed delay in ms.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recording exists for a request"""
+
+
+def get_mode() -> str:
+    """Return the configured record/replay mode"""
+    mode = os.getenv("LLM_REPLAY_MODE", MODE_OFF).strip().lower()
+    if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+        raise ValueError(f"Invalid LLM_REPLAY_MODE: {mode!r} (expected off, record or replay)")
+    return mode
+
+
+def _json_default(value: Any) -> Any:
+    """Make prompt payloads JSON-serializable for fingerprinting"""
+    if isinstance(value, (bytes, bytearray)):
+        return {"sha256": hashlib.sha256(value).hexdigest(), "size": len(value)}
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return repr(value)
+
+
+def fingerprint(payload: Any) -> str:
+    """
+    Compute a stable fingerprint for a request payload
+
+    Uploads appear in prompts as content-addressed blob handles, so the payload
+    is the same across runs without normalization.
+
+    Args:
+        payload: JSON-like request description (model, messages, parameters)
+
+    Returns:
+        Hex SHA-256 digest of the payload
+    """
+    encoded = json.dumps(payload, sort_keys=True, default=_json_default)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Directory of recorded request/response pairs, one JSON file per fingerprint"""
+
+    def __init__(self, directory: str, latency: str = "0"):
+        self.directory = Path(directory)
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.directory / kind / f"{key}.json"
+
+    def load(self, kind: str, key: str) -> Optional[dict]:
+        """Load a recording, or None if it does not exist"""
+        path = self._path(kind, key)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, kind: str, key: str, request: Any, response: dict, duration_ms: float):
+        """Persist a recording atomically"""
+        path = self._path(kind, key)
+        entry = {
+            "fingerprint": key,
+            "kind": kind,
+            "recorded_at": time.time(),
+            "duration_ms": round(duration_ms, 1),
+            "request": request,
+            "response": response,
+        }
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2, default=_json_default)
+            os.replace(tmp_path, path)
+
+    def simulate_latency(self, recorded_ms: float):
+        """Sleep according to the configured replay latency"""
+        if self.latency == "recorded":
+            delay_ms = recorded_ms
+        else:
+            try:
+                delay_ms = float(self.latency)
+            except ValueError:
+                delay_ms = 0.0
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def replay(self, kind: str, key: str) -> dict:
+        """Serve a recorded response, raising CassetteMissError if absent"""
+        entry = self.load(kind, key)
+        if entry is None:
+            raise CassetteMissError(
+                f"No {kind} recording for fingerprint {key[:12]} in {self.directory}. "
+                f"Record it first with LLM_REPLAY_MODE=record."
+            )
+        self.simulate_latency(entry.get("duration_ms", 0))
+        return entry["response"]
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Get or create the process-wide cassette"""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(
+                directory=os.getenv("LLM_CASSETTE_DIR", "cassettes"),
+                latency=os.getenv("LLM_REPLAY_LATENCY", "0").strip().lower(),
+            )
+        return _cassette
+
+
+def _record_or_replay(
+    kind: str,
+    request: Any,
+    live_call: Callable[[], Any],
+    serialize: Callable[[Any], dict],
+    deserialize: Callable[[dict], Any],
+) -> Any:
+    """Dispatch a call according to the current mode"""
+    mode = get_mode()
+    if mode == MODE_OFF:
+        return live_call()
+
+    cassette = get_cassette()
+    key = fingerprint(request)
+
+    if mode == MODE_REPLAY:
+        return deserialize(cassette.replay(kind, key))
+
+    start = time.perf_counter()
+    result = live_call()
+    cassette.save(kind, key, request, serialize(result), (time.perf_counter() - start) * 1000)
+    return result
+
+
+# ========================================
+# CrewAI LLM path
+# ========================================
+
+
+def wrap_llm(llm: Any) -> Any:
+    """
+    Route a CrewAI LLM's call() through the record/replay layer
+
+    The instance is patched rather than subclassed because newer CrewAI
+    versions return provider-specific classes from LLM().
+
+    Args:
+        llm: CrewAI LLM instance
+
+    Returns:
+        The same instance, patched when record/replay is active
+    """
+    if get_mode() == MODE_OFF:
+        return llm
+
+    original_call = llm.call
+
+    def call(messages, *args, **kwargs):
+        request = {
+            "model": getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "messages": messages,
+            "tools": [
+                t.get("function", {}).get("name", t) if isinstance(t, dict) else repr(t)
+                for t in (kwargs.get("tools") or [])
+            ],
+        }
+        return _record_or_replay(
+            "llm",
+            request,
+            live_call=lambda: original_call(messages, *args, **kwargs),
+            serialize=lambda result: {"text": result if isinstance(result, str) else str(result)},
+            deserialize=lambda response: response["text"],
+        )
+
+    object.__setattr__(llm, "call", call)
+    return llm
+
+
+# ========================================
+# Gemini vision path (google.genai.Client)
+# ========================================
+
+
+def _describe_contents(contents: Any) -> list:
+    """Reduce genai contents (prompt strings, image Parts) to a fingerprintable form"""
+    described = []
+    for item in contents if isinstance(contents, (list, tuple)) else [contents]:
+        inline_data = getattr(item, "inline_data", None)
+        if isinstance(item, str):
+            described.append(item)
+        elif inline_data is not None:
+            described.append(
+                {
+                    "mime_type": inline_data.mime_type,
+                    "data": inline_data.data,
+                }
+            )
+        else:
+            described.append(_json_default(item))
+    return described
+
+
+def _serialize_genai_response(response: Any) -> dict:
+    candidates = getattr(response, "candidates", None) or []
+    finish_reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return {
+        "text": getattr(response, "text", None),
+        "finish_reason": str(finish_reason) if finish_reason is not None else None,
+        "has_candidates": bool(candidates),
+    }
+
+
+def _deserialize_genai_response(data: dict) -> SimpleNamespace:
+    candidates = []
+    if data.get("has_candidates"):
+        candidates.append(
+            SimpleNamespace(finish_reason=data.get("finish_reason"), safety_ratings=None)
+        )
+    return SimpleNamespace(text=data.get("text"), candidates=candidates)
+
+
+class _RecordReplayModels:
+    """Stand-in for client.models exposing generate_content()"""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None) -> Any:
+        request = {
+            "model": model,
+            "contents": _describe_contents(contents),
+            "temperature": getattr(config, "temperature", None),
+            "max_output_tokens": getattr(config, "max_output_tokens", None),
+        }
+        return _record_or_replay(
+            "vision",
+            request,
+            live_call=lambda: self._client.models.generate_content(
+                model=model, contents=contents, config=config
+            ),
+            serialize=_serialize_genai_response,
+            deserialize=_deserialize_genai_response,
+        )
+
+
+class RecordReplayClient:
+    """Wraps a google.genai.Client so generate_content() is recorded or replayed"""
+
+    def __init__(self, client: Any):
+        self._client = client
+        self.models = _RecordReplayModels(client)
+
+
+def wrap_genai_client(client: Any) -> Any:
+    """
+    Route a genai client through the record/replay layer
+
+    Args:
+        client: google.genai.Client instance (may be None in replay mode)
+
+    Returns:
+        The client itself when record/replay is off, otherwise a wrapper
+    """
+    if get_mode() == MODE_OFF:
+        return client
+    return RecordReplayClient(client)
@@ -0,0 +1,173 @@
+"""Per-Request Context for Analysis Threads
+
+Carries the request id, per-request metrics, the cancel token and the
+deadline of the analysis running in the current thread, so tools and LLM
+wrappers deep inside CrewAI can report into the request that triggered them
+without threading arguments through the agents.
+"""
+
+import contextvars
+import functools
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from utils.cancellation import CancelToken
+from utils.deadline import Deadline
+from utils.logger import correlation_scope
+
+
+@dataclass
+class RequestContext:
+    """Request id, cancel token, optional deadline and a thread-safe metrics dict"""
+
+    request_id: str
+    metrics: dict = field(default_factory=dict)
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+    deadline: Optional[Deadline] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, key: str, amount: float = 1):
+        """Increment a counter metric"""
+        with self._lock:
+            self.metrics[key] = round(self.metrics.get(key, 0) + amount, 3)
+
+    def record(self, key: str, value: Any):
+        """Set a metric to a value"""
+        with self._lock:
+            self.metrics[key] = value
+
+    def snapshot(self) -> dict:
+        """Copy of the current metrics"""
+        with self._lock:
+            return dict(self.metrics)
+
+
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+
+def current() -> Optional[RequestContext]:
+    """The context bound to the current thread/task, if any"""
+    return _current.get()
+
+
+@contextmanager
+def request_scope(
+    request_id: str, cancel_token: Optional[CancelToken] = None, deadline: Optional[Deadline] = None
+) -> Iterator[RequestContext]:
+    """
+    Bind a new RequestContext for the duration of the block
+
+    Args:
+        request_id: Identifier of the analysis
+        cancel_token: Token to cancel the analysis with (a new one if omitted)
+        deadline: End-to-end deadline of the analysis (None = unbounded)
+
+    Yields:
+        The bound RequestContext
+    """
+    context = RequestContext(
+        request_id=request_id,
+        cancel_token=cancel_token or CancelToken(),
+        deadline=deadline,
+    )
+    token = _current.set(context)
+    try:
+        # Log records of this analysis carry its id
+        with correlation_scope(request_id):
+            yield context
+    finally:
+        _current.reset(token)
+
+
+def add_metric(key: str, amount: float = 1):
+    """Increment a metric on the current request (no-op outside a request)"""
+    context = _current.get()
+    if context is not None:
+        context.add(key, amount)
+
+
+def record_metric(key: str, value: Any):
+    """Set a metric on the current request (no-op outside a request)"""
+    context = _current.get()
+    if context is not None:
+        context.record(key, value)
+
+
+# Counter of tool calls that failed - outputs written after one are not cached
+TOOL_FAILURES = "tool_failures"
+
+
+def _tool_result_failed(result: Any) -> bool:
+    """Tools report failures as {"success": False, ...}; a carousel also per card"""
+    if not isinstance(result, dict):
+        return False
+    if result.get("success") is False:
+        return True
+    return any(
+        isinstance(card, dict) and card.get("success") is False
+        for card in result.get("cards") or []
+    )
+
+
+def track_tool_failures(fn: Callable) -> Callable:
+    """Count failed results and errors of a tool function on the current request"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            add_metric(TOOL_FAILURES)
+            raise
+        if _tool_result_failed(result):
+            add_metric(TOOL_FAILURES)
+        return result
+
+    return wrapper
+
+
+def tool_failures() -> int:
+    """Failed tool calls of the current request so far (0 outside a request)"""
+    context = _current.get()
+    if context is None:
+        return 0
+    return int(context.snapshot().get(TOOL_FAILURES, 0))
+
+
+def cancel_token() -> Optional[CancelToken]:
+    """Cancel token of the current request (None outside a request)"""
+    context = _current.get()
+    return context.cancel_token if context is not None else None
+
+
+def check_cancelled():
+    """Checkpoint: raise AnalysisCancelled if the current request was cancelled"""
+    context = _current.get()
+    if context is not None:
+        context.cancel_token.raise_if_cancelled()
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left until the current request's deadline (None if unbounded)"""
+    context = _current.get()
+    if context is None or context.deadline is None:
+        return None
+    return context.deadline.remaining()
+
+
+def budget_timeout(timeout: float, minimum: float = 1.0) -> float:
+    """A stage timeout shortened to the current request's remaining budget"""
+    context = _current.get()
+    if context is None or context.deadline is None:
+        return timeout
+    return context.deadline.clamp(timeout, minimum)
+
+
+def budget_allows(seconds: float) -> bool:
+    """True if the current request has at least `seconds` left (always True if unbounded)"""
+    remaining = remaining_budget()
+    return remaining is None or remaining >= seconds
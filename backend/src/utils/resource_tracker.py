@@ -0,0 +1,452 @@
+"""Per-Analysis Resource Accounting
+
+Records what each analysis left behind: threads it started and which of
+them are still alive, child processes spawned (Chromium, the Playwright
+driver, extraction workers) and whether they were reaped, temp files that
+remain, the RSS change and - for a sampled share of analyses - the peak
+Python memory traced by tracemalloc. Reports of recent analyses are kept
+in memory; GET /debug/resources re-checks them live, so a thread or
+process that never exits stays attributed to the analysis that started it.
+
+Threads are attributed by their creator: a thread started by the
+analysis' thread, or by a thread it started, belongs to that analysis, so
+concurrent analyses don't see each other's threads. Child processes can't
+be traced back that way; a background sampler polls them every
+RESOURCE_SAMPLE_INTERVAL_S (also catching short-lived ones) and counts
+whatever appears while several analyses run for each of them.
+
+Off by default - the soak test (python -m batch.soak) turns it on.
+
+Child processes are found via /proc (Linux); elsewhere only threads, temp
+files and memory are tracked.
+
+Configured via environment variables:
+    RESOURCE_TRACKING:             Record resources per analysis (default: false)
+    RESOURCE_TRACEMALLOC_RATE:     Share of analyses traced with tracemalloc (default: 0 -
+                                   tracing slows Python code down noticeably)
+    RESOURCE_SAMPLE_INTERVAL_S:    Sampler poll interval (default: 0.1)
+    RESOURCE_SETTLE_S:             How long the report waits for threads and processes of a
+                                   finished analysis to exit (default: 2)
+    RESOURCE_HISTORY:              Reports kept for /debug/resources (default: 100)
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.logger import logger
+
+
+RESOURCE_TRACKING = os.getenv("RESOURCE_TRACKING", "false").lower() == "true"
+TRACEMALLOC_RATE = float(os.getenv("RESOURCE_TRACEMALLOC_RATE", "0"))
+SAMPLE_INTERVAL_S = float(os.getenv("RESOURCE_SAMPLE_INTERVAL_S", "0.1"))
+SETTLE_S = float(os.getenv("RESOURCE_SETTLE_S", "2"))
+HISTORY = int(os.getenv("RESOURCE_HISTORY", "100"))
+
+PROC_CHILDREN_SUPPORTED = os.path.exists(f"/proc/{os.getpid()}/task")
+
+_MB = 1024 * 1024
+
+
+# ----------------------------------------------------------------------------
+# Process inspection
+# ----------------------------------------------------------------------------
+
+
+def _read_proc(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def child_processes() -> dict[int, str]:
+    """Descendants of this process (pid -> command name), via /proc"""
+    if not PROC_CHILDREN_SUPPORTED:
+        return {}
+    found: dict[int, str] = {}
+    stack = [os.getpid()]
+    while stack:
+        pid = stack.pop()
+        try:
+            tasks = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            continue
+        for task in tasks:
+            children = _read_proc(f"/proc/{pid}/task/{task}/children") or ""
+            for child in children.split():
+                child_pid = int(child)
+                if child_pid not in found:
+                    found[child_pid] = (_read_proc(f"/proc/{child_pid}/comm") or "?").strip()
+                    stack.append(child_pid)
+    return found
+
+
+def is_zombie(pid: int) -> bool:
+    """Exited but not reaped by its parent"""
+    stat = _read_proc(f"/proc/{pid}/stat")
+    # "pid (comm) state ..." - comm may contain spaces and parentheses
+    return bool(stat) and stat[stat.rfind(")") + 2 :].startswith("Z")
+
+
+def live_threads() -> dict[int, threading.Thread]:
+    return {thread.ident: thread for thread in threading.enumerate() if thread.ident is not None}
+
+
+def temp_entries() -> set[str]:
+    try:
+        return set(os.listdir(tempfile.gettempdir()))
+    except OSError:
+        return set()
+
+
+def rss_bytes() -> Optional[int]:
+    statm = _read_proc("/proc/self/statm")
+    if statm is None:
+        return None
+    return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def process_snapshot() -> dict:
+    """Threads, child processes, temp files and memory of this process right now"""
+    threads = live_threads()
+    return {
+        "threads": {ident: thread.name for ident, thread in threads.items()},
+        "children": child_processes(),
+        "temp_files": temp_entries(),
+        "rss_bytes": rss_bytes(),
+        "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+    }
+
+
+def compare_snapshots(baseline: dict, current: dict) -> dict:
+    """What `current` holds beyond `baseline` (see process_snapshot)"""
+    diff = {
+        "threads": sorted(
+            name for ident, name in current["threads"].items() if ident not in baseline["threads"]
+        ),
+        "children": sorted(
+            f"{name} ({pid})"
+            for pid, name in current["children"].items()
+            if pid not in baseline["children"]
+        ),
+        "temp_files": sorted(current["temp_files"] - baseline["temp_files"]),
+        "rss_growth_mb": None,
+        "traced_growth_mb": None,
+    }
+    if baseline["rss_bytes"] is not None and current["rss_bytes"] is not None:
+        diff["rss_growth_mb"] = round((current["rss_bytes"] - baseline["rss_bytes"]) / _MB, 1)
+    if baseline["traced_bytes"] is not None and current["traced_bytes"] is not None:
+        diff["traced_growth_mb"] = round(
+            (current["traced_bytes"] - baseline["traced_bytes"]) / _MB, 1
+        )
+    return diff
+
+
+# ----------------------------------------------------------------------------
+# Thread attribution
+# ----------------------------------------------------------------------------
+
+# Set on each thread started on behalf of an analysis (inherited by the threads it starts)
+_REQUEST_ATTR = "_resource_request_id"
+
+_original_thread_start = threading.Thread.start
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def _install_thread_hook(tracker: "ResourceTracker"):
+    """Record which analysis started each thread (idempotent)"""
+    global _hook_installed
+    with _hook_lock:
+        if _hook_installed:
+            return
+
+        def start(thread: threading.Thread):
+            request_id = getattr(
+                threading.current_thread(), _REQUEST_ATTR, None
+            ) or tracker.owned_by(threading.get_ident())
+            if request_id is not None:
+                setattr(thread, _REQUEST_ATTR, request_id)
+            _original_thread_start(thread)
+            if request_id is not None:
+                tracker.attribute_thread(request_id, thread)
+
+        threading.Thread.start = start
+        _hook_installed = True
+
+
+# ----------------------------------------------------------------------------
+# Per-analysis accounting
+# ----------------------------------------------------------------------------
+
+
+@dataclass
+class ResourceUsage:
+    """Resources seen while one analysis ran"""
+
+    request_id: str
+    started_at: float
+    owner: int  # ident of the thread running the analysis
+    start_children: set[int]
+    start_temp_files: set[str]
+    start_rss: Optional[int]
+    traced: bool
+    traced_start: int = 0
+    traced_peak: int = 0
+    threads: dict[int, threading.Thread] = field(default_factory=dict)
+    children: dict[int, str] = field(default_factory=dict)
+    overlapped: bool = False  # ran alongside another analysis (children are shared)
+
+
+class ResourceTracker:
+    """Samples threads, child processes and traced memory for the running analyses"""
+
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL_S, history: int = HISTORY):
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._active: dict[str, ResourceUsage] = {}
+        self._traced_active = 0
+        self._started_tracing = False
+        self._sampler: Optional[threading.Thread] = None
+        self.reports: deque[dict] = deque(maxlen=history)
+        self.baseline: Optional[dict] = None
+        self.totals = {
+            "analyses": 0,
+            "threads_leaked": 0,
+            "children_leaked": 0,
+            "zombies": 0,
+            "temp_files_left": 0,
+        }
+
+    def mark_baseline(self):
+        """Remember the process state once started up (compared against by /debug/resources)"""
+        self._ensure_sampler()
+        self.baseline = process_snapshot()
+
+    def _ensure_sampler(self):
+        _install_thread_hook(self)
+        with self._lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(
+                target=self._sample_loop, name="resource-sampler", daemon=True
+            )
+        # Outside the lock - the thread hook takes it
+        self._sampler.start()
+
+    def owned_by(self, ident: int) -> Optional[str]:
+        """Request id of the running analysis whose thread has this ident"""
+        with self._lock:
+            for usage in self._active.values():
+                if usage.owner == ident:
+                    return usage.request_id
+        return None
+
+    def attribute_thread(self, request_id: str, thread: threading.Thread):
+        """Count a thread started on behalf of a running analysis"""
+        with self._lock:
+            usage = self._active.get(request_id)
+            if usage is not None and thread.ident is not None:
+                usage.threads.setdefault(thread.ident, thread)
+
+    def begin(self, request_id: str) -> ResourceUsage:
+        """Start accounting for an analysis (call on the thread that runs it)"""
+        self._ensure_sampler()
+        traced = TRACEMALLOC_RATE > 0 and random.random() < TRACEMALLOC_RATE
+        usage = ResourceUsage(
+            request_id=request_id,
+            started_at=time.time(),
+            owner=threading.get_ident(),
+            start_children=set(child_processes()),
+            start_temp_files=temp_entries(),
+            start_rss=rss_bytes(),
+            traced=traced,
+        )
+        with self._lock:
+            if traced:
+                if self._traced_active == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                self._traced_active += 1
+                usage.traced_start = tracemalloc.get_traced_memory()[0]
+            if self._active:
+                usage.overlapped = True
+                for other in self._active.values():
+                    other.overlapped = True
+            self._active[request_id] = usage
+        return usage
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            try:
+                self._sample(active)
+            except Exception as e:
+                logger.warning("Resource sampling failed", error=str(e))
+
+    def _sample(self, active: list[ResourceUsage]):
+        # Threads are attributed when they start (see _install_thread_hook)
+        children = child_processes()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        for usage in active:
+            for pid, name in children.items():
+                if pid not in usage.start_children:
+                    usage.children.setdefault(pid, name)
+            if usage.traced and traced is not None:
+                usage.traced_peak = max(usage.traced_peak, traced - usage.traced_start)
+
+    def end(self, usage: ResourceUsage) -> dict:
+        """
+        Finish accounting for an analysis
+
+        Waits up to RESOURCE_SETTLE_S for the threads it started and the
+        processes spawned while it ran to exit, so call it after the result
+        was delivered.
+
+        Returns:
+            Report with the leaks found (also kept for /debug/resources)
+        """
+        self._sample([usage])
+        deadline = time.monotonic() + SETTLE_S
+        with self._lock:
+            threads = list(usage.threads.values())
+        for thread in threads:
+            if thread.ident != usage.owner:
+                thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        # Children seen alongside other analyses may be theirs - not waited for
+        while (
+            not usage.overlapped
+            and time.monotonic() < deadline
+            and set(usage.children) & set(child_processes())
+        ):
+            time.sleep(0.05)
+
+        with self._lock:
+            self._active.pop(usage.request_id, None)
+            if usage.traced:
+                self._traced_active -= 1
+                # Tracing started by someone else (the soak test) keeps running
+                if self._traced_active == 0 and self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+
+        temp_left = sorted(temp_entries() - usage.start_temp_files)
+        end_rss = rss_bytes()
+        report = {
+            "request_id": usage.request_id,
+            "started_at": usage.started_at,
+            "duration_s": round(time.time() - usage.started_at, 1),
+            "threads_created": len(usage.threads),
+            "children_spawned": len(usage.children),
+            "temp_files_left": temp_left,
+            "rss_delta_mb": (
+                round((end_rss - usage.start_rss) / _MB, 1)
+                if end_rss is not None and usage.start_rss is not None
+                else None
+            ),
+            "peak_traced_mb": round(usage.traced_peak / _MB, 1) if usage.traced else None,
+            "overlapped": usage.overlapped,
+            **self._leaks(usage),
+        }
+        # Only threads and children are re-checked later
+        usage.start_children, usage.start_temp_files = set(), set()
+
+        # Children and temp files can't be told apart between concurrent analyses
+        with self._lock:
+            self.reports.append(report)
+            self.totals["analyses"] += 1
+            self.totals["threads_leaked"] += len(report["threads_alive"])
+            if not usage.overlapped:
+                self.totals["children_leaked"] += len(report["children_alive"])
+                self.totals["zombies"] += len(report["zombies"])
+                self.totals["temp_files_left"] += len(temp_left)
+        # Kept for the live re-check
+        report["_usage"] = usage
+
+        own_leftovers = not usage.overlapped and (
+            report["children_alive"] or report["zombies"] or temp_left
+        )
+        if report["threads_alive"] or own_leftovers:
+            logger.warning(
+                "Analysis left resources behind",
+                request_id=usage.request_id,
+                threads_alive=report["threads_alive"],
+                children_alive=report["children_alive"],
+                zombies=report["zombies"],
+                temp_files_left=temp_left,
+            )
+        return {key: value for key, value in report.items() if not key.startswith("_")}
+
+    def _leaks(self, usage: ResourceUsage) -> dict:
+        """Threads and processes of the analysis that are still around"""
+        children = child_processes()
+        alive = {pid: name for pid, name in usage.children.items() if pid in children}
+        zombies = {pid: name for pid, name in alive.items() if is_zombie(pid)}
+        return {
+            "threads_alive": sorted(
+                thread.name
+                for thread in usage.threads.values()
+                if thread.is_alive() and thread.ident != usage.owner
+            ),
+            "children_reaped": len(usage.children) - len(alive),
+            "children_alive": sorted(
+                f"{name} ({pid})" for pid, name in alive.items() if pid not in zombies
+            ),
+            "zombies": sorted(f"{name} ({pid})" for pid, name in zombies.items()),
+        }
+
+    def snapshot(self) -> dict:
+        """Current process state, growth over the baseline and recent reports (leaks re-checked)"""
+        current = process_snapshot()
+        with self._lock:
+            reports = list(self.reports)
+            active = sorted(self._active)
+            totals = dict(self.totals)
+        recent = []
+        for report in reports:
+            entry = {key: value for key, value in report.items() if not key.startswith("_")}
+            entry.update(
+                {f"{key}_now": value for key, value in self._leaks(report["_usage"]).items()}
+            )
+            recent.append(entry)
+        return {
+            "enabled": RESOURCE_TRACKING,
+            "process": {
+                "threads": len(current["threads"]),
+                "children": len(current["children"]),
+                "rss_mb": (
+                    round(current["rss_bytes"] / _MB, 1)
+                    if current["rss_bytes"] is not None
+                    else None
+                ),
+                "tracemalloc": tracemalloc.is_tracing(),
+            },
+            "since_baseline": compare_snapshots(self.baseline, current) if self.baseline else None,
+            "active": active,
+            "totals": totals,
+            "leaking": [
+                entry["request_id"]
+                for entry in recent
+                if entry["threads_alive_now"]
+                or (
+                    not entry["overlapped"]
+                    and (entry["children_alive_now"] or entry["zombies_now"])
+                )
+            ],
+            "recent": recent,
+        }
+
+
+resource_tracker = ResourceTracker()
@@ -0,0 +1,58 @@
+"""SimHash Fingerprints of Text
+
+64-bit SimHash over word 3-shingles: texts that share most of their
+shingles get fingerprints a few bits apart, so "has this page materially
+changed?" becomes a Hamming distance. Vectorized with NumPy if installed.
+"""
+
+import hashlib
+import re
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # optional, pure Python fallback
+    np = None
+
+
+SHINGLE_WORDS = 3
+BITS = 64
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(text: str) -> Counter:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return Counter(words)
+    return Counter(
+        " ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)
+    )
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of a text (0 for text without words)"""
+    features = _features(text)
+    if not features:
+        return 0
+    hashes = [_hash64(feature) for feature in features]
+    weights = list(features.values())
+
+    if np is not None:
+        bits = np.unpackbits(np.array(hashes, dtype=">u8").view(np.uint8).reshape(-1, 8), axis=1)
+        votes = np.asarray(weights, dtype=np.int64) @ (bits.astype(np.int64) * 2 - 1)
+        return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+    votes = [0] * BITS
+    for value, weight in zip(hashes, weights):
+        for bit in range(BITS):
+            votes[bit] += weight if value >> (BITS - 1 - bit) & 1 else -weight
+    return sum(1 << (BITS - 1 - bit) for bit, vote in enumerate(votes) if vote > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -0,0 +1,127 @@
+"""Disk Cache of Task Outputs
+
+Outputs of crew tasks keyed by an input fingerprint (see crew.memo). SQLite
+in WAL mode, so concurrent analyses, uvicorn workers and batch worker
+processes on one host share it.
+
+Configured via environment variables:
+    TASK_CACHE_ENABLED:   Serve unchanged tasks from the cache (default: true)
+    TASK_CACHE_PATH:      SQLite file (default: <tempdir>/ads_quality_rater_task_cache.db)
+    TASK_CACHE_TTL_S:     Seconds an output of external content (the landing page scrape) is
+                          served (default: 86400) - bounds how stale a cached scrape can get
+    TASK_CACHE_STABLE_TTL_S:
+                          Seconds an output that depends only on its inputs is served, and
+                          entries are kept (default: 604800)
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+
+TASK_CACHE_ENABLED = os.getenv("TASK_CACHE_ENABLED", "true").lower() == "true"
+TASK_CACHE_PATH = os.getenv(
+    "TASK_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ads_quality_rater_task_cache.db")
+)
+TASK_CACHE_TTL_S = float(os.getenv("TASK_CACHE_TTL_S", str(24 * 60 * 60)))
+TASK_CACHE_STABLE_TTL_S = float(os.getenv("TASK_CACHE_STABLE_TTL_S", str(7 * 24 * 60 * 60)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_outputs (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    structured TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_outputs_created ON task_outputs (created_at);
+"""
+
+
+class TaskCache:
+    """Task outputs (raw text plus structured fields) by fingerprint"""
+
+    def __init__(
+        self,
+        path: str = TASK_CACHE_PATH,
+        ttl: float = TASK_CACHE_TTL_S,
+        stable_ttl: float = TASK_CACHE_STABLE_TTL_S,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.stable_ttl = max(stable_ttl, ttl)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Look up an output
+
+        Args:
+            key: Fingerprint
+            max_age: Seconds the entry may be old (default: the TTL of external content)
+
+        Returns:
+            dict with raw and structured (dict or None) - None if missing or expired
+        """
+        row = (
+            self._conn()
+            .execute(
+                "SELECT raw, structured FROM task_outputs WHERE key = ? AND created_at >= ?",
+                (key, time.time() - (self.ttl if max_age is None else max_age)),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return {"raw": row[0], "structured": json.loads(row[1]) if row[1] else None}
+
+    def put(self, key: str, task: str, raw: str, structured: Optional[dict] = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO task_outputs (key, task, raw, structured, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                task,
+                raw,
+                json.dumps(structured, default=str) if structured is not None else None,
+                time.time(),
+            ),
+        )
+
+    def cleanup(self) -> int:
+        """Delete entries older than the stable TTL"""
+        cursor = self._conn().execute(
+            "DELETE FROM task_outputs WHERE created_at < ?", (time.time() - self.stable_ttl,)
+        )
+        return cursor.rowcount
+
+
+_cache: Optional[TaskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_task_cache() -> Optional[TaskCache]:
+    """The process-wide cache, or None if TASK_CACHE_ENABLED is off"""
+    global _cache
+    if not TASK_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TaskCache()
+        return _cache
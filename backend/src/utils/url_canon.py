@@ -0,0 +1,170 @@
+"""Landing Page URL Canonicalization
+
+Ads link the same landing page with different tracking parameters
+(utm_*, gclid, li_fat_id, ...), fragments, host spellings and trailing
+slashes, often behind a redirect. The crew works with the canonical URL,
+so the scrape (and everything downstream of it) is served from the task
+cache for every variant of the link.
+
+Configured via environment variables:
+    URL_STRIP_PARAMS:     Extra query parameters to drop, comma-separated
+                          (in addition to TRACKING_PARAMS and utm_*/hsa_*)
+    URL_RESOLVE_TTL_S:    Seconds a resolved redirect target is reused (default: 21600)
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils.http_pool import resolve_url
+from utils.logger import logger
+
+
+TRACKING_PARAMS = {
+    # Ad click ids
+    "gclid",
+    "gbraid",
+    "wbraid",
+    "dclid",
+    "gclsrc",
+    "fbclid",
+    "msclkid",
+    "li_fat_id",
+    "twclid",
+    "ttclid",
+    "yclid",
+    "epik",
+    "rdt_cid",
+    "sccid",
+    "irclickid",
+    # Email and marketing automation
+    "mc_cid",
+    "mc_eid",
+    "_hsenc",
+    "_hsmi",
+    "mkt_tok",
+    "oly_anon_id",
+    "oly_enc_id",
+    "vero_id",
+    # Analytics
+    "_ga",
+    "_gl",
+    "igshid",
+    "s_kwcid",
+    "ef_id",
+}
+TRACKING_PREFIXES = ("utm_", "hsa_", "pk_", "mtm_")
+TRACKING_PARAMS |= {
+    param.strip().lower() for param in os.getenv("URL_STRIP_PARAMS", "").split(",") if param.strip()
+}
+
+RESOLVE_TTL_S = float(os.getenv("URL_RESOLVE_TTL_S", str(6 * 3600)))
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a landing page URL (no network access)
+
+    Lowercases scheme and host (IDNA-encoded), drops default ports, the
+    fragment, tracking parameters and a trailing slash, and sorts the
+    remaining query parameters. Anything that doesn't parse as an
+    http(s) URL is returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    host = host.lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    if parts.username:
+        credentials = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{credentials}@{host}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ResolvedUrlCache:
+    """Redirect targets per canonical URL, so each link is resolved once per TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._targets: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._targets.get(url)
+            if entry is None:
+                return None
+            target, expires_at = entry
+            if expires_at < time.time():
+                del self._targets[url]
+                return None
+            return target
+
+    def set(self, url: str, target: str):
+        with self._lock:
+            self._targets[url] = (target, time.time() + self.ttl)
+
+
+resolved_urls = ResolvedUrlCache(RESOLVE_TTL_S)
+
+
+def resolve_landing_page_url(url: str, timeout: float = 5.0) -> str:
+    """
+    Canonicalize a URL and follow its redirects (once per URL and TTL)
+
+    The redirect target is canonicalized again - redirects often append
+    tracking parameters of their own. If the target can't be resolved the
+    canonical URL is used as it is.
+
+    Returns:
+        Canonical URL of the page the link ends up at
+    """
+    canonical = canonicalize_url(url)
+    if not canonical.startswith(("http://", "https://")):
+        return canonical
+    cached = resolved_urls.get(canonical)
+    if cached is not None:
+        return cached
+    try:
+        target = canonicalize_url(resolve_url(canonical, timeout=timeout))
+    except Exception as e:
+        logger.debug("Redirect resolution failed", url=canonical, error=str(e))
+        return canonical
+    resolved_urls.set(canonical, target)
+    if target != canonical:
+        logger.debug("Landing page URL redirects", url=canonical, target=target)
+    return target
@@ -0,0 +1,6 @@
+"""Shared test setup: modules are imported from src/ like the API does (from utils.x import ...)"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,82 @@
+import json
+
+from batch.runner import Checkpoint
+from store.job_store import STATUS_FAILED, STATUS_SUCCEEDED
+
+
+def _write_lines(path, lines):
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+
+
+def _items(*ids):
+    return [{"id": item_id} for item_id in ids]
+
+
+def test_pending_skips_finished_items(tmp_path):
+    checkpoint = Checkpoint(
+        str(tmp_path / "results.jsonl.checkpoint"), str(tmp_path / "results.jsonl")
+    )
+    checkpoint.mark("a", STATUS_SUCCEEDED)
+    checkpoint.mark("b", STATUS_FAILED)
+    checkpoint.close()
+
+    reloaded = Checkpoint(
+        str(tmp_path / "results.jsonl.checkpoint"), str(tmp_path / "results.jsonl")
+    )
+
+    assert reloaded.pending(_items("a", "b", "c")) == _items("c")
+    assert reloaded.pending(_items("a", "b", "c"), retry_failed=True) == _items("b", "c")
+    reloaded.close()
+
+
+def test_results_missing_from_the_checkpoint_are_recovered(tmp_path):
+    # Crash after the result was written, before its checkpoint entry
+    _write_lines(
+        tmp_path / "results.jsonl",
+        [
+            {"id": "a", "status": STATUS_SUCCEEDED},
+            {"id": "b", "status": STATUS_SUCCEEDED},
+        ],
+    )
+    _write_lines(tmp_path / "results.jsonl.checkpoint", [{"id": "a", "status": STATUS_SUCCEEDED}])
+
+    checkpoint = Checkpoint(
+        str(tmp_path / "results.jsonl.checkpoint"), str(tmp_path / "results.jsonl")
+    )
+    checkpoint.close()
+
+    assert checkpoint.status == {"a": STATUS_SUCCEEDED, "b": STATUS_SUCCEEDED}
+    entries = (tmp_path / "results.jsonl.checkpoint").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(entry)["id"] for entry in entries] == ["a", "b"]
+
+
+def test_torn_last_lines_are_cut_off(tmp_path):
+    with open(tmp_path / "results.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "a", "status": STATUS_SUCCEEDED}) + "\n")
+        f.write('{"id": "b", "stat')
+    with open(tmp_path / "results.jsonl.checkpoint", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "a", "status": STATUS_SUCCEEDED}) + "\n")
+        f.write('{"id": "b"')
+
+    checkpoint = Checkpoint(
+        str(tmp_path / "results.jsonl.checkpoint"), str(tmp_path / "results.jsonl")
+    )
+    checkpoint.mark("c", STATUS_SUCCEEDED)
+    checkpoint.close()
+
+    assert checkpoint.pending(_items("a", "b", "c")) == _items("b")
+    assert (tmp_path / "results.jsonl").read_text(encoding="utf-8").endswith("\n")
+    for line in (tmp_path / "results.jsonl.checkpoint").read_text(encoding="utf-8").splitlines():
+        json.loads(line)
+
+
+def test_torn_single_line_empties_the_file(tmp_path):
+    (tmp_path / "results.jsonl.checkpoint").write_text('{"id": "a", "sta', encoding="utf-8")
+
+    checkpoint = Checkpoint(
+        str(tmp_path / "results.jsonl.checkpoint"), str(tmp_path / "results.jsonl")
+    )
+    checkpoint.close()
+
+    assert checkpoint.status == {}
+    assert (tmp_path / "results.jsonl.checkpoint").read_text(encoding="utf-8") == ""
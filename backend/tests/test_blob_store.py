@@ -0,0 +1,75 @@
+import pytest
+
+from utils.blob_store import (
+    BLOB_SCHEME,
+    BlobNotFoundError,
+    BlobStore,
+    BlobStoreFullError,
+    is_blob_handle,
+)
+
+
+def test_put_get_and_release():
+    store = BlobStore()
+    handle = store.put(b"image bytes", "image/png")
+
+    assert is_blob_handle(handle)
+    assert store.get(handle) == (b"image bytes", "image/png")
+
+    store.release(handle)
+    with pytest.raises(BlobNotFoundError):
+        store.get(handle)
+    assert store.snapshot()["bytes"] == 0
+
+
+def test_identical_content_is_shared_and_refcounted():
+    store = BlobStore()
+    first = store.put(b"same", "image/jpeg")
+    second = store.put(b"same", "image/jpeg")
+
+    assert first == second
+    assert store.snapshot()["dedup_hits"] == 1
+
+    store.release(first)
+    assert store.get(second)[0] == b"same"
+    store.release(second)
+    with pytest.raises(BlobNotFoundError):
+        store.get(second)
+
+
+def test_retain_keeps_the_blob_after_one_release():
+    store = BlobStore()
+    handle = store.put(b"data", "image/png")
+    store.retain(handle)
+
+    store.release(handle)
+
+    assert store.get(handle)[0] == b"data"
+
+
+def test_sweep_keeps_referenced_blobs():
+    store = BlobStore(ttl=0)
+    handle = store.put(b"held by a running analysis", "image/png")
+
+    assert store.sweep() == 0
+    assert store.get(handle)[0] == b"held by a running analysis"
+
+
+def test_sweep_drops_unreferenced_idle_blobs():
+    store = BlobStore(ttl=0)
+    handle = store.put(b"orphan", "image/png")
+    # A blob whose references were lost without a release
+    store._blobs[handle[len(BLOB_SCHEME) :]].refcount = 0
+
+    assert store.sweep() == 1
+    with pytest.raises(BlobNotFoundError):
+        store.get(handle)
+
+
+def test_size_cap_rejects_new_blobs():
+    store = BlobStore(max_bytes=10)
+    store.put(b"12345678", "image/png")
+
+    with pytest.raises(BlobStoreFullError):
+        store.put(b"abcdefgh", "image/png")
+    assert store.snapshot()["rejected"] == 1
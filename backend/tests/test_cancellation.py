@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from utils.cancellation import AnalysisCancelled, CancelToken, DeadlineExceeded
+
+
+def test_cancel_runs_callbacks_once():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("first"))
+
+    token.cancel("client disconnected")
+    token.cancel("again")
+
+    assert token.cancelled
+    assert token.reason == "client disconnected"
+    assert calls == ["first"]
+
+
+def test_on_cancel_after_cancel_runs_immediately():
+    token = CancelToken()
+    token.cancel()
+    calls = []
+
+    token.on_cancel(lambda: calls.append(True))
+
+    assert calls == [True]
+
+
+def test_failing_callback_does_not_stop_the_others():
+    token = CancelToken()
+    calls = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    token.on_cancel(fail)
+    token.on_cancel(lambda: calls.append(True))
+    token.cancel()
+
+    assert calls == [True]
+
+
+def test_raise_if_cancelled():
+    token = CancelToken()
+    token.raise_if_cancelled()
+
+    token.cancel("stop")
+
+    with pytest.raises(AnalysisCancelled, match="stop"):
+        token.raise_if_cancelled()
+    assert not token.deadline_exceeded
+
+
+def test_deadline_cancel_raises_deadline_exceeded():
+    token = CancelToken()
+    token.cancel("deadline exceeded", DeadlineExceeded)
+
+    assert token.deadline_exceeded
+    with pytest.raises(DeadlineExceeded):
+        token.raise_if_cancelled()
+
+
+def test_sleep_wakes_up_on_cancel():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(AnalysisCancelled):
+        token.sleep(5)
+    assert time.monotonic() - started < 2
+
+
+def test_sleep_without_cancel_returns():
+    CancelToken().sleep(0.01)
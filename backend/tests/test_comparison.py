@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from crew.comparison import condense_landing_page
+
+
+def test_blank_lines_and_indentation_are_dropped():
+    text = "  Headline  \n\n\n   Subline\n\t\nCall to action  "
+
+    assert condense_landing_page(text) == "Headline\nSubline\nCall to action"
+
+
+def test_short_text_is_kept_whole():
+    assert condense_landing_page("One line", max_chars=100) == "One line"
+
+
+def test_long_text_is_cut_at_a_line_break():
+    text = "\n".join(f"Line {number:02d} with some text" for number in range(20))
+
+    condensed = condense_landing_page(text, max_chars=100)
+
+    assert condensed.endswith("\n[...]")
+    kept = condensed[: -len("\n[...]")]
+    assert len(kept) <= 100
+    assert text.startswith(kept)
+    assert kept.endswith("with some text")
+
+
+def test_text_without_line_breaks_is_cut_at_the_limit():
+    condensed = condense_landing_page("x" * 500, max_chars=100)
+
+    assert condensed == "x" * 100 + "\n[...]"
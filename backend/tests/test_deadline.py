@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from utils import deadline as deadline_module
+from utils.deadline import Deadline
+
+
+def test_after_uses_the_default_budget(monkeypatch):
+    monkeypatch.setattr(deadline_module, "DEFAULT_DEADLINE_S", 110.0)
+
+    for seconds in (None, 0, -5):
+        assert Deadline.after(seconds).remaining() == pytest.approx(110, abs=1)
+
+
+def test_after_is_capped_at_the_maximum(monkeypatch):
+    monkeypatch.setattr(deadline_module, "MAX_DEADLINE_S", 600.0)
+
+    assert Deadline.after(3600).remaining() == pytest.approx(600, abs=1)
+    assert Deadline.after(30).remaining() == pytest.approx(30, abs=1)
+
+
+def test_expired_deadline():
+    deadline = Deadline(time.time() - 1)
+
+    assert deadline.expired
+    assert deadline.remaining() == 0
+    assert not deadline.allows(0.5)
+
+
+def test_allows():
+    deadline = Deadline(time.time() + 20)
+
+    assert deadline.allows(15)
+    assert not deadline.allows(30)
+
+
+def test_clamp_shortens_to_the_budget_but_keeps_the_minimum():
+    deadline = Deadline(time.time() + 10)
+
+    assert deadline.clamp(5) == 5
+    assert deadline.clamp(60) == pytest.approx(10, abs=0.5)
+    assert Deadline(time.time() - 1).clamp(60, minimum=2) == 2
@@ -0,0 +1,77 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from utils import extraction_pool
+from utils.extraction_pool import ExtractionTimeout
+
+
+class _Pool:
+    """Stands in for the process pool: a worker picks the task up after `start_after` seconds"""
+
+    def __init__(self, markers, start_after, parse_for):
+        self.markers = markers
+        self.start_after = start_after
+        self.parse_for = parse_for
+
+    def submit(self, fn, html, task_id):
+        future = Future()
+
+        def work():
+            time.sleep(self.start_after)
+            if not future.set_running_or_notify_cancel():
+                return
+            started_at = time.time()
+            self.markers.put((task_id, started_at))
+            time.sleep(self.parse_for)
+            future.set_result(("text", started_at, time.time()))
+
+        threading.Thread(target=work, daemon=True).start()
+        return future
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    recycled = []
+    monkeypatch.setattr(extraction_pool, "_recycle_pool", recycled.append)
+
+    def install(start_after, parse_for):
+        markers = queue.SimpleQueue()
+        pool = _Pool(markers, start_after, parse_for)
+        monkeypatch.setattr(extraction_pool, "_get_pool", lambda: (pool, markers))
+        return recycled
+
+    return install
+
+
+def test_queue_wait_does_not_count_against_the_parse_timeout(fake_pool):
+    recycled = fake_pool(start_after=0.15, parse_for=0.12)
+
+    text, started_at, finished_at = extraction_pool._run_in_pool("<html/>", timeout=0.2)
+
+    assert text == "text"
+    assert recycled == []
+
+
+def test_queue_timeout_fails_the_request_without_recycling(fake_pool):
+    recycled = fake_pool(start_after=0.5, parse_for=0.0)
+    before = extraction_pool.stats()
+
+    with pytest.raises(ExtractionTimeout, match="free worker"):
+        extraction_pool._run_in_pool("<html/>", timeout=0.05)
+
+    assert recycled == []
+    assert extraction_pool.stats()["queue_timeouts"] == before["queue_timeouts"] + 1
+    assert extraction_pool.stats()["timeouts"] == before["timeouts"]
+
+
+def test_overrunning_parse_recycles_the_pool(fake_pool):
+    recycled = fake_pool(start_after=0.0, parse_for=0.5)
+
+    with pytest.raises(ExtractionTimeout, match="exceeded"):
+        extraction_pool._run_in_pool("<html/>", timeout=0.1)
+
+    assert len(recycled) == 1
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("google.genai")
+
+from tools.gemini_vision_tool import _split_carousel_sections
+
+
+def test_split_card_notes_and_sequence():
+    text = (
+        "Card 1: Strong hook with the product in use.\n"
+        "Card 2: Too much text.\n"
+        "Card 3: Clear CTA.\n"
+        "Sequence: The story builds up well."
+    )
+
+    notes, sequence = _split_carousel_sections(text, 3)
+
+    assert notes == ["Strong hook with the product in use.", "Too much text.", "Clear CTA."]
+    assert sequence == "The story builds up well."
+
+
+def test_split_markdown_headings_and_multiline_bodies():
+    text = (
+        "## Card 1:\nFirst line.\nSecond line.\n\n"
+        "**Card 2:** Bold label.\n"
+        "### Sequence\n"
+        "- no colon, so part of card 2"
+    )
+
+    notes, sequence = _split_carousel_sections(text, 2)
+
+    assert notes[0] == "First line.\nSecond line."
+    assert notes[1].startswith("Bold label.")
+    assert sequence is None
+
+
+def test_split_missing_and_out_of_range_cards():
+    notes, sequence = _split_carousel_sections("Card 2: Only the second.\nCard 7: No such card.", 3)
+
+    assert notes == [None, "Only the second.", None]
+    assert sequence is None
+
+
+def test_split_without_sections():
+    assert _split_carousel_sections("A single analysis of the whole carousel.", 2) == (
+        [None, None],
+        None,
+    )
@@ -0,0 +1,89 @@
+import random
+
+from utils.image_index import BKTree, ImageHashes, ImageIndex, exact_matches_only, hamming
+
+
+def test_bk_tree_search_matches_brute_force():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    # Near copies of a few values, 1-3 bits apart
+    for value in values[:20]:
+        values.append(value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)))
+    tree = BKTree()
+    for entry_id, value in enumerate(values):
+        tree.add(value, entry_id)
+
+    for query in values[:40] + [rng.getrandbits(64) for _ in range(10)]:
+        for max_distance in (0, 2, 8):
+            expected = sorted(
+                (hamming(query, value), entry_id)
+                for entry_id, value in enumerate(values)
+                if hamming(query, value) <= max_distance
+            )
+            assert tree.search(query, max_distance) == expected
+
+
+def test_bk_tree_keeps_duplicates_and_sorts_nearest_first():
+    tree = BKTree()
+    tree.add(0b1111, 1)
+    tree.add(0b1111, 2)
+    tree.add(0b0111, 3)
+
+    assert tree.size == 3
+    assert tree.search(0b1111, 1) == [(0, 1), (0, 2), (1, 3)]
+    assert BKTree().search(0, 64) == []
+
+
+def _hashes(phash: int, sha256: str, dhash: int = 0, aspect: float = 1.0) -> ImageHashes:
+    return ImageHashes(phash=phash, dhash=dhash, aspect=aspect, sha256=sha256)
+
+
+def test_index_serves_exact_and_near_duplicates(tmp_path):
+    index = ImageIndex(path=str(tmp_path / "index.db"), max_distance=2)
+    index.add(_hashes(0xFF00, "a" * 64), "variant-1", "analysis of A")
+
+    exact = index.find(_hashes(0x1234, "a" * 64), "variant-1")
+    assert exact.exact and exact.distance == 0 and exact.analysis == "analysis of A"
+
+    near = index.find(_hashes(0xFF01, "b" * 64), "variant-1")
+    assert not near.exact and near.distance == 1 and near.sha256 == "a" * 64
+
+    assert index.find(_hashes(0xFF0F, "c" * 64), "variant-1") is None
+    # Made with another model or prompt
+    assert index.find(_hashes(0xFF00, "a" * 64), "variant-2") is None
+
+
+def test_index_checks_aspect_ratio_and_dhash(tmp_path):
+    index = ImageIndex(path=str(tmp_path / "index.db"), max_distance=2)
+    index.add(_hashes(0xFF00, "a" * 64, dhash=0b1, aspect=1.0), "v", "square")
+
+    assert index.find(_hashes(0xFF00, "b" * 64, dhash=0b1, aspect=1.91), "v") is None
+    assert index.find(_hashes(0xFF00, "c" * 64, dhash=0b1110, aspect=1.0), "v") is None
+
+
+def test_exact_matches_only_disables_near_duplicates(tmp_path):
+    index = ImageIndex(path=str(tmp_path / "index.db"), max_distance=2)
+    index.add(_hashes(0xFF00, "a" * 64), "v", "analysis")
+
+    with exact_matches_only():
+        assert index.find(_hashes(0xFF01, "b" * 64), "v") is None
+        assert index.find(_hashes(0xFF00, "a" * 64), "v").exact
+    assert index.find(_hashes(0xFF01, "b" * 64), "v") is not None
+
+
+def test_index_is_capped_at_max_entries(tmp_path):
+    index = ImageIndex(path=str(tmp_path / "index.db"), max_distance=0, max_entries=2)
+    for number in range(3):
+        index.add(_hashes(number << 32, f"{number:064d}"), "v", f"analysis {number}")
+    # The first entry was used longest ago
+    index._conn().execute(
+        "UPDATE image_analyses SET created_at = created_at - 60, last_used = last_used - 60 "
+        "WHERE sha256 = ?",
+        (f"{0:064d}",),
+    )
+
+    index._prune()
+    index._refresh()
+
+    assert index.snapshot()["entries"] == 2
+    assert index.find(_hashes(0, f"{0:064d}"), "v") is None
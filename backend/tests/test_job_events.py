@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+from api import jobs
+from store.job_store import STATUS_SUCCEEDED
+from store.sqlite_store import SQLiteJobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+def _job_with_events(store, job_id, count):
+    store.create_job(job_id, {"landing_page_url": "https://example.com"})
+    return [
+        store.append_event(job_id, {"type": "log", "data": f"event {number}"})
+        for number in range(count)
+    ]
+
+
+def test_trim_keeps_the_newest_events(store):
+    seqs = _job_with_events(store, "job", 10)
+
+    assert store.trim_events("job", 4) == 6
+
+    assert [seq for seq, _ in store.read_events("job")] == seqs[-4:]
+    assert store.get_job("job")["events_trimmed"] == seqs[5]
+    assert store.trim_events("job", 4) == 0
+
+
+def test_read_events_resumes_after_a_sequence_number(store):
+    seqs = _job_with_events(store, "job", 5)
+    store.trim_events("job", 3)
+
+    events = store.read_events("job", after=seqs[3])
+
+    assert events == [(seqs[4], {"type": "log", "data": "event 4"})]
+    assert len(store.read_events("job", after=0, limit=2)) == 2
+
+
+def test_trim_is_per_job(store):
+    _job_with_events(store, "job", 6)
+    other = _job_with_events(store, "other", 3)
+
+    store.trim_events("job", 2)
+
+    assert [seq for seq, _ in store.read_events("other")] == other
+    assert store.get_job("other")["events_trimmed"] == 0
+
+
+def test_replay_gap_only_before_the_oldest_kept_event():
+    job = {"id": "job", "events_trimmed": 5}
+
+    gap = jobs._replay_gap(job, 2)
+
+    assert json.loads(gap[len("data: ") :]) == {
+        "type": "replay_gap",
+        "data": {"last_event_id": 2, "events_trimmed": 5},
+    }
+    assert jobs._replay_gap(job, 5) is None
+    assert jobs._replay_gap({"id": "job", "events_trimmed": 0}, 0) is None
+
+
+async def _collect(stream) -> list[dict]:
+    events = []
+    async for chunk in stream:
+        data = next((line for line in chunk.splitlines() if line.startswith("data: ")), None)
+        if data is not None:
+            events.append(json.loads(data[len("data: ") :]))
+    return events
+
+
+def test_first_connect_to_a_trimmed_job_gets_a_replay_gap(store, monkeypatch):
+    monkeypatch.setattr(jobs, "get_job_store", lambda: store)
+    seqs = _job_with_events(store, "job", 6)
+    store.trim_events("job", 2)
+    store.update_job("job", status=STATUS_SUCCEEDED)
+
+    events = asyncio.run(_collect(jobs.stream_job_events("job")))
+
+    assert events[0]["type"] == "replay_gap"
+    assert events[0]["data"]["events_trimmed"] == seqs[3]
+    assert [event["data"] for event in events[1:]] == ["event 4", "event 5"]
+
+
+def test_resume_within_the_buffer_has_no_gap(store, monkeypatch):
+    monkeypatch.setattr(jobs, "get_job_store", lambda: store)
+    seqs = _job_with_events(store, "job", 6)
+    store.trim_events("job", 2)
+    store.update_job("job", status=STATUS_SUCCEEDED)
+
+    events = asyncio.run(_collect(jobs.stream_job_events("job", after=seqs[4])))
+
+    assert [event["data"] for event in events] == ["event 5"]
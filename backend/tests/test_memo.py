@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from crew.memo import CACHE_NEAR_DUPLICATE, TaskMemo
+from utils.task_cache import TaskCache
+
+
+def _task(**overrides):
+    fields = {
+        "name": "copywriting",
+        "description": "Rate the copy",
+        "expected_output": "JSON",
+        "output_pydantic": None,
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def _agent(model="gemini/gemini-2.5-flash", temperature=0.7):
+    return SimpleNamespace(
+        role="Copywriter",
+        goal="Rate copy",
+        backstory="Ten years in ads",
+        llm=SimpleNamespace(model=model, temperature=temperature),
+    )
+
+
+def _output(raw):
+    return SimpleNamespace(raw=raw, pydantic=None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TaskCache(path=str(tmp_path / "cache.db"), ttl=3600, stable_ttl=7200)
+
+
+def test_fingerprint_is_stable(cache):
+    memo = TaskMemo(cache, inputs={"copywriting": {"ad": "sha-1"}})
+
+    assert memo.fingerprint(_task(), _agent(), "upstream") == memo.fingerprint(
+        _task(), _agent(), "upstream"
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"task": {"description": "Rate the copy harder"}},
+        {"agent": {"model": "gemini/gemini-2.5-flash-lite"}},
+        {"agent": {"temperature": 0.2}},
+        {"context": "changed upstream output"},
+        {"inputs": {"ad": "sha-2"}},
+    ],
+)
+def test_fingerprint_changes_with_what_shapes_the_output(cache, change):
+    memo = TaskMemo(cache, inputs={"copywriting": {"ad": "sha-1"}})
+    key = memo.fingerprint(_task(), _agent(), "upstream")
+
+    if "inputs" in change:
+        memo = TaskMemo(cache, inputs={"copywriting": change["inputs"]})
+    changed = memo.fingerprint(
+        _task(**change.get("task", {})),
+        _agent(**change.get("agent", {})),
+        change.get("context", "upstream"),
+    )
+
+    assert changed != key
+
+
+def test_lookup_miss_then_hit(cache):
+    memo = TaskMemo(cache)
+    key = memo.fingerprint(_task(), _agent(), None)
+
+    assert memo.lookup(key, "copywriting") is None
+    assert memo.store(key, "copywriting", _output("Score: 80")) is None
+
+    assert memo.lookup(key, "copywriting") == {"raw": "Score: 80", "structured": None}
+
+
+def test_volatile_tasks_expire_sooner(tmp_path):
+    cache = TaskCache(path=str(tmp_path / "cache.db"), ttl=-1, stable_ttl=3600)
+    memo = TaskMemo(cache, volatile={"landing_page"})
+    cache.put("key", "landing_page", "page text")
+    cache.put("stable", "copywriting", "copy")
+
+    assert memo.lookup("key", "landing_page") is None
+    assert memo.lookup("stable", "copywriting") is not None
+
+
+def test_unchanged_rescrape_keeps_the_previous_output(tmp_path):
+    cache = TaskCache(path=str(tmp_path / "cache.db"), ttl=-1, stable_ttl=3600)
+    memo = TaskMemo(cache, volatile={"landing_page"})
+    page = (
+        "Laufschuhe für den Alltag, leicht und atmungsaktiv. Jetzt 30 Tage kostenlos testen. " * 5
+    )
+    cache.put("key", "landing_page", page)
+
+    previous = memo.store("key", "landing_page", _output(page + " Stand: heute"))
+
+    assert previous == {"raw": page, "structured": None}
+    assert memo.status["landing_page"] == CACHE_NEAR_DUPLICATE
+
+
+def test_changed_rescrape_replaces_the_output(tmp_path):
+    cache = TaskCache(path=str(tmp_path / "cache.db"), ttl=-1, stable_ttl=3600)
+    memo = TaskMemo(cache, volatile={"landing_page"})
+    cache.put("key", "landing_page", "Laufschuhe für den Alltag, leicht und atmungsaktiv.")
+
+    assert (
+        memo.store(
+            "key", "landing_page", _output("Cloud hosting with edge locations and daily backups.")
+        )
+        is None
+    )
+    assert (
+        cache.get("key", max_age=3600)["raw"]
+        == "Cloud hosting with edge locations and daily backups."
+    )
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from utils.cancellation import AnalysisCancelled, CancelToken
+from utils.rate_limiter import CircuitBreaker, CircuitOpenError, GeminiRateLimiter
+from utils.request_context import request_scope
+
+
+def _half_open_limiter(rpm: int = 0) -> GeminiRateLimiter:
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    return GeminiRateLimiter(rpm=rpm, tpm=0, max_retries=0, breaker=breaker)
+
+
+def test_cancel_during_throttle_wait_frees_the_trial_slot():
+    limiter = _half_open_limiter(rpm=1)
+    limiter.acquire(1)  # Uses up the minute's only request
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+
+    with request_scope("job", cancel_token=token):
+        with pytest.raises(AnalysisCancelled):
+            limiter.call(lambda: "never called", estimated_tokens=1)
+
+    # The next caller may still make the trial call
+    limiter.breaker.before_call()
+
+
+def test_non_retryable_error_leaves_the_breaker_half_open():
+    limiter = _half_open_limiter()
+
+    def bad_request():
+        raise ValueError("400 invalid argument")
+
+    with pytest.raises(ValueError):
+        limiter.call(bad_request, estimated_tokens=1)
+
+    assert limiter.breaker.state == "half_open"
+    assert limiter.call(lambda: "ok", estimated_tokens=1) == "ok"
+    assert limiter.breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_breaker():
+    limiter = _half_open_limiter()
+
+    def unavailable():
+        raise RuntimeError("503 unavailable")
+
+    with pytest.raises(RuntimeError):
+        limiter.call(unavailable, estimated_tokens=1)
+
+    with pytest.raises(CircuitOpenError):
+        limiter.call(lambda: "ok", estimated_tokens=1)
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from crew.scoring import BrandScore, CopyScore, VisualScore, assessment_for, compute_weighted_score
+
+
+def _visual(score: int) -> VisualScore:
+    return VisualScore.model_construct(score=score)
+
+
+def _copy(score: int) -> CopyScore:
+    return CopyScore.model_construct(score=score)
+
+
+@pytest.mark.parametrize(
+    "score, expected",
+    [
+        (100, "Good"),
+        (90, "Good"),
+        (89.9, "Needs Improvement"),
+        (70, "Needs Improvement"),
+        (69.5, "Poor"),
+        (0, "Poor"),
+    ],
+)
+def test_assessment_for(score, expected):
+    assert assessment_for(score) == expected
+
+
+def test_weighted_score_renormalizes_without_brand():
+    result = compute_weighted_score(_visual(80), _copy(60), BrandScore.model_construct(score=None))
+
+    assert result["components"] == {"visual": 80, "copy": 60}
+    assert result["weights"] == {"visual": 44.4, "copy": 55.6}
+    # 80 * 4/9 + 60 * 5/9 = 68.9 - the label uses the unrounded score
+    assert result["score"] == 69
+    assert result["assessment"] == "Poor"
+
+
+def test_weighted_score_uses_all_components():
+    result = compute_weighted_score(_visual(100), _copy(100), BrandScore.model_construct(score=100))
+
+    assert result["score"] == 100
+    assert result["assessment"] == "Good"
+    assert set(result["weights"]) == {"visual", "copy", "brand"}
+
+
+def test_weighted_score_single_component():
+    result = compute_weighted_score(None, _copy(65))
+
+    assert result["score"] == 65
+    assert result["weights"] == {"copy": 100.0}
+    assert result["assessment"] == "Poor"
+
+
+def test_weighted_score_without_components():
+    assert compute_weighted_score(None, None) is None
@@ -0,0 +1,47 @@
+from utils import simhash as simhash_module
+from utils.simhash import hamming, simhash
+
+
+PAGE = (
+    "Unsere Laufschuhe für den Alltag: leicht, atmungsaktiv und langlebig. "
+    "Jetzt bestellen und 30 Tage kostenlos testen. Versand innerhalb von 24 Stunden, "
+    "Rücksendung kostenlos. Über 10.000 zufriedene Kundinnen und Kunden vertrauen uns. "
+    "Entdecke die neue Kollektion in sechs Farben und allen Größen von 36 bis 47."
+)
+
+
+def test_identical_text_has_identical_fingerprint():
+    assert simhash(PAGE) == simhash(PAGE)
+    assert hamming(simhash(PAGE), simhash(PAGE)) == 0
+
+
+def test_case_and_punctuation_do_not_matter():
+    assert simhash(PAGE) == simhash(PAGE.lower().replace(".", " "))
+
+
+def test_small_edit_stays_close_and_other_text_is_far():
+    edited = PAGE.replace("24 Stunden", "48 Stunden")
+    other = (
+        "Cloud hosting for developers with global edge locations, free SSL and daily backups "
+        "included."
+    )
+
+    assert hamming(simhash(PAGE), simhash(edited)) < hamming(simhash(PAGE), simhash(other))
+    assert hamming(simhash(PAGE), simhash(other)) > 10
+
+
+def test_text_without_words():
+    assert simhash("") == 0
+    assert simhash(" ... !!! ") == 0
+
+
+def test_pure_python_fallback_matches_numpy(monkeypatch):
+    vectorized = simhash(PAGE)
+    monkeypatch.setattr(simhash_module, "np", None)
+
+    assert simhash(PAGE) == vectorized
+
+
+def test_hamming():
+    assert hamming(0b1011, 0b0001) == 2
+    assert hamming(0, (1 << 64) - 1) == 64
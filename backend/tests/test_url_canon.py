@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from utils.url_canon import canonicalize_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        (
+            "HTTPS://Example.COM/Page/?utm_source=fb&b=2&a=1#section",
+            "https://example.com/Page?a=1&b=2",
+        ),
+        ("https://example.com:443/", "https://example.com/"),
+        ("http://example.com:8080/path", "http://example.com:8080/path"),
+        ("https://example.com", "https://example.com/"),
+        ("https://example.com/?gclid=abc&fbclid=def&hsa_cam=1", "https://example.com/"),
+        ("https://example.com./landing", "https://example.com/landing"),
+        ("https://bücher.de/", "https://xn--bcher-kva.de/"),
+        ("  https://example.com/a?q=  ", "https://example.com/a?q="),
+    ],
+)
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_non_http_urls_are_returned_unchanged():
+    assert canonicalize_url(" mailto:team@example.com ") == "mailto:team@example.com"
+    assert canonicalize_url("not a url") == "not a url"
+
+
+def test_link_variants_share_one_canonical_form():
+    variants = [
+        "https://example.com/offer?utm_campaign=spring&ref=ad",
+        "https://EXAMPLE.com/offer/?ref=ad&gclid=123",
+        "https://example.com:443/offer?ref=ad#top",
+    ]
+
+    assert len({canonicalize_url(url) for url in variants}) == 1
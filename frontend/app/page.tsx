@@ -3,6 +3,10 @@
 import { useState } from "react";
 import ChatInterface, { Message } from "@/components/ChatInterface";
 
+// Resuming a dropped analysis stream (the backend keeps the job alive meanwhile)
+const MAX_RECONNECTS = 5;
+const RECONNECT_DELAY_MS = 1000;
+
 export default function Home() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -74,7 +78,7 @@ export default function Home() {
         formData.append("brand_guidelines", guidelines);
       }
 
-      const response = await fetch("http://localhost:8000/api/v1/analyze/stream", {
+      let response = await fetch("http://localhost:8000/api/v1/analyze/stream", {
         method: "POST",
         body: formData,
       });
@@ -83,57 +87,104 @@ export default function Home() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const reader = response.body?.getReader();
-      const decoder = new TextDecoder();
-
-      if (!reader) {
-        throw new Error("No response body");
-      }
+      // Needed to resume the stream if the connection drops
+      const jobId = response.headers.get("X-Job-ID");
+      let lastEventId: string | null = null;
+      let reconnects = 0;
 
       let resultText: string | null = null;
+      let streamedReport = "";
+      let streamError: string | null = null;
 
       while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        const chunk = decoder.decode(value);
-        const lines = chunk.split("\n");
-
-        for (const line of lines) {
-          if (line.startsWith("data: ")) {
-            try {
-              const data = JSON.parse(line.slice(6));
-
-              if (data.type === "result") {
-                resultText = data.data;
-              } else if (data.type === "error") {
-                throw new Error(data.data);
-              } else if (data.type === "log") {
-                // Add log to array and update loading message
-                agentLogs.push(data.data);
-                setMessages(prev =>
-                  prev.map(m =>
-                    m.id === loadingMessageId
-                      ? { ...m, agentLogs: [...agentLogs] }
-                      : m
-                  )
-                );
+        const reader = response.body?.getReader();
+        const decoder = new TextDecoder();
+
+        if (!reader) {
+          throw new Error("No response body");
+        }
+
+        let buffer = "";
+        try {
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            // Events can be split across chunks - only parse complete ones
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split("\n\n");
+            buffer = events.pop() ?? "";
+
+            for (const event of events) {
+              for (const line of event.split("\n")) {
+                if (line.startsWith("id: ")) {
+                  lastEventId = line.slice(4);
+                } else if (line.startsWith("data: ")) {
+                  try {
+                    const data = JSON.parse(line.slice(6));
+
+                    if (data.type === "result") {
+                      resultText = data.data;
+                    } else if (data.type === "report_delta" || data.type === "report_reset" || data.type === "replay_gap") {
+                      // Show the report while the synthesizer is still writing it
+                      // (after a replay gap the partial report is incomplete - the result event replaces it)
+                      streamedReport = data.type === "report_delta" ? streamedReport + data.data : "";
+                      setMessages(prev =>
+                        prev.map(m =>
+                          m.id === loadingMessageId
+                            ? { ...m, content: streamedReport, isLoading: !streamedReport }
+                            : m
+                        )
+                      );
+                    } else if (data.type === "error") {
+                      streamError = data.data;
+                    } else if (data.type === "log") {
+                      // Add log to array and update loading message
+                      agentLogs.push(data.data);
+                      setMessages(prev =>
+                        prev.map(m =>
+                          m.id === loadingMessageId
+                            ? { ...m, agentLogs: [...agentLogs] }
+                            : m
+                        )
+                      );
+                    }
+                    // Ignore heartbeats
+                  } catch (parseError) {
+                    console.warn("Failed to parse SSE data:", line);
+                  }
+                }
               }
-              // Ignore heartbeats
-            } catch (parseError) {
-              console.warn("Failed to parse SSE data:", line);
             }
           }
+        } catch (readError) {
+          console.warn("Stream interrupted:", readError);
         }
+
+        if (resultText || streamError || !jobId || reconnects >= MAX_RECONNECTS) break;
+
+        // Connection dropped before the result - resume where the stream stopped
+        reconnects += 1;
+        await new Promise(resolve => setTimeout(resolve, RECONNECT_DELAY_MS * reconnects));
+        response = await fetch(`http://localhost:8000/api/v1/analyze/stream/${jobId}`, {
+          headers: lastEventId ? { "Last-Event-ID": lastEventId } : {},
+        });
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+      }
+
+      if (streamError) {
+        throw new Error(streamError);
       }
 
       if (!resultText) {
         throw new Error("No result received");
       }
 
-      // Remove loading message and add result as markdown content
+      // Remove loading/streamed message and add result as markdown content
       setMessages(prev => {
-        const withoutLoading = prev.filter(m => !m.isLoading);
+        const withoutLoading = prev.filter(m => !m.isLoading && m.id !== loadingMessageId);
         return [
           ...withoutLoading,
           {
@@ -149,7 +200,7 @@ export default function Home() {
 
       // Remove loading and add error message
       setMessages(prev => {
-        const withoutLoading = prev.filter(m => !m.isLoading);
+        const withoutLoading = prev.filter(m => !m.isLoading && m.id !== loadingMessageId);
         return [
           ...withoutLoading,
           {
@@ -3,7 +3,7 @@
  */
 
 import axios, { AxiosInstance } from "axios";
-import type { AnalysisRequest, AnalysisResponse } from "./types";
+import type { AnalysisRequest, AnalysisResponse, TaskResult } from "./types";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
@@ -57,7 +57,8 @@ class ApiClient {
     adFile: File | null,
     onLog: (log: string) => void,
     onResult: (report: any) => void,
-    onError: (error: string) => void
+    onError: (error: string) => void,
+    onTaskResult?: (taskResult: TaskResult) => void
   ): () => void {
     // Use fetch with SSE (EventSource doesn't support POST)
     const controller = new AbortController();
@@ -116,6 +117,8 @@ class ApiClient {
                   onLog(event.data);
                 } else if (event.type === "result") {
                   onResult(event.data);
+                } else if (event.type === "task_result") {
+                  onTaskResult?.(event.data);
                 } else if (event.type === "error") {
                   onError(event.data);
                 }
@@ -90,3 +90,16 @@ export interface AnalysisResponse {
   report?: AdQualityReport;
   error?: string;
 }
+
+/** Streamed as soon as one crew task finishes (SSE type "task_result") */
+export interface TaskResult {
+  task: "visual_analysis" | "landing_page" | "copywriting" | "brand_compliance" | "report";
+  output: string;
+  duration_seconds: number;
+  token_usage: {
+    total_tokens?: number;
+    prompt_tokens?: number;
+    completion_tokens?: number;
+    successful_requests?: number;
+  };
+}